@@ -0,0 +1,468 @@
+# bench_load.py - 백엔드 부하 테스트 (TEST_MODE 백엔드 + 더미 LLM 서버, 혼합 워크로드, 결과 JSON 저장/비교)
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# 엔드포인트별 기본 가중치 (탭 로드, LLM 질의, 히스토리 목록/상세, 프리셋 로드)
+DEFAULT_MIX = "tab_load=30,llm_query=30,history_list=15,history_detail=10,preset_load=15"
+
+TABS = ["tab1", "tab2", "tab3"]
+
+# 빠른 경로로 답하는 질문과 LLM까지 가는 질문을 섞음
+QUESTIONS = {
+    "tab1": ["연도별 매출 합계", "카테고리별 평균 평점", "2024년 분기별 매출", "카테고리 매출 상관관계 분석",
+             "매출이 가장 높은 분기는?", "평점 추세를 알려줘"],
+    "tab2": ["카테고리별 재고 합계", "상위 10개 제품의 재고 현황", "가격대별 제품 분포", "재고가 부족한 제품 설명해줘"],
+    "tab3": ["지역별 고객 수", "지역별 고객 분포를 차트로 보여줘", "만족도 평균이 높은 지역", "주문이 많은 고객 특징은?"],
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, weight = item.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """최근접 순위 백분위"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """'llm_call;dur=830.5, total;dur=845.0' -> {"llm_call": 830.5, "total": 845.0}"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in (header or "").split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            if param.startswith("dur="):
+                stages[name] = float(param[4:])
+    return stages
+
+
+# ---------------------------------------------------------------------------
+# 워커 프로세스 CPU / RSS 샘플링 (/proc 기반, Linux 외에서는 None)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid 와 자식 프로세스 (uvicorn --workers 사용 시 워커들)"""
+    pids = [pid]
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return pids
+    for child in children:
+        pids.extend(_process_tree(int(child)))
+    return pids
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS  # utime + stime
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _pss_mb(pid: int) -> Optional[float]:
+    """공유 페이지(mmap 한 스냅샷 파일 등)를 공유 프로세스 수로 나눠 계산한 메모리"""
+    try:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class ProcessSampler:
+    """일정 간격으로 백엔드 프로세스(트리) CPU 사용률과 RSS/PSS 기록"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _read(self):
+        pids = _process_tree(self.pid)
+        cpu = [_cpu_seconds(p) for p in pids]
+        rss = [_rss_mb(p) for p in pids]
+        if None in cpu or None in rss:
+            return None
+        pss = [_pss_mb(p) for p in pids]
+        return sum(cpu), sum(rss), len(pids), max(rss), None if None in pss else sum(pss)
+
+    async def _run(self):
+        previous = self._read()
+        previous_at = time.perf_counter()
+        while previous:
+            await asyncio.sleep(self.interval)
+            current = self._read()
+            now = time.perf_counter()
+            if not current:
+                break
+            self.samples.append({
+                "cpu_percent": (current[0] - previous[0]) / (now - previous_at) * 100,
+                "rss_mb": current[1],
+                "processes": current[2],
+                "rss_mb_max_process": current[3],
+                "pss_mb": current[4],
+            })
+            previous, previous_at = current, now
+
+    def start(self):
+        if self.pid:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Optional[Dict[str, Any]]:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if not self.samples:
+            return None
+        cpu = [s["cpu_percent"] for s in self.samples]
+        rss = [s["rss_mb"] for s in self.samples]
+        return {
+            "processes": self.samples[-1]["processes"],
+            "cpu_percent_avg": round(sum(cpu) / len(cpu), 1),
+            "cpu_percent_max": round(max(cpu), 1),
+            "rss_mb_peak": round(max(rss), 1),
+            "rss_mb_end": round(rss[-1], 1),
+            # 워커 하나의 최대 RSS / 트리 전체 PSS (워커를 늘릴 때 워커별 메모리가 평평한지 확인)
+            "rss_mb_max_process": round(max(s["rss_mb_max_process"] for s in self.samples), 1),
+            "pss_mb_end": round(self.samples[-1]["pss_mb"], 1) if self.samples[-1]["pss_mb"] is not None else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 서버 기동
+
+def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"서버가 준비되지 않았습니다: {url}")
+
+
+def start_servers(args, workdir: Path) -> List[subprocess.Popen]:
+    """더미 LLM 서버와 TEST_MODE 백엔드를 별도 프로세스로 기동 (히스토리/프리셋은 임시 디렉터리에 기록)"""
+    dummy_env = {
+        **os.environ,
+        "DUMMY_LLM_PORT": str(args.llm_port),
+        "FAULT_LATENCY_MS": str(args.llm_latency_ms),
+        "FAULT_LATENCY_JITTER_MS": str(args.llm_jitter_ms),
+        "FAULT_SLOW_RATE": str(args.llm_slow_rate),
+        "FAULT_SLOW_MS": str(args.llm_slow_ms),
+    }
+    backend_env = {
+        **os.environ,
+        "TEST_MODE": "true",
+        "LLM_API_URLS": f"http://localhost:{args.llm_port}/v1/chat/completions",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        # 부하 테스트가 사용자별 요청 한도에 막히지 않도록 (환경 변수로 지정하면 그 값 사용)
+        "LLM_USER_RATE_PER_MIN": os.environ.get("LLM_USER_RATE_PER_MIN", "100000"),
+        "LLM_USER_BURST": os.environ.get("LLM_USER_BURST", "1000"),
+    }
+    processes = [
+        subprocess.Popen([sys.executable, str(BACKEND_DIR / "dummy_llm_server.py")], cwd=workdir, env=dummy_env,
+                         stdout=open(workdir / "dummy_llm.log", "w"), stderr=subprocess.STDOUT),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+                          "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+                         cwd=workdir, env=backend_env,
+                         stdout=open(workdir / "backend.log", "w"), stderr=subprocess.STDOUT),
+    ]
+    try:
+        _wait_ready(f"http://localhost:{args.llm_port}/health")
+        _wait_ready(f"http://localhost:{args.port}/health/ready", timeout=300)  # 프리웜(탭 적재) 완료까지
+    except RuntimeError:
+        stop_servers(processes)
+        raise
+    return processes
+
+
+def stop_servers(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ---------------------------------------------------------------------------
+# 워크로드
+
+class Workload:
+    """가상 사용자별 상태(쿼리 ID, 프리셋 ID)를 가지고 가중치에 따라 요청을 고름"""
+
+    def __init__(self, client: httpx.AsyncClient, users: int, mix: Dict[str, float], rng: random.Random):
+        self.client = client
+        self.users = [f"bench_user{i}" for i in range(users)]
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.rng = rng
+        self.query_ids: Dict[str, List[str]] = {user: [] for user in self.users}
+        self.preset_ids: Dict[str, List[str]] = {user: [] for user in self.users}
+
+    async def setup(self):
+        """사용자마다 질의 1건과 그 결과를 참조하는 프리셋 1건 생성 (히스토리/프리셋 요청 대상)"""
+        for user in self.users:
+            tab_id = self.rng.choice(TABS)
+            response = await self.client.post(f"/api/users/{user}/llm/query",
+                                              json={"tab_id": tab_id, "question": QUESTIONS[tab_id][0]})
+            response.raise_for_status()
+            query_id = response.json()["query_id"]
+            self.query_ids[user].append(query_id)
+            response = await self.client.post(f"/api/users/{user}/presets", json={
+                "name": "bench", "tab_id": tab_id,
+                "grid_config": {"charts": [{"position": 0, "source": {"type": "query_reference", "query_id": query_id}}]},
+            })
+            response.raise_for_status()
+            self.preset_ids[user].append(response.json()["preset_id"])
+
+    async def request(self):
+        """요청 하나 실행 -> (엔드포인트 이름, 응답)"""
+        name = self.rng.choices(self.names, self.weights)[0]
+        user = self.rng.choice(self.users)
+        tab_id = self.rng.choice(TABS)
+        if name == "tab_load":
+            response = await self.client.get(f"/api/users/{user}/api/tabs/{tab_id}/data")
+        elif name == "llm_query":
+            response = await self.client.post(f"/api/users/{user}/llm/query",
+                                              json={"tab_id": tab_id, "question": self.rng.choice(QUESTIONS[tab_id])})
+            if response.status_code == 200 and response.json().get("query_id"):
+                self.query_ids[user].append(response.json()["query_id"])
+        elif name == "history_list":
+            response = await self.client.get(f"/api/users/{user}/history")
+        elif name == "history_detail":
+            response = await self.client.get(f"/api/users/{user}/history/{self.rng.choice(self.query_ids[user])}")
+        elif name == "preset_load":
+            response = await self.client.get(f"/api/users/{user}/presets/{self.rng.choice(self.preset_ids[user])}")
+        else:
+            raise ValueError(f"알 수 없는 워크로드 항목: {name}")
+        return name, response
+
+
+async def run_load(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        workload = Workload(client, args.users, parse_mix(args.mix), rng)
+        await workload.setup()
+
+        sampler = ProcessSampler(args.pid)
+        measuring = False
+        deadline = time.perf_counter() + args.warmup + args.duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    name, response = await workload.request()
+                    status = str(response.status_code)
+                    timing = parse_server_timing(response.headers.get("Server-Timing", ""))
+                except httpx.HTTPError as e:
+                    name, status, timing = "error", type(e).__name__, {}
+                if not measuring:
+                    continue
+                entry = results.setdefault(name, {"latencies": [], "statuses": {}, "stages": {}})
+                entry["latencies"].append((time.perf_counter() - start) * 1000)
+                entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+                for stage, ms in timing.items():
+                    entry["stages"][stage] = entry["stages"].get(stage, 0.0) + ms
+
+        workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+        if args.warmup:
+            print(f"🔥 워밍업 {args.warmup}s")
+            await asyncio.sleep(args.warmup)
+        measuring = True
+        sampler.start()
+        measure_start = time.perf_counter()
+        print(f"📈 측정 {args.duration}s (동시 {args.concurrency}, 사용자 {args.users})")
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - measure_start
+        worker_stats = await sampler.stop()
+
+    return summarize(results, elapsed, worker_stats)
+
+
+def summarize(results: Dict[str, Dict[str, Any]], elapsed: float, worker_stats) -> Dict[str, Any]:
+    endpoints = {}
+    total = errors = 0
+    for name, entry in sorted(results.items()):
+        latencies = sorted(entry["latencies"])
+        count = len(latencies)
+        failed = sum(n for status, n in entry["statuses"].items() if not status.startswith("2"))
+        total += count
+        errors += failed
+        endpoints[name] = {
+            "requests": count,
+            "errors": failed,
+            "status_counts": entry["statuses"],
+            "throughput_rps": round(count / elapsed, 2),
+            "latency_ms": {
+                "mean": round(sum(latencies) / count, 2),
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(latencies[-1], 2),
+            },
+            # Server-Timing 기준 단계별 평균 (서버 내부 어디서 시간이 쓰였는지)
+            "server_stages_ms": {stage: round(ms / count, 2) for stage, ms in entry["stages"].items()},
+        }
+    return {
+        "duration_seconds": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+        "worker": worker_stats,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    summary = report["results"]
+    print("=" * 96)
+    print(f"{'엔드포인트':16} | {'요청':>7} | {'오류':>5} | {'rps':>8} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9}")
+    print("-" * 96)
+    for name, stats in summary["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"{name:16} | {stats['requests']:>7,} | {stats['errors']:>5} | {stats['throughput_rps']:>8.1f} | "
+              f"{latency['p50']:>9.1f} | {latency['p95']:>9.1f} | {latency['p99']:>9.1f}")
+    print("-" * 96)
+    print(f"전체 {summary['requests']:,}건, {summary['throughput_rps']} rps, 오류 {summary['errors']}건")
+    if summary["worker"]:
+        worker = summary["worker"]
+        print(f"워커 CPU 평균 {worker['cpu_percent_avg']}% (최대 {worker['cpu_percent_max']}%), "
+              f"RSS 최대 {worker['rss_mb_peak']}MB ({worker['processes']}개 프로세스, "
+              f"프로세스당 최대 {worker['rss_mb_max_process']}MB, PSS {worker['pss_mb_end']}MB)")
+
+
+def compare(report: Dict[str, Any], baseline_path: str, threshold: float) -> bool:
+    """기준 결과와 비교해 처리량/p95 변화 출력, p95 가 threshold(%) 이상 느려진 엔드포인트가 있으면 False"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    current = report["results"]
+    ok = True
+    print("=" * 96)
+    print(f"기준 결과 비교: {baseline_path}")
+    for name, stats in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base:
+            continue
+        p95_change = (stats["latency_ms"]["p95"] / base["latency_ms"]["p95"] - 1) * 100 if base["latency_ms"]["p95"] else 0.0
+        rps_change = (stats["throughput_rps"] / base["throughput_rps"] - 1) * 100 if base["throughput_rps"] else 0.0
+        regressed = p95_change > threshold
+        ok = ok and not regressed
+        print(f"{name:16} | p95 {base['latency_ms']['p95']:>9.1f} -> {stats['latency_ms']['p95']:>9.1f} ms "
+              f"({p95_change:+6.1f}%) | rps {rps_change:+6.1f}%{'  ⚠️ 회귀' if regressed else ''}")
+    return ok
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="백엔드 혼합 워크로드 부하 테스트")
+    parser.add_argument("--url", help="이미 실행 중인 백엔드 주소 (지정하지 않으면 TEST_MODE 백엔드와 더미 LLM 서버를 기동)")
+    parser.add_argument("--pid", type=int, help="--url 사용 시 CPU/RSS 를 샘플링할 백엔드 프로세스 ID")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 요청 수 (닫힌 루프)")
+    parser.add_argument("--users", type=int, default=8, help="가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="측정 전 워밍업 시간 (초)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"요청 가중치 (기본 {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-port", type=int, default=8101)
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="더미 LLM 평균 지연")
+    parser.add_argument("--llm-jitter-ms", type=float, default=300, help="더미 LLM 지연 표준편차")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.02, help="느린 응답 비율")
+    parser.add_argument("--llm-slow-ms", type=float, default=4000, help="느린 응답 추가 지연")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본 bench_results/load_<시각>.json)")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="허용 p95 증가율 (%%)")
+    args = parser.parse_args()
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="bench_load_") as workdir:
+        if not args.url:
+            print(f"🚀 TEST_MODE 백엔드(:{args.port}, 워커 {args.workers}) + 더미 LLM(:{args.llm_port}) 기동")
+            processes = start_servers(args, Path(workdir))
+            args.url = f"http://localhost:{args.port}"
+            args.pid = processes[1].pid
+        try:
+            results = asyncio.run(run_load(args))
+        finally:
+            stop_servers(processes)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "pid")},
+        },
+        "results": results,
+    }
+    print_report(report)
+
+    output = Path(args.output or BACKEND_DIR / "bench_results" / f"load_{datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"💾 결과 저장: {output}")
+
+    if args.compare and not compare(report, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
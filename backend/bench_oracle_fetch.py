@@ -0,0 +1,202 @@
+# bench_oracle_fetch.py - Oracle 조회 경로 벤치마크 (가짜 커서 사용, DB 불필요)
+#
+# 경로마다 새 프로세스에서 실행해 최대 RSS 가 앞선 경로의 피크를 물려받지 않도록 함 (RSS 는 시작 대비 증가분)
+# arrow 경로(fetch_df_all)는 pyarrow 가 설치된 경우에만 측정
+import argparse
+import multiprocessing
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from oracle_fetch import DEFAULT_ARRAYSIZE, fetch_dataframe, peak_rss_mb
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+_BASE_DATE = datetime(2022, 1, 1)
+_TEMPLATE_ROWS = [
+    (2022 + i % 3, f"Q{i % 4 + 1}", "ABC"[i % 3], 3.5 + (i % 15) / 10,
+     1000000 + i * 7919 % 1000000, _BASE_DATE + timedelta(days=i % 1000))
+    for i in range(50000)
+]
+
+
+class FakeCursor:
+    """tab1 형태의 행을 생성하는 DBAPI 커서 흉내"""
+
+    description = [
+        ("YEAR", "DB_TYPE_NUMBER", 5, None, 4, 0, True),
+        ("QUARTER", "DB_TYPE_VARCHAR", 2, None, None, None, True),
+        ("CATEGORY", "DB_TYPE_VARCHAR", 10, None, None, None, True),
+        ("RATING", "DB_TYPE_NUMBER", 5, None, 3, 1, True),
+        ("SALES", "DB_TYPE_NUMBER", 12, None, 12, 0, True),
+        ("LAST_ORDER_DATE", "DB_TYPE_DATE", 23, None, None, None, True),
+    ]
+
+    def __init__(self, total_rows: int):
+        self.total_rows = total_rows
+        self.position = 0
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.fetch_calls = 0
+
+    def execute(self, sql, *args):
+        self.position = 0
+
+    def _rows(self, count: int):
+        # 행 생성 비용이 측정에 섞이지 않도록 미리 만든 블록을 반복 사용
+        end = min(self.position + count, self.total_rows)
+        rows = []
+        while self.position < end:
+            offset = self.position % len(_TEMPLATE_ROWS)
+            take = min(end - self.position, len(_TEMPLATE_ROWS) - offset)
+            rows.extend(_TEMPLATE_ROWS[offset:offset + take])
+            self.position += take
+        return rows
+
+    def fetchmany(self, size=None):
+        self.fetch_calls += 1
+        return self._rows(size or self.arraysize)
+
+    def fetchall(self):
+        self.fetch_calls += 1
+        return self._rows(self.total_rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """fetch_df_all 이 없는 연결 (구버전 드라이버) - 컬럼 조회 경로"""
+
+    def __init__(self, total_rows: int):
+        self.total_rows = total_rows
+        self.cursors = []
+
+    def cursor(self):
+        cursor = FakeCursor(self.total_rows)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeArrowConnection(FakeConnection):
+    """fetch_df_all 을 지원하는 연결 (python-oracledb 2.4+) - 드라이버가 Arrow 버퍼를 직접 만드는 것을 흉내"""
+
+    _template = None
+
+    def fetch_df_all(self, statement, arraysize=None):
+        # 템플릿 블록을 한 번만 Arrow 로 만들어 두고 이어 붙임 (행 -> Arrow 변환 비용은 드라이버 C 코드 몫)
+        if FakeArrowConnection._template is None:
+            names = [d[0] for d in FakeCursor.description]
+            FakeArrowConnection._template = pyarrow.table(
+                {name: list(values) for name, values in zip(names, zip(*_TEMPLATE_ROWS))})
+        template = FakeArrowConnection._template
+        blocks, remaining = [], self.total_rows
+        while remaining > 0:
+            blocks.append(template.slice(0, min(remaining, template.num_rows)))
+            remaining -= blocks[-1].num_rows
+        return pyarrow.concat_tables(blocks)
+
+
+def _read_sql(rows: int, arraysize: int) -> pd.DataFrame:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pd.read_sql("SELECT * FROM performance_data", FakeConnection(rows))
+
+
+def _columnar(rows: int, arraysize: int) -> pd.DataFrame:
+    df, stats = fetch_dataframe(FakeConnection(rows), "SELECT * FROM performance_data", arraysize)
+    assert stats["method"] == "columnar"
+    return df
+
+
+def _arrow(rows: int, arraysize: int) -> pd.DataFrame:
+    df, stats = fetch_dataframe(FakeArrowConnection(rows), "SELECT * FROM performance_data", arraysize)
+    assert stats["method"] == "arrow", "Arrow 경로 실패 (컬럼 조회로 전환됨)"
+    return df
+
+
+METHODS = {"read_sql": _read_sql, "columnar": _columnar, "arrow": _arrow}
+
+
+def measure(method: str, rows: int, arraysize: int, result_queue):
+    """새 프로세스에서 실행 시간, RSS 증가분, tracemalloc 피크 측정
+
+    tracemalloc 오버헤드가 시간에 섞이지 않도록 시간/RSS 측정 후 한 번 더 실행해서 잰다.
+    """
+    func = METHODS[method]
+    if method == "arrow":
+        FakeArrowConnection(1).fetch_df_all(None)  # 템플릿 준비는 측정에서 제외
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    df = func(rows, arraysize)
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+    dtypes = dict(df.dtypes.astype(str))
+    result_rows = len(df)
+    del df
+
+    tracemalloc.start()
+    func(rows, arraysize)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result_queue.put({
+        "method": method,
+        "rows": result_rows,
+        "seconds": elapsed,
+        "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+        "traced_peak_mb": peak / 1024 / 1024,
+        "dtypes": dtypes,
+    })
+
+
+def run_isolated(method: str, rows: int, arraysize: int):
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(method, rows, arraysize, result_queue))
+    proc.start()
+    result = result_queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oracle 조회 경로 벤치마크")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--arraysize", type=int, default=DEFAULT_ARRAYSIZE)
+    args = parser.parse_args()
+
+    methods = ["read_sql", "columnar"] + (["arrow"] if pyarrow is not None else [])
+    print(f"🚀 가짜 커서 벤치마크: {args.rows:,}행, arraysize={args.arraysize} (경로마다 별도 프로세스)")
+    if pyarrow is None:
+        print("⚠️ pyarrow 미설치 - arrow(fetch_df_all) 경로는 건너뜀")
+    print("=" * 80)
+
+    results = []
+    for method in methods:
+        r = run_isolated(method, args.rows, args.arraysize)
+        rss = f"{r['rss_delta_mb']:7.1f}MB" if r["rss_delta_mb"] is not None else "      -"
+        print(f"{method:10} | {r['rows']:>9,}행 | {r['seconds']:7.3f}s | "
+              f"{r['rows'] / r['seconds']:>12,.0f} rows/s | RSS +{rss} | 할당 피크 {r['traced_peak_mb']:8.1f}MB")
+        results.append(r)
+    print("-" * 80)
+    for r in results[1:]:
+        print(f"{r['method']} 컬럼 타입:", r["dtypes"])
+    assert len({r["rows"] for r in results}) == 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# chart_registry.py - 탭별 기본 차트 선언형 레지스트리
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from tab_loader import GroupedAggregator
+
+logger = logging.getLogger(__name__)
+
+# 탭별 기본 차트 정의 (차원, 측정값, 집계 함수, 차트 타입, 제목)
+# measure 가 None 이면 행 수(count)를 센다.
+DEFAULT_CHARTS: Dict[str, List[Dict[str, Any]]] = {
+    "tab1": [
+        {"dimension": "year", "measure": "rating", "aggregate": "mean",
+         "chart_type": "line", "title": "연도별 평균 레이팅 추이"},
+        {"dimension": "category", "measure": "sales", "aggregate": "sum",
+         "chart_type": "doughnut", "title": "카테고리별 총 매출"},
+    ],
+    "tab2": [
+        {"dimension": "category", "measure": None, "aggregate": "count",
+         "chart_type": "bar", "title": "카테고리별 제품 수"},
+    ],
+    "tab3": [
+        {"dimension": "region", "measure": None, "aggregate": "count",
+         "chart_type": "pie", "title": "지역별 고객 분포"},
+    ],
+}
+
+
+def load_chart_registry(path: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """기본 레지스트리에 JSON 파일 정의를 덮어써서 반환 (탭 단위로 교체)"""
+    registry = {tab_id: [dict(c) for c in charts] for tab_id, charts in DEFAULT_CHARTS.items()}
+    if path and Path(path).exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            registry.update(json.load(f))
+        logger.info("✅ 기본 차트 레지스트리 로드: %s", path)
+
+    for tab_id, charts in registry.items():
+        for i, chart in enumerate(charts):
+            chart.setdefault("id", f"{tab_id}_chart_{i + 1}")
+            chart.setdefault("measure", None)
+            chart.setdefault("aggregate", "count" if chart["measure"] is None else "sum")
+            chart.setdefault("chart_type", "bar")
+            chart.setdefault("title", chart["id"])
+            if not chart.get("dimension"):
+                raise ValueError(f"{chart['id']}: 차원(dimension)이 지정되지 않았습니다")
+            if chart["aggregate"] not in GroupedAggregator.AGGREGATES:
+                raise ValueError(f"{chart['id']}: 지원하지 않는 집계 함수입니다: {chart['aggregate']}")
+    return registry
+
+
+class ChartAggregationPass:
+    """한 탭의 모든 기본 차트를 데이터 한 번의 스캔으로 계산 (차원별 groupby 공유)"""
+
+    def __init__(self, charts: List[Dict[str, Any]]):
+        self.charts = charts
+        measures: Dict[str, set] = {}
+        for chart in charts:
+            measures.setdefault(chart["dimension"], set())
+            if chart["measure"]:
+                measures[chart["dimension"]].add(chart["measure"])
+        self.groups = {dim: GroupedAggregator(dim, cols) for dim, cols in measures.items()}
+
+    @property
+    def columns(self) -> List[str]:
+        """스캔에 필요한 컬럼"""
+        cols = []
+        for dim, group in self.groups.items():
+            cols += [dim] + group.measures
+        return list(dict.fromkeys(cols))
+
+    def update(self, chunk: pd.DataFrame):
+        for group in self.groups.values():
+            group.update(chunk)
+
+    def results(self) -> Dict[str, pd.DataFrame]:
+        """차트 ID -> 집계 결과 DataFrame"""
+        return {
+            chart["id"]: self.groups[chart["dimension"]].result(chart["measure"], chart["aggregate"])
+            for chart in self.charts
+        }
@@ -0,0 +1,117 @@
+# conversation.py - 사용자/탭별 대화 맥락 (이전 질문 요약을 토큰 예산 안에서 프롬프트에 포함)
+import math
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 보수적으로 토큰 수 추정 (영문/숫자 4자당 1토큰, 한글 등은 1자당 1토큰)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summarize_turn(question: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    """한 턴을 질문 / SQL / 결과 형태만 남긴 요약으로 변환 (결과 행 자체는 저장하지 않음)"""
+    turn = {"question": _truncate(question, 200), "at": time.time()}
+    if response.get("chart_request") == 1:
+        rows = response.get("raw_data") or []
+        columns = list(rows[0].keys()) if rows else []
+        turn.update({
+            "sql": _truncate(response.get("sql_query", ""), 400),
+            "chart_type": response.get("chart_type"),
+            "shape": f"{len(rows)}행 x {len(columns)}열 ({', '.join(columns[:8])})",
+        })
+    else:
+        turn["answer"] = _truncate(response.get("description", ""), 160)
+    return turn
+
+
+def render_turn(turn: Dict[str, Any], detail: str = "full") -> str:
+    """요약 턴을 프롬프트 한 줄로 (full: SQL 포함, brief: 질문과 결과 형태만)"""
+    line = f"Q: {turn['question']}"
+    if "sql" in turn:
+        if detail == "full":
+            line += f"\n   SQL: {turn['sql']}"
+        line += f"\n   결과: {turn['shape']}"
+    elif detail == "full" and turn.get("answer"):
+        line += f"\n   답변: {turn['answer']}"
+    return line
+
+
+class ConversationSession:
+    """한 사용자의 한 탭에 대한 대화 맥락
+
+    - 최근 max_turns 턴만 보관 (초과분은 가장 오래된 턴부터 제거)
+    - 프롬프트 조립 시 최신 턴부터 token_budget 안에서 SQL 포함 전체 요약을 넣고,
+      예산이 부족하면 질문/결과 형태만 남긴 간략 요약으로, 그래도 넘치면 이전 질문 목록 한 줄로 압축
+    """
+
+    def __init__(self, max_turns: int = 10, token_budget: int = 800):
+        self.turns: deque = deque(maxlen=max(1, max_turns))
+        self.token_budget = token_budget
+        self.last_active = time.time()
+
+    def touch(self):
+        self.last_active = time.time()
+
+    def is_idle(self, idle_seconds: float) -> bool:
+        return time.time() - self.last_active > idle_seconds
+
+    def add_turn(self, question: str, response: Dict[str, Any]):
+        self.turns.append(summarize_turn(question, response))
+        self.touch()
+
+    def build_context(self) -> Optional[str]:
+        """토큰 예산 안의 이전 대화 요약 (없으면 None)"""
+        if not self.turns or self.token_budget <= 0:
+            return None
+        header = "이전 대화 (후속 질문이면 이 맥락을 이어서 해석하세요):"
+        used = estimate_tokens(header)
+        lines: List[str] = []
+        remaining = list(self.turns)
+
+        # 최신 턴부터 전체 요약 -> 간략 요약 순으로 예산 안에서 채움
+        while remaining:
+            turn = remaining[-1]
+            for detail in ("full", "brief"):
+                text = render_turn(turn, detail)
+                cost = estimate_tokens(text)
+                if used + cost <= self.token_budget:
+                    lines.insert(0, text)
+                    used += cost
+                    remaining.pop()
+                    break
+            else:
+                break
+
+        # 남은 오래된 턴은 질문만 모은 한 줄 요약 (예산 안에 들어가는 만큼)
+        if remaining:
+            older = []
+            for turn in reversed(remaining):
+                candidate = "이전 질문: " + " / ".join([_truncate(turn["question"], 40)] + older)
+                if used + estimate_tokens(candidate) > self.token_budget:
+                    break
+                older.insert(0, _truncate(turn["question"], 40))
+            if older:
+                summary = "이전 질문: " + " / ".join(older)
+                lines.insert(0, summary)
+                used += estimate_tokens(summary)
+
+        if not lines:
+            return None
+        return "\n".join([header] + lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        context = self.build_context()
+        return {
+            "turns": list(self.turns),
+            "last_active": self.last_active,
+            "context_tokens": estimate_tokens(context) if context else 0,
+            "token_budget": self.token_budget,
+        }
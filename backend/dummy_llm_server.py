@@ -1,7 +1,10 @@
 # dummy_llm_server.py
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
+import os
 import random
 import json
 import re
@@ -16,14 +19,77 @@ class ChatCompletionRequest(BaseModel):
     model: str
     messages: List[Message]
     temperature: float = 0.7
+    response_format: Optional[Dict[str, Any]] = None
+
+# 장애 주입 설정 (환경 변수 또는 POST /fault 로 변경)
+# - latency_ms / latency_jitter_ms: 응답 지연 (정규분포, 음수는 0)
+# - slow_rate / slow_ms: 일부 요청을 느리게 (꼬리 지연 재현)
+# - error_rate: 500/502/503 응답 비율
+# - rate_limit_rate: 429 응답 비율
+# - timeout_rate / timeout_ms: 응답 없이 오래 대기 (클라이언트 타임아웃 재현)
+# - prose_rate: response_format 없이 요청하면 JSON을 코드 펜스/설명 문장으로 감싸는 비율
+# - reject_response_format: response_format 미지원 게이트웨이 흉내 (400 응답)
+FAULT_CONFIG = {
+    "latency_ms": float(os.environ.get("FAULT_LATENCY_MS", "0")),
+    "latency_jitter_ms": float(os.environ.get("FAULT_LATENCY_JITTER_MS", "0")),
+    "slow_rate": float(os.environ.get("FAULT_SLOW_RATE", "0")),
+    "slow_ms": float(os.environ.get("FAULT_SLOW_MS", "5000")),
+    "error_rate": float(os.environ.get("FAULT_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.environ.get("FAULT_RATE_LIMIT_RATE", "0")),
+    "timeout_rate": float(os.environ.get("FAULT_TIMEOUT_RATE", "0")),
+    "timeout_ms": float(os.environ.get("FAULT_TIMEOUT_MS", "60000")),
+    "prose_rate": float(os.environ.get("FAULT_PROSE_RATE", "0")),
+    "reject_response_format": os.environ.get("FAULT_REJECT_RESPONSE_FORMAT", "false").lower() == "true",
+}
+
+class FaultConfig(BaseModel):
+    latency_ms: Optional[float] = None
+    latency_jitter_ms: Optional[float] = None
+    slow_rate: Optional[float] = None
+    slow_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    rate_limit_rate: Optional[float] = None
+    timeout_rate: Optional[float] = None
+    timeout_ms: Optional[float] = None
+    prose_rate: Optional[float] = None
+    reject_response_format: Optional[bool] = None
+
+async def inject_fault() -> Optional[JSONResponse]:
+    """설정된 확률에 따라 지연/오류/타임아웃 주입 (오류 응답이면 반환)"""
+    roll = random.random()
+    if roll < FAULT_CONFIG["timeout_rate"]:
+        await asyncio.sleep(FAULT_CONFIG["timeout_ms"] / 1000)
+    roll -= FAULT_CONFIG["timeout_rate"]
+    if 0 <= roll < FAULT_CONFIG["error_rate"]:
+        return JSONResponse(status_code=random.choice([500, 502, 503]),
+                            content={"detail": "injected server error"})
+    roll -= FAULT_CONFIG["error_rate"]
+    if 0 <= roll < FAULT_CONFIG["rate_limit_rate"]:
+        return JSONResponse(status_code=429, content={"detail": "injected rate limit"},
+                            headers={"Retry-After": "1"})
+
+    delay = random.gauss(FAULT_CONFIG["latency_ms"], FAULT_CONFIG["latency_jitter_ms"])
+    if random.random() < FAULT_CONFIG["slow_rate"]:
+        delay += FAULT_CONFIG["slow_ms"]
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    return None
+
+def wrap_in_prose(content: str) -> str:
+    """실제 모델처럼 JSON을 코드 펜스나 설명 문장으로 감싸기"""
+    return random.choice([
+        f"```json\n{content}\n```",
+        f"요청하신 분석 결과입니다.\n{content}\n추가로 궁금한 점이 있으면 말씀해주세요.",
+        f"다음과 같이 응답합니다:\n```\n{content}\n```",
+    ])
 
 # SQL 쿼리 생성 함수
 def generate_sql_query(question: str, tab_id: str) -> Dict[str, Any]:
     """질문에 기반하여 SQL 쿼리 생성"""
     question_lower = question.lower()
     
-    # 테이블 이름
-    table_name = f"{tab_id}"
+    # 테이블 이름 (백엔드 메모리 DB 테이블명과 동일)
+    table_name = f"{tab_id}_data"
     
     # 기본 응답
     response = {
@@ -133,6 +199,12 @@ def generate_sql_query(question: str, tab_id: str) -> Dict[str, Any]:
 
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatCompletionRequest):
+    fault = await inject_fault()
+    if fault is not None:
+        return fault
+    if request.response_format and FAULT_CONFIG["reject_response_format"]:
+        return JSONResponse(status_code=400, content={"detail": "response_format is not supported"})
+    
     try:
         # 사용자 메시지 추출
         user_message = ""
@@ -156,6 +228,10 @@ async def chat_completions(request: ChatCompletionRequest):
         # SQL 쿼리 생성
         result = generate_sql_query(user_message, tab_id)
         
+        content = json.dumps(result, ensure_ascii=False)
+        if not request.response_format and random.random() < FAULT_CONFIG["prose_rate"]:
+            content = wrap_in_prose(content)
+        
         # LLM API 형식으로 응답 구성
         return {
             "id": f"chatcmpl-{random.randint(1000000, 9999999)}",
@@ -166,7 +242,7 @@ async def chat_completions(request: ChatCompletionRequest):
                 "index": 0,
                 "message": {
                     "role": "assistant",
-                    "content": json.dumps(result, ensure_ascii=False)
+                    "content": content
                 },
                 "finish_reason": "stop"
             }],
@@ -180,6 +256,16 @@ async def chat_completions(request: ChatCompletionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/fault")
+async def get_fault_config():
+    return FAULT_CONFIG
+
+@app.post("/fault")
+async def set_fault_config(config: FaultConfig):
+    """장애 주입 설정 변경 (지정한 항목만)"""
+    FAULT_CONFIG.update({k: v for k, v in config.dict().items() if v is not None})
+    return FAULT_CONFIG
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "dummy-llm-api"}
@@ -200,10 +286,12 @@ async def list_models():
 
 if __name__ == "__main__":
     import uvicorn
-    print("🤖 더미 LLM API 서버 시작 (포트: 8001)")
+    port = int(os.environ.get("DUMMY_LLM_PORT", "8001"))
+    print(f"🤖 더미 LLM API 서버 시작 (포트: {port})")
     print("📝 지원하는 질문 예시:")
     print("   - 2024년 레이팅을 보여줘")
     print("   - 카테고리별 매출 분석해줘")
     print("   - 상위 10개 제품의 재고 현황")
     print("   - 지역별 고객 분포를 차트로 보여줘")
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    print(f"🧨 장애 주입 설정: {FAULT_CONFIG}")
+    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,383 @@
+# fast_path.py - 자주 묻는 질문을 LLM 호출 없이 SQL 템플릿으로 응답하는 규칙 기반 빠른 경로
+import json
+import logging
+import re
+import time
+from collections import deque
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 스키마 카탈로그: 컬럼 별칭과 역할 (컬럼명 자체도 항상 별칭으로 취급)
+# role: dimension(그룹 기준) / measure(집계 대상), aggregate: 집계 단어가 없을 때 기본 집계
+COLUMN_CATALOG: Dict[str, Dict[str, Any]] = {
+    "year": {"aliases": ["연도", "년도", "연간"], "role": "dimension", "temporal": True},
+    "quarter": {"aliases": ["분기"], "role": "dimension", "temporal": True},
+    "category": {"aliases": ["카테고리", "분류", "종류"], "role": "dimension"},
+    "region": {"aliases": ["지역", "권역"], "role": "dimension"},
+    "product_name": {"aliases": ["제품명", "제품", "상품"], "role": "dimension"},
+    "rating": {"aliases": ["레이팅", "평점"], "role": "measure", "aggregate": "AVG"},
+    "sales": {"aliases": ["매출", "판매액", "매출액"], "role": "measure", "aggregate": "SUM"},
+    "price": {"aliases": ["가격", "단가"], "role": "measure", "aggregate": "AVG"},
+    "stock": {"aliases": ["재고"], "role": "measure", "aggregate": "SUM"},
+    "total_orders": {"aliases": ["주문", "주문수", "orders"], "role": "measure", "aggregate": "SUM"},
+    "satisfaction_score": {"aliases": ["만족도", "satisfaction"], "role": "measure", "aggregate": "AVG"},
+}
+
+AGGREGATE_WORDS = {
+    "AVG": ["평균", "average", "avg", "mean"],
+    "SUM": ["총", "합계", "합", "총합", "total", "sum"],
+    "COUNT": ["수", "개수", "건수", "분포", "몇", "count"],
+    "MAX": ["최대", "최고", "max"],
+    "MIN": ["최소", "최저", "min"],
+}
+_AGGREGATE_PREFIX = {"AVG": "avg", "SUM": "total", "COUNT": "count", "MAX": "max", "MIN": "min"}
+_AGGREGATE_LABELS = {"AVG": "평균", "SUM": "총", "COUNT": "개수", "MAX": "최대", "MIN": "최소"}
+
+CHART_WORDS = {
+    "pie": ["파이", "원형", "pie"],
+    "doughnut": ["도넛", "doughnut"],
+    "line": ["라인", "꺾은선", "추이", "line", "trend"],
+    "bar": ["막대", "bar"],
+}
+
+# 요청 표현/조사 등 의미 없는 단어 (신뢰도 계산에서 제외)
+STOP_WORDS = {
+    "보여줘", "보여", "보여주세요", "알려줘", "알려주세요", "분석", "분석해줘", "분석해", "해줘", "줘", "좀",
+    "차트", "차트로", "그래프", "그래프로", "현황", "비교", "각", "데이터", "정보", "별", "년", "개", "위",
+    "를", "을", "의", "로", "으로", "그려줘", "그려", "나타내줘", "확인",
+    "show", "me", "the", "of", "by", "per", "chart", "graph", "please", "for", "in",
+}
+
+# 슬롯 추출
+_YEAR_PATTERN = re.compile(r"(20\d{2})\s*년?")
+_TOP_N_PATTERN = re.compile(r"(?:상위|top)\s*(\d{1,3})|(\d{1,3})\s*(?:개|위)")
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z_]+|\d+")
+
+# 탭별 질문 패턴 (keywords: 동의어 그룹 목록, 모든 그룹이 질문에 있어야 함)
+# optional: 있어도 되는 보조 단어, sql 템플릿 슬롯: {table}, {year}, {n}
+DEFAULT_PATTERNS: Dict[str, List[Dict[str, Any]]] = {
+    "tab1": [
+        {"id": "year_quarterly_rating", "keywords": [["레이팅", "평점", "rating"]], "requires": ["year"],
+         "sql": "SELECT quarter, AVG(rating) AS avg_rating FROM {table} WHERE year = {year} "
+                "GROUP BY quarter ORDER BY quarter",
+         "chart_type": "bar", "description": "{year}년 분기별 평균 레이팅을 분석했습니다."},
+        {"id": "year_quarterly_sales", "keywords": [["매출", "sales"]], "requires": ["year"],
+         "sql": "SELECT quarter, SUM(sales) AS total_sales FROM {table} WHERE year = {year} "
+                "GROUP BY quarter ORDER BY quarter",
+         "chart_type": "line", "description": "{year}년 분기별 총 매출을 분석했습니다."},
+        {"id": "yearly_trend", "keywords": [["연도", "년도", "연도별", "year"], ["추이", "트렌드", "trend"]],
+         "sql": "SELECT year, AVG(rating) AS avg_rating, SUM(sales) AS total_sales FROM {table} "
+                "GROUP BY year ORDER BY year",
+         "chart_type": "line", "description": "연도별 추이를 분석했습니다."},
+    ],
+    "tab2": [
+        {"id": "top_stock_products", "keywords": [["상위", "top", "많은"], ["재고", "stock"]],
+         "sql": "SELECT product_name, stock FROM {table} ORDER BY stock DESC LIMIT {n}",
+         "chart_type": "bar", "description": "재고가 많은 상위 {n}개 제품을 표시했습니다.",
+         "optional": ["제품", "상품", "가장", "product", "products"], "defaults": {"n": 10}},
+        {"id": "top_price_products", "keywords": [["상위", "top", "비싼"], ["가격", "price", "비싼"]],
+         "sql": "SELECT product_name, price FROM {table} ORDER BY price DESC LIMIT {n}",
+         "chart_type": "bar", "description": "가격이 높은 상위 {n}개 제품을 표시했습니다.",
+         "optional": ["제품", "상품", "높은", "가장", "product", "products"], "defaults": {"n": 10}},
+    ],
+    "tab3": [
+        {"id": "top_regions", "keywords": [["상위", "top", "많은"], ["지역", "region"]],
+         "sql": "SELECT region, COUNT(*) AS customer_count FROM {table} GROUP BY region "
+                "ORDER BY customer_count DESC LIMIT {n}",
+         "chart_type": "pie", "description": "고객이 많은 상위 {n}개 지역을 표시했습니다.",
+         "optional": ["고객", "가장", "customer", "customers"], "defaults": {"n": 5}},
+        {"id": "region_distribution", "keywords": [["지역", "region"], ["고객", "customer", "분포"]],
+         "sql": "SELECT region, COUNT(*) AS customer_count FROM {table} GROUP BY region "
+                "ORDER BY customer_count DESC",
+         "chart_type": "pie", "description": "지역별 고객 분포를 분석했습니다."},
+    ],
+}
+
+
+def load_fast_path_patterns(path: Optional[str] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """기본 패턴/카탈로그에 JSON 파일 정의를 덮어써서 반환
+
+    파일 형식: {"patterns": {"tab1": [...]}, "columns": {"컬럼명": {"aliases": [...], "role": ...}}}
+    패턴은 탭 단위로 교체, 컬럼 정의는 컬럼 단위로 교체된다.
+    """
+    patterns = {tab_id: [dict(p) for p in items] for tab_id, items in DEFAULT_PATTERNS.items()}
+    catalog = {name: dict(spec) for name, spec in COLUMN_CATALOG.items()}
+    if path and Path(path).exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        patterns.update(config.get("patterns", {}))
+        catalog.update(config.get("columns", {}))
+        logger.info("✅ 빠른 경로 패턴 로드: %s", path)
+
+    for tab_id, items in patterns.items():
+        for i, pattern in enumerate(items):
+            pattern.setdefault("id", f"{tab_id}_pattern_{i + 1}")
+            pattern.setdefault("requires", [])
+            pattern.setdefault("optional", [])
+            pattern.setdefault("defaults", {})
+            pattern.setdefault("chart_type", "bar")
+            pattern.setdefault("description", "요청하신 분석을 수행했습니다.")
+            if not pattern.get("keywords") or "{table}" not in pattern.get("sql", ""):
+                raise ValueError(f"{pattern['id']}: keywords 와 {{table}} 을 포함한 sql 이 필요합니다")
+    return patterns, catalog
+
+
+def _object_particle(word: str) -> str:
+    """마지막 글자 받침 유무로 목적격 조사(을/를) 선택"""
+    last = word[-1] if word else ""
+    if "가" <= last <= "힣":
+        return "을" if (ord(last) - ord("가")) % 28 else "를"
+    return "을(를)"
+
+
+def tokenize(question: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(question.lower())
+
+
+def keyword_score(token: str, keyword: str, fuzzy_ratio: float) -> float:
+    """토큰과 키워드 일치 점수 (완전 일치 1.0, 조사 포함/복합어 0.95, 오타 유사도)"""
+    keyword = keyword.lower()
+    if token == keyword:
+        return 1.0
+    # 한 글자 키워드(총, 수, 몇)는 완전 일치만 인정
+    if len(keyword) < 2:
+        return 0.0
+    if keyword in token:
+        return 0.95
+    if len(keyword) >= 3:
+        # 조사가 붙은 오타(카테고라별)도 잡도록 키워드 길이만큼 앞부분 비교
+        ratio = SequenceMatcher(None, token[:len(keyword)], keyword).ratio()
+        if ratio >= fuzzy_ratio:
+            return ratio
+    return 0.0
+
+
+class FastPathMatcher:
+    """질문을 탭별 패턴/스키마 카탈로그와 대조해 확신할 수 있으면 LLM 없이 SQL 생성
+
+    - 패턴 매칭: 키워드 그룹이 모두 있고 필요한 슬롯(연도 등)이 추출되면 후보
+    - 카탈로그 매칭: "<차원>별 <측정값>" 형태면 GROUP BY 쿼리 생성
+    - 신뢰도 = 키워드 일치 점수(오타 감점) x 질문 내 설명된 단어 비율 (모르는 단어가 많으면 LLM으로)
+    """
+
+    def __init__(
+        self,
+        patterns: Dict[str, List[Dict[str, Any]]],
+        catalog: Dict[str, Dict[str, Any]],
+        threshold: float = 0.8,
+        fuzzy_ratio: float = 0.75,
+    ):
+        self.patterns = patterns
+        self.catalog = catalog
+        self.threshold = threshold
+        self.fuzzy_ratio = fuzzy_ratio
+        self._llm_latencies = deque(maxlen=200)
+        self._match_ms = deque(maxlen=1000)
+        self.stats = {"questions": 0, "hits": 0, "misses": 0, "fallbacks": 0, "saved_ms_total": 0.0}
+        self.intent_hits: Dict[str, int] = {}
+
+    # ---------- 매칭 ----------
+
+    def _find(self, tokens: List[str], keywords: List[str]) -> Tuple[float, set]:
+        """키워드 중 가장 잘 맞는 토큰의 점수와 설명된 토큰 위치"""
+        best, matched = 0.0, set()
+        for i, token in enumerate(tokens):
+            for keyword in keywords:
+                score = keyword_score(token, keyword, self.fuzzy_ratio)
+                if score:
+                    matched.add(i)
+                    best = max(best, score)
+        return best, matched
+
+    @staticmethod
+    def _slots(question: str) -> Dict[str, Any]:
+        """연도/상위 N 슬롯 추출 (연도가 여러 개면 비교 질문이므로 추출하지 않음)"""
+        slots = {}
+        years = set(_YEAR_PATTERN.findall(question))
+        if len(years) == 1:
+            slots["year"] = int(years.pop())
+        elif len(years) > 1:
+            slots["ambiguous_year"] = True
+        top = _TOP_N_PATTERN.search(question.lower())
+        if top:
+            slots["n"] = int(top.group(1) or top.group(2))
+        return slots
+
+    def _coverage(self, tokens: List[str], explained: set, slots: Dict[str, Any]) -> float:
+        """불용어를 뺀 단어 중 패턴/카탈로그/슬롯으로 설명된 비율"""
+        slot_values = {str(v) for k, v in slots.items() if k in ("year", "n")}
+        content = [i for i, t in enumerate(tokens) if t not in STOP_WORDS]
+        if not content:
+            return 0.0
+        covered = sum(1 for i in content if i in explained or tokens[i] in slot_values)
+        return covered / len(content)
+
+    def _confidence(self, score: float, tokens: List[str], explained: set, slots: Dict[str, Any]) -> float:
+        """키워드 일치 점수(오타는 감점)와 설명된 단어 비율을 결합"""
+        return (0.5 + 0.5 * score) * self._coverage(tokens, explained, slots)
+
+    def _chart_type(self, tokens: List[str], explained: set) -> Optional[str]:
+        for chart_type, words in CHART_WORDS.items():
+            score, matched = self._find(tokens, words)
+            if score:
+                explained |= matched
+                return chart_type
+        return None
+
+    def _match_pattern(self, pattern: Dict[str, Any], tokens: List[str], slots: Dict[str, Any],
+                       table_name: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if slots.get("ambiguous_year") or any(slot not in slots for slot in pattern["requires"]):
+            return None
+        explained: set = set()
+        scores = []
+        for group in pattern["keywords"]:
+            score, matched = self._find(tokens, group)
+            if not score:
+                return None
+            scores.append(score)
+            explained |= matched
+        explained |= self._find(tokens, pattern["optional"])[1]
+        chart_type = self._chart_type(tokens, explained) or pattern["chart_type"]
+        confidence = self._confidence(min(scores), tokens, explained, slots)
+
+        values = {**pattern["defaults"], **{k: v for k, v in slots.items() if k in ("year", "n")}, "table": table_name}
+        return confidence, {
+            "chart_request": 1,
+            "sql_query": pattern["sql"].format(**values),
+            "chart_type": chart_type,
+            "description": pattern["description"].format(**values),
+            "intent": pattern["id"],
+        }
+
+    def _label(self, column: str) -> str:
+        return (self.catalog.get(column, {}).get("aliases") or [column])[0]
+
+    def _match_catalog(self, tokens: List[str], slots: Dict[str, Any], table_name: str,
+                       columns: List[str]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """스키마 카탈로그 기반 "<차원>별 <집계> <측정값>" GROUP BY 쿼리"""
+        if slots.get("ambiguous_year"):
+            return None
+        explained: set = set()
+        found = {"dimension": [], "measure": []}
+        for column in columns:
+            spec = self.catalog.get(column, {"aliases": [], "role": None})
+            score, matched = self._find(tokens, [column] + spec["aliases"])
+            if score and spec.get("role") in found:
+                found[spec["role"]].append((score, column, matched))
+                explained |= matched
+
+        aggregate, agg_score = None, 1.0
+        for func, words in AGGREGATE_WORDS.items():
+            score, matched = self._find(tokens, words)
+            if score:
+                if aggregate:
+                    return None
+                aggregate, agg_score = func, score
+                explained |= matched
+
+        # 측정값은 하나 이하, 차원은 하나일 때만 확신
+        # ("카테고리별 제품 수"처럼 차원이 여럿이면 "~별"/by 가 붙은 차원으로 묶고 나머지는 개수 대상)
+        if len(found["measure"]) > 1 or not found["dimension"]:
+            return None
+        dimensions = found["dimension"]
+        if len(dimensions) > 1:
+            grouped = [d for d in dimensions if any(
+                tokens[i].endswith("별") or (i > 0 and tokens[i - 1] in ("by", "per")) for i in d[2]
+            )]
+            if len(grouped) != 1 or found["measure"] or aggregate != "COUNT":
+                return None
+            dimensions = grouped
+        dim_score, dimension, _ = dimensions[0]
+
+        if found["measure"]:
+            measure_score, measure, _ = found["measure"][0]
+            aggregate = aggregate or self.catalog.get(measure, {}).get("aggregate", "SUM")
+            measure_label = self._label(measure)
+            if aggregate == "COUNT":
+                measure_expr, alias = f"COUNT({measure})", f"{measure}_count"
+                label = f"{measure_label} 개수"
+            else:
+                measure_expr, alias = f"{aggregate}({measure})", f"{_AGGREGATE_PREFIX[aggregate]}_{measure}"
+                label = f"{_AGGREGATE_LABELS[aggregate]} {measure_label}"
+        elif aggregate == "COUNT":
+            measure_score, measure_expr, alias, label = 1.0, "COUNT(*)", "count", "건수"
+        else:
+            # 측정값도 개수 요청도 없으면 무엇을 집계할지 알 수 없음
+            return None
+
+        where = ""
+        if "year" in slots and dimension != "year" and "year" in columns:
+            where = f" WHERE year = {slots['year']}"
+        temporal = self.catalog.get(dimension, {}).get("temporal", False)
+        order = dimension if temporal else f"{alias} DESC"
+        chart_type = self._chart_type(tokens, explained) or ("line" if temporal else "bar")
+        confidence = self._confidence(min(dim_score, measure_score, agg_score), tokens, explained, slots)
+
+        prefix = f"{slots['year']}년 " if where else ""
+        return confidence, {
+            "chart_request": 1,
+            "sql_query": f"SELECT {dimension}, {measure_expr} AS {alias} FROM {table_name}{where} "
+                         f"GROUP BY {dimension} ORDER BY {order}",
+            "chart_type": chart_type,
+            "description": f"{prefix}{self._label(dimension)}별 {label}{_object_particle(label)} 분석했습니다.",
+            "intent": f"catalog:{dimension}:{alias}",
+        }
+
+    def match(self, question: str, tab_id: str, table_name: str,
+              table_info: List[Dict]) -> Optional[Dict[str, Any]]:
+        """확신할 수 있는 매칭이면 LLM 응답과 같은 형식의 결과, 아니면 None"""
+        start = time.perf_counter()
+        self.stats["questions"] += 1
+        tokens = tokenize(question)
+        slots = self._slots(question)
+        columns = [c["name"].lower() for c in table_info]
+
+        candidates = []
+        for pattern in self.patterns.get(tab_id, []):
+            candidate = self._match_pattern(pattern, tokens, slots, table_name)
+            if candidate:
+                candidates.append(candidate)
+        candidate = self._match_catalog(tokens, slots, table_name, columns)
+        if candidate:
+            candidates.append(candidate)
+
+        best = max(candidates, key=lambda c: c[0], default=None)
+        self._match_ms.append((time.perf_counter() - start) * 1000)
+        if best is None or best[0] < self.threshold:
+            self.stats["misses"] += 1
+            return None
+
+        confidence, result = best
+        result["confidence"] = round(confidence, 3)
+        return result
+
+    # ---------- 지표 ----------
+
+    def record_hit(self, intent: str):
+        """빠른 경로 응답 성공 - 평균 LLM 지연만큼 절약한 것으로 집계"""
+        self.stats["hits"] += 1
+        self.intent_hits[intent] = self.intent_hits.get(intent, 0) + 1
+        if self._llm_latencies:
+            self.stats["saved_ms_total"] += sum(self._llm_latencies) / len(self._llm_latencies)
+
+    def record_fallback(self):
+        """매칭은 됐지만 SQL 실행/차트 변환에 실패해 LLM으로 넘긴 경우"""
+        self.stats["fallbacks"] += 1
+
+    def record_llm_latency(self, seconds: float):
+        self._llm_latencies.append(seconds * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        questions = self.stats["questions"]
+        return {
+            **self.stats,
+            "saved_ms_total": round(self.stats["saved_ms_total"], 1),
+            "hit_rate": round(self.stats["hits"] / questions, 4) if questions else 0.0,
+            "threshold": self.threshold,
+            "avg_match_ms": round(sum(self._match_ms) / len(self._match_ms), 3) if self._match_ms else 0.0,
+            "avg_llm_ms": round(sum(self._llm_latencies) / len(self._llm_latencies), 1) if self._llm_latencies else None,
+            "intents": dict(sorted(self.intent_hits.items(), key=lambda x: -x[1])),
+        }
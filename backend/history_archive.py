@@ -0,0 +1,340 @@
+# history_archive.py - 오래된 쿼리 히스토리 보관 (월별 압축 JSONL 세그먼트로 압축 보관, 조회/검색/복원 가능)
+#
+# user_data/{사용자}/archive/{YYYY-MM}.jsonl.zst  한 달치 보관 레코드 (zstandard 가 없으면 .jsonl.gz)
+# user_data/{사용자}/archive/manifest.json        세그먼트 목록과 쿼리 ID -> 월 (조회/복원 시 세그먼트 찾기)
+# user_data/{사용자}/archive/.lock                사용자별 보관 작업 락 (프리셋 저장과 보관이 엇갈리지 않게)
+#
+# 프리셋이 참조하는 쿼리는 보관하지 않는다. 세그먼트는 임시 파일 작성 후 교체하고 원본 파일은 그 다음에 지우므로
+# 중간에 죽어도 레코드가 사라지지 않는다 (양쪽에 남은 레코드는 다음 실행에서 다시 합쳐짐).
+import fcntl
+import gzip
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from json_store import atomic_write_json, fsync_dir
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "archive"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+RUN_LOCK_FILE = ".archive.lock"  # user_data/ 아래, 워커 중 하나만 전체 보관 실행
+SEGMENT_SUFFIXES = (".jsonl.zst", ".jsonl.gz")
+
+
+def read_segment(path: Path) -> List[Dict[str, Any]]:
+    """세그먼트 파일의 레코드 목록"""
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard 가 설치되어 있지 않아 {path.name} 을 읽을 수 없습니다")
+        with open(path, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).read()
+    else:
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+
+def write_segment(path: Path, records: List[Dict[str, Any]]):
+    """세그먼트 원자적 교체 (임시 파일 -> fsync -> rename)"""
+    data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        if path.name.endswith(".zst"):
+            f.write(zstandard.ZstdCompressor(level=10).compress(data))
+        else:
+            with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                gz.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(path.parent)
+
+
+def _record_time(record: Dict[str, Any], fallback: float) -> float:
+    """보관 기준 시각 - 생성 시각과 복원 시각 중 나중 (복원한 레코드가 바로 다시 보관되지 않게)"""
+    times = []
+    for key in ("timestamp", "restored_at"):
+        try:
+            times.append(datetime.fromisoformat(record[key]).timestamp())
+        except (KeyError, TypeError, ValueError):
+            pass
+    return max(times) if times else fallback
+
+
+def _id_time(query_id: str) -> Optional[float]:
+    """쿼리 ID 앞부분 (YYYYMMDD_HHMMSS) 의 시각 - 파일을 열지 않고 후보를 거르는 데 사용"""
+    try:
+        return datetime.strptime(query_id[:15], "%Y%m%d_%H%M%S").timestamp()
+    except ValueError:
+        return None
+
+
+class HistoryArchiver:
+    """보존 기간이 지난 쿼리 파일을 월별 압축 세그먼트로 보관
+
+    보존 기간(일)은 사용자별 > 탭별 > 기본값 순으로 적용하고, 0 이하면 보관하지 않는다.
+    """
+
+    def __init__(self, user_data_path: Path, default_days: float = 180,
+                 user_days: Optional[Dict[str, float]] = None, tab_days: Optional[Dict[str, float]] = None):
+        self.user_data_path = Path(user_data_path)
+        self.default_days = default_days
+        self.user_days = user_days or {}
+        self.tab_days = tab_days or {}
+        self.suffix = SEGMENT_SUFFIXES[0] if zstandard is not None else SEGMENT_SUFFIXES[1]
+        self._manifest_cache: Dict[str, Any] = {}
+        self.stats = {"runs": 0, "archived": 0, "restored": 0, "protected": 0, "archive_reads": 0,
+                      "last_run": None, "last_run_seconds": None}
+
+    def archive_path(self, username: str) -> Path:
+        return self.user_data_path / username / ARCHIVE_DIR
+
+    def retention_days(self, username: str, tab_id: Optional[str]) -> float:
+        if username in self.user_days:
+            return self.user_days[username]
+        if tab_id in self.tab_days:
+            return self.tab_days[tab_id]
+        return self.default_days
+
+    @contextmanager
+    def user_lock(self, username: str):
+        """사용자별 보관 작업 락 (여러 워커 사이에서도 유효한 flock)"""
+        archive_path = self.archive_path(username)
+        archive_path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(archive_path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def manifest(self, username: str) -> Dict[str, Any]:
+        """보관 manifest (mtime 이 그대로면 캐시 사용)"""
+        path = self.archive_path(username) / MANIFEST_FILE
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {"segments": {}, "ids": {}}
+        cached = self._manifest_cache.get(username)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._manifest_cache[username] = (mtime, manifest)
+        return manifest
+
+    def archived_ids(self, username: str) -> Set[str]:
+        return set(self.manifest(username)["ids"])
+
+    def preset_references(self, username: str) -> Set[str]:
+        """사용자 프리셋이 참조하는 쿼리 ID"""
+        refs = set()
+        for preset_file in (self.user_data_path / username / "presets").glob("preset_*.json"):
+            try:
+                with open(preset_file, "r", encoding="utf-8") as f:
+                    preset = json.load(f)
+                for chart in preset.get("grid_config", {}).get("charts", []):
+                    source = chart.get("source", {})
+                    if source.get("type") == "query_reference" and source.get("query_id"):
+                        refs.add(source["query_id"])
+            except (OSError, ValueError) as e:
+                # 참조를 확인할 수 없으면 이번 실행에서는 이 사용자를 보관하지 않음
+                raise RuntimeError(f"프리셋을 읽을 수 없어 보관을 건너뜁니다: {preset_file} ({e})")
+        return refs
+
+    def _segment_file(self, username: str, month: str) -> Optional[Path]:
+        for suffix in SEGMENT_SUFFIXES:
+            path = self.archive_path(username) / f"{month}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _rewrite_month(self, username: str, month: str, records: Dict[str, Dict[str, Any]],
+                       manifest: Dict[str, Any]):
+        """한 달치 세그먼트를 records 로 교체 (형식이 바뀌었으면 이전 형식 파일 삭제)"""
+        old = self._segment_file(username, month)
+        if records:
+            path = self.archive_path(username) / f"{month}{self.suffix}"
+            ordered = sorted(records.values(), key=lambda r: r.get("timestamp") or "")
+            write_segment(path, ordered)
+            manifest["segments"][month] = {"file": path.name, "count": len(ordered),
+                                           "bytes": path.stat().st_size}
+        else:
+            path = None
+            manifest["segments"].pop(month, None)
+        if old and old != path:
+            old.unlink(missing_ok=True)
+
+    def archive_user(self, username: str, now: Optional[float] = None, dry_run: bool = False) -> Dict[str, int]:
+        """사용자 한 명의 보존 기간 지난 쿼리 보관"""
+        now = now or time.time()
+        queries_path = self.user_data_path / username / "queries"
+        days = [self.default_days, self.user_days.get(username, 0), *self.tab_days.values()]
+        positive = [d for d in days if d > 0]
+        if not queries_path.exists() or not positive:
+            return {"archived": 0, "protected": 0}
+        # 가장 짧은 보존 기간보다 새 파일은 열어 보지 않음
+        min_age = min(positive) * 86400
+
+        candidates = [
+            query_file for query_file in sorted(queries_path.glob("*.json"))
+            if now - (_id_time(query_file.stem) or query_file.stat().st_mtime) >= min_age
+        ]
+        if not candidates:
+            return {"archived": 0, "protected": 0}
+
+        with self.user_lock(username):
+            protected = self.preset_references(username)
+            by_month: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            files: List[Path] = []
+            counts = {"archived": 0, "protected": 0}
+            for query_file in candidates:
+                query_id = query_file.stem
+                if query_id in protected:
+                    counts["protected"] += 1
+                    continue
+                try:
+                    with open(query_file, "r", encoding="utf-8") as f:
+                        record = json.load(f)
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    logger.warning("⚠️ 보관 대상 파일을 읽지 못했습니다: %s (%s)", query_file, e)
+                    continue
+                retention = self.retention_days(username, record.get("tab_id"))
+                if retention <= 0 or now - _record_time(record, query_file.stat().st_mtime) < retention * 86400:
+                    continue
+                month = (record.get("timestamp") or "")[:7] or datetime.fromtimestamp(
+                    query_file.stat().st_mtime).strftime("%Y-%m")
+                by_month.setdefault(month, {})[query_id] = record
+                files.append(query_file)
+            counts["archived"] = len(files)
+            if dry_run or not files:
+                return counts
+
+            manifest = json.loads(json.dumps(self.manifest(username)))
+            for month, records in by_month.items():
+                segment = self._segment_file(username, month)
+                merged = {r["id"]: r for r in read_segment(segment)} if segment else {}
+                merged.update(records)
+                self._rewrite_month(username, month, merged, manifest)
+                manifest["ids"].update({query_id: month for query_id in records})
+            atomic_write_json(self.archive_path(username) / MANIFEST_FILE, manifest, indent=None)
+            for query_file in files:
+                query_file.unlink(missing_ok=True)
+        logger.info("🗄️ %s 히스토리 %d건 보관 (%s), 프리셋 참조로 제외 %d건",
+                    username, counts["archived"], ", ".join(sorted(by_month)), counts["protected"])
+        return counts
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """전체 사용자 보관 (사용자별 실패는 기록하고 계속). 다른 워커가 실행 중이면 skipped"""
+        if not self.user_data_path.exists():
+            return {"users": 0, "archived": 0, "protected": 0, "errors": {}}
+        fd = os.open(self.user_data_path / RUN_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {"skipped": True}
+            try:
+                return self._run(dry_run)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _run(self, dry_run: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        summary = {"users": 0, "archived": 0, "protected": 0, "errors": {}}
+        for user_path in sorted(p for p in self.user_data_path.iterdir() if p.is_dir()):
+            try:
+                counts = self.archive_user(user_path.name, dry_run=dry_run)
+            except Exception as e:
+                summary["errors"][user_path.name] = str(e)
+                logger.warning("⚠️ %s 히스토리 보관 실패: %s", user_path.name, e)
+                continue
+            summary["users"] += 1
+            summary["archived"] += counts["archived"]
+            summary["protected"] += counts["protected"]
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        summary["dry_run"] = dry_run
+        if not dry_run:
+            self.stats["archived"] += summary["archived"]
+            self.stats["protected"] = summary["protected"]  # 마지막 실행 기준
+            self.stats["runs"] += 1
+            self.stats["last_run"] = datetime.now().isoformat()
+            self.stats["last_run_seconds"] = summary["seconds"]
+        return summary
+
+    def load_many(self, username: str, query_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """보관된 레코드 조회 (세그먼트는 월별로 한 번씩만 읽음)"""
+        ids_by_month: Dict[str, Set[str]] = {}
+        month_of = self.manifest(username)["ids"]
+        for query_id in query_ids:
+            if query_id in month_of:
+                ids_by_month.setdefault(month_of[query_id], set()).add(query_id)
+        records = []
+        for month, ids in ids_by_month.items():
+            segment = self._segment_file(username, month)
+            if segment:
+                self.stats["archive_reads"] += 1
+                records.extend(r for r in read_segment(segment) if r["id"] in ids)
+        return records
+
+    def load(self, username: str, query_id: str) -> Optional[Dict[str, Any]]:
+        records = self.load_many(username, [query_id])
+        return records[0] if records else None
+
+    def restore(self, username: str, query_ids: Iterable[str], locked: bool = False) -> List[str]:
+        """보관된 레코드를 queries/ 로 되돌림 (복원 시각부터 보존 기간을 다시 셈), 복원한 ID 반환
+
+        locked: 이미 user_lock 을 잡은 호출자 (flock 은 같은 프로세스에서도 다시 잡으면 막힘)
+        """
+        with (nullcontext() if locked else self.user_lock(username)):
+            manifest = json.loads(json.dumps(self.manifest(username)))
+            wanted = [query_id for query_id in query_ids if query_id in manifest["ids"]]
+            if not wanted:
+                return []
+            queries_path = self.user_data_path / username / "queries"
+            queries_path.mkdir(parents=True, exist_ok=True)
+            months = {manifest["ids"][query_id] for query_id in wanted}
+            restored_at = datetime.now().isoformat()
+            for month in months:
+                segment = self._segment_file(username, month)
+                remaining = {r["id"]: r for r in read_segment(segment)} if segment else {}
+                for query_id in wanted:
+                    record = remaining.pop(query_id, None)
+                    if record is not None and manifest["ids"].get(query_id) == month:
+                        atomic_write_json(queries_path / f"{query_id}.json", {**record, "restored_at": restored_at})
+                self._rewrite_month(username, month, remaining, manifest)
+            for query_id in wanted:
+                manifest["ids"].pop(query_id, None)
+            atomic_write_json(self.archive_path(username) / MANIFEST_FILE, manifest, indent=None)
+        self.stats["restored"] += len(wanted)
+        logger.info("📤 %s 보관 히스토리 %d건 복원", username, len(wanted))
+        return wanted
+
+    def list_segments(self, username: str) -> Dict[str, Any]:
+        return self.manifest(username)["segments"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "default_days": self.default_days,
+            "user_days": self.user_days,
+            "tab_days": self.tab_days,
+            "compression": "zstd" if self.suffix.endswith(".zst") else "gzip",
+            **self.stats,
+        }
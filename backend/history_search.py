@@ -0,0 +1,314 @@
+# history_search.py - 사용자별 쿼리 히스토리 검색 인덱스 (한글 n-gram 역색인 + 패싯)
+#
+# 사용자마다 SQLite 파일 하나 (user_data/{사용자}/history_search.db)
+#   docs      검색 결과/패싯용 메타데이터 (tab_id, chart_type, chart_generated, 날짜)
+#   postings  (토큰, 문서, 가중치) 역색인
+# 한글은 형태소 분석 없이 음절 unigram + bigram 으로 색인하므로 조사가 붙은 단어("매출을")도
+# 검색어("매출")의 bigram 으로 찾을 수 있다. 영문/숫자는 단어 단위 (SQL 의 total_sales -> total, sales).
+# 여러 워커가 같은 파일에 쓰므로 WAL 모드와 busy_timeout 으로 동시 쓰기를 직렬화한다.
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "history_search.db"
+
+# 필드별 가중치 (질문에서 일치하면 설명/SQL 보다 높게)
+FIELD_WEIGHTS = {"question": 3.0, "description": 1.0, "sql": 1.0}
+
+_HANGUL_RUN = re.compile(r"[가-힣]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# 일치 집합에서 읽는 열 (doc, timestamp, tab_id, chart_type, chart_generated, day) + 점수
+_MATCH_COLUMNS = "d.doc, d.timestamp, d.tab_id, d.chart_type, d.chart_generated, d.day"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    timestamp TEXT,
+    day TEXT,
+    tab_id TEXT,
+    chart_type TEXT,
+    chart_generated INTEGER,
+    question TEXT,
+    description TEXT,
+    sql TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_timestamp ON docs (timestamp);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+"""
+
+
+def _normalize(text: Optional[str]) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """색인용 토큰: 한글은 음절 unigram + bigram, 영문/숫자는 단어"""
+    text = _normalize(text)
+    tokens: List[str] = []
+    for run in _HANGUL_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD.findall(text))
+    return tokens
+
+
+def query_terms(text: Optional[str]) -> List[str]:
+    """검색어 토큰 (모두 포함한 문서만 일치): 한글 2음절 이상은 bigram, 1음절은 unigram"""
+    text = _normalize(text)
+    terms: List[str] = []
+    for run in _HANGUL_RUN.findall(text):
+        terms.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    terms.extend(_WORD.findall(text))
+    return list(dict.fromkeys(terms))
+
+
+def document_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """쿼리 히스토리 레코드에서 색인할 필드 추출"""
+    response = record.get("response") or {}
+    chart_config = response.get("chart_config") or {}
+    timestamp = record.get("timestamp") or ""
+    return {
+        "id": record["id"],
+        "timestamp": timestamp,
+        "day": timestamp[:10],
+        "tab_id": record.get("tab_id"),
+        "chart_type": response.get("chart_type") or chart_config.get("type"),
+        "chart_generated": 1 if record.get("chart_generated") else 0,
+        "question": record.get("question") or "",
+        "description": response.get("description") or "",
+        "sql": response.get("sql_query") or "",
+    }
+
+
+def _term_weights(fields: Dict[str, Any]) -> Dict[str, float]:
+    """토큰별 가중치 = 필드 가중치 x (1 + log(필드 내 출현 수)) 합"""
+    weights: Dict[str, float] = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term, count in Counter(tokenize(fields[field])).items():
+            weights[term] = weights.get(term, 0.0) + field_weight * (1 + math.log(count))
+    return weights
+
+
+class HistorySearch:
+    """사용자별 히스토리 검색 인덱스 (연결은 최근 사용한 max_open 명만 열어 둠)
+
+    load_record: 디스크에서 읽은 히스토리 레코드를 색인 가능한 형태로 바꾸는 함수 (예: 라이브러리 참조 해석)
+    archive: 보관된 레코드 제공자 (archived_ids(사용자), load_many(사용자, ID 목록)) - 보관된 기록도 계속 검색됨
+    """
+
+    def __init__(self, user_data_path: Path, max_open: int = 64,
+                 load_record: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 archive: Any = None):
+        self.user_data_path = Path(user_data_path)
+        self.max_open = max_open
+        self.load_record = load_record or (lambda record: record)
+        self.archive = archive
+        self._conns: "OrderedDict[str, sqlite3.Connection]" = OrderedDict()
+        self._synced: set = set()
+        self._lock = threading.RLock()
+        self.stats = {"searches": 0, "indexed": 0, "synced": 0, "search_ms_total": 0.0}
+
+    def _connect(self, username: str) -> sqlite3.Connection:
+        conn = self._conns.get(username)
+        if conn is not None:
+            self._conns.move_to_end(username)
+            return conn
+        user_path = self.user_data_path / username
+        user_path.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(user_path / INDEX_FILE, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conns[username] = conn
+        while len(self._conns) > self.max_open:
+            _, evicted = self._conns.popitem(last=False)
+            evicted.close()
+        return conn
+
+    @staticmethod
+    def _index(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            fields = document_fields(record)
+            row = conn.execute("SELECT doc FROM docs WHERE id = ?", (fields["id"],)).fetchone()
+            if row:
+                conn.execute("DELETE FROM postings WHERE doc = ?", (row[0],))
+                conn.execute("DELETE FROM docs WHERE doc = ?", (row[0],))
+            doc = conn.execute(
+                "INSERT INTO docs (id, timestamp, day, tab_id, chart_type, chart_generated, question, description, sql) "
+                "VALUES (:id, :timestamp, :day, :tab_id, :chart_type, :chart_generated, :question, :description, :sql)",
+                fields,
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO postings (term, doc, weight) VALUES (?, ?, ?)",
+                [(term, doc, weight) for term, weight in _term_weights(fields).items()],
+            )
+            count += 1
+        return count
+
+    def add(self, username: str, records: List[Dict[str, Any]]):
+        """저장된 히스토리 레코드를 색인에 추가 (같은 ID 는 교체)"""
+        with self._lock:
+            conn = self._connect(username)
+            with conn:
+                self.stats["indexed"] += self._index(conn, records)
+
+    def remove(self, username: str, query_ids: List[str]):
+        """색인에서 제거"""
+        with self._lock:
+            conn = self._connect(username)
+            with conn:
+                for query_id in query_ids:
+                    conn.execute("DELETE FROM postings WHERE doc = (SELECT doc FROM docs WHERE id = ?)", (query_id,))
+                    conn.execute("DELETE FROM docs WHERE id = ?", (query_id,))
+
+    def sync(self, username: str) -> Dict[str, int]:
+        """queries/ 디렉터리(와 보관 세그먼트)와 색인을 맞춤 (색인 도입 전 기록이나 색인 실패분 추가, 사라진 기록 제거)"""
+        queries_path = self.user_data_path / username / "queries"
+        on_disk = {p.stem: p for p in queries_path.glob("*.json")} if queries_path.exists() else {}
+        archived = self.archive.archived_ids(username) - on_disk.keys() if self.archive else set()
+        with self._lock:
+            conn = self._connect(username)
+            indexed = {row[0] for row in conn.execute("SELECT id FROM docs")}
+            missing = [on_disk[query_id] for query_id in on_disk.keys() - indexed]
+            records = []
+            for path in missing:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        records.append(self.load_record(json.load(f)))
+                except (OSError, ValueError) as e:
+                    logger.warning("⚠️ 히스토리 파일을 읽지 못해 색인하지 않습니다: %s (%s)", path, e)
+            if archived - indexed:
+                records.extend(self.load_record(r) for r in self.archive.load_many(username, archived - indexed))
+            stale = list(indexed - on_disk.keys() - archived)
+            with conn:
+                added = self._index(conn, records)
+            if stale:
+                self.remove(username, stale)
+            self._synced.add(username)
+            self.stats["synced"] += 1
+        if added or stale:
+            logger.info("🔎 %s 히스토리 색인 동기화: %d건 추가, %d건 제거", username, added, len(stale))
+        return {"added": added, "removed": len(stale)}
+
+    def search(self, username: str, q: str = "", tab_id: Optional[str] = None,
+               chart_type: Optional[str] = None, chart_generated: Optional[bool] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """검색어(모든 토큰 포함)와 패싯 조건으로 검색. 검색어가 없으면 조건에 맞는 최신순
+
+        반환: total, results(점수/최신순), facets(tab_id/chart_type/chart_generated/month 별 건수), took_ms
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if username not in self._synced:
+                self.sync(username)
+            conn = self._connect(username)
+
+            where, params = [], []
+            for column, value in (("tab_id", tab_id), ("chart_type", chart_type)):
+                if value:
+                    where.append(f"d.{column} = ?")
+                    params.append(value)
+            if chart_generated is not None:
+                where.append("d.chart_generated = ?")
+                params.append(1 if chart_generated else 0)
+            if date_from:
+                where.append("d.day >= ?")
+                params.append(date_from[:10])
+            if date_to:
+                where.append("d.day <= ?")
+                params.append(date_to[:10])
+
+            terms = query_terms(q)
+            if terms:
+                # idf = log(1 + N / df), 한 토큰이라도 색인에 없으면 결과 없음
+                total_docs = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+                placeholders = ", ".join("?" * len(terms))
+                df = dict(conn.execute(
+                    f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+                ).fetchall())
+                if len(df) < len(terms):
+                    return self._finish(start, 0, [], {}, terms)
+                values = ", ".join("(?, ?)" for _ in terms)
+                source = (
+                    f"WITH q(term, idf) AS (VALUES {values}), "
+                    "hits AS (SELECT p.doc, SUM(p.weight * q.idf) AS score FROM postings p "
+                    "JOIN q ON q.term = p.term GROUP BY p.doc HAVING COUNT(*) = ?) "
+                    f"SELECT {_MATCH_COLUMNS}, hits.score FROM hits JOIN docs d ON d.doc = hits.doc"
+                )
+                source_params = [v for t in terms for v in (t, math.log(1 + total_docs / df[t]))] + [len(terms)]
+            else:
+                source = f"SELECT {_MATCH_COLUMNS}, 0.0 FROM docs d"
+                source_params = []
+            if where:
+                source += " WHERE " + " AND ".join(where)
+
+            # 일치 집합은 한 번만 계산하고 건수/패싯/정렬은 메타데이터 열로 처리, 본문은 현재 페이지만 읽음
+            matched = conn.execute(source, source_params + params).fetchall()
+            matched.sort(key=lambda m: (m[6], m[1] or ""), reverse=True)
+            facets = {
+                "tab_id": Counter(m[2] for m in matched),
+                "chart_type": Counter(m[3] for m in matched),
+                "chart_generated": Counter(bool(m[4]) for m in matched),
+                "month": Counter(m[5][:7] for m in matched),
+            }
+            facets = {name: dict(counts.most_common()) for name, counts in facets.items()}
+            page = matched[offset:offset + limit]
+            bodies = {}
+            if page:
+                bodies = {
+                    row[0]: row[1:]
+                    for row in conn.execute(
+                        f"SELECT doc, id, question, description FROM docs WHERE doc IN ({', '.join('?' * len(page))})",
+                        [m[0] for m in page],
+                    )
+                }
+            results = [
+                {
+                    "id": bodies[m[0]][0],
+                    "timestamp": m[1],
+                    "tab_id": m[2],
+                    "chart_type": m[3],
+                    "chart_generated": bool(m[4]),
+                    "question": bodies[m[0]][1],
+                    "description": bodies[m[0]][2][:200],
+                    "score": round(m[6], 3),
+                }
+                for m in page
+            ]
+            total = len(matched)
+        return self._finish(start, total, results, facets, terms)
+
+    def _finish(self, start: float, total: int, results: List[Dict[str, Any]],
+                facets: Dict[str, Any], terms: List[str]) -> Dict[str, Any]:
+        took_ms = (time.perf_counter() - start) * 1000
+        self.stats["searches"] += 1
+        self.stats["search_ms_total"] += took_ms
+        return {"total": total, "results": results, "facets": facets, "terms": terms, "took_ms": round(took_ms, 2)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        searches = self.stats["searches"]
+        return {
+            **self.stats,
+            "search_ms_avg": round(self.stats["search_ms_total"] / searches, 2) if searches else 0.0,
+            "open_indexes": len(self._conns),
+        }
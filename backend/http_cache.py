@@ -0,0 +1,237 @@
+# http_cache.py - 응답 압축(gzip/brotli 협상)과 조건부 GET (ETag / Last-Modified)
+#
+# - CompressionMiddleware: Accept-Encoding 을 보고 br(brotli 설치 시) 또는 gzip 으로 압축 (최소 크기 이상, SSE 제외)
+#   ETag 가 있는 응답은 압축 결과를 (인코딩, 본문 digest) 로 캐시해 같은 대시보드를 여러 번 열어도 다시 압축하지 않음
+#   (약한 ETag 가 같아도 본문이 조금 다를 수 있으므로 본문 기준 - 해시는 압축보다 훨씬 쌈)
+# - 검증자는 모두 약한 ETag (W/"...") - 압축 여부가 달라도 같은 내용이면 같은 검증자로 비교
+# - conditional_response: If-None-Match (우선) / If-Modified-Since 가 맞으면 304 응답, 아니면 캐시 헤더만 설정
+import email.utils
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 압축할 Content-Type (text/event-stream 은 스트림이 끝나지 않으므로 제외)
+_COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(timestamp: float) -> str:
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[float]) -> bool:
+    """If-None-Match(약한 비교)가 있으면 그것만, 없으면 If-Modified-Since 로 판단"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def conditional_response(request: Request, response: Response, etag: str, last_modified: Optional[float] = None,
+                         cache_control: str = "no-cache") -> Optional[Response]:
+    """검증자가 맞으면 304 응답 반환, 아니면 응답 헤더(ETag/Last-Modified/Cache-Control)만 설정하고 None"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if request.method in ("GET", "HEAD") and is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Accept-Encoding 의 q 값이 가장 높은 인코딩 (같으면 encodings 순서), 받을 수 있는 것이 없으면 None"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class ResponseCompressor:
+    """압축 설정, 압축 결과 캐시, 통계 (CompressionMiddleware 가 사용, 통계 조회용으로 따로 둠)"""
+
+    def __init__(self, encodings: Tuple[str, ...] = ("br", "gzip"), minimum_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4, cache_size: int = 128):
+        # brotli 가 없으면 br 은 협상하지 않음
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and brotli is not None)]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self.stats = {"responses": 0, "compressed": 0, "skipped_small": 0, "cache_hits": 0,
+                      "bytes_in": 0, "bytes_out": 0, "by_encoding": {}}
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def stream_compressor(self, encoding: str):
+        """스트리밍 응답용 (청크마다 flush)"""
+        if encoding == "br":
+            return brotli.Compressor(quality=self.brotli_quality)
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+
+    def cached_compress(self, encoding: str, body: bytes, cacheable: bool) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest()) if cacheable else None
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self._cache[key]
+        compressed = self.compress(encoding, body)
+        if key is not None and self.cache_size > 0:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def record(self, encoding: str, size_in: int, size_out: int):
+        self.stats["compressed"] += 1
+        self.stats["bytes_in"] += size_in
+        self.stats["bytes_out"] += size_out
+        self.stats["by_encoding"][encoding] = self.stats["by_encoding"].get(encoding, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        bytes_in = self.stats["bytes_in"]
+        return {
+            "encodings": self.encodings,
+            "minimum_size": self.minimum_size,
+            "cache_entries": len(self._cache),
+            **self.stats,
+            "ratio": round(self.stats["bytes_out"] / bytes_in, 4) if bytes_in else None,
+        }
+
+
+class CompressionMiddleware:
+    """gzip/brotli 응답 압축 (ASGI)"""
+
+    def __init__(self, app, compressor: ResponseCompressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.compressor.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.compressor.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, self.compressor, encoding, scope)(receive, send)
+
+
+class _CompressionResponder:
+    """응답 시작 메시지를 첫 본문 청크가 올 때까지 보류했다가 압축 여부를 결정"""
+
+    def __init__(self, app, compressor: ResponseCompressor, encoding: str, scope):
+        self.app = app
+        self.compressor = compressor
+        self.encoding = encoding
+        self.scope = scope
+        self.send = None
+        self.start_message = None
+        self.stream = None  # 스트리밍 압축 중이면 압축기
+        self.passthrough = False
+
+    async def __call__(self, receive, send):
+        self.send = send
+        await self.app(self.scope, receive, self.send_wrapper)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return ("content-encoding" not in headers
+                and self.start_message["status"] not in (204, 206, 304)
+                and any(content_type.startswith(t) for t in _COMPRESSIBLE_TYPES))
+
+    def _set_encoded_headers(self, headers: MutableHeaders):
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # 압축한 표현은 바이트가 달라지므로 강한 ETag 는 약한 ETag 로
+            headers["ETag"] = f"W/{etag}"
+
+    async def send_wrapper(self, message):
+        compressor = self.compressor
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            # 스트리밍 압축 계속
+            chunk = self.stream.process(body) if self.encoding == "br" else self.stream.compress(body)
+            if more_body:
+                chunk += self.stream.flush() if self.encoding == "br" else self.stream.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                chunk += self.stream.finish() if self.encoding == "br" else self.stream.flush()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        # 첫 본문 청크 - 압축 여부 결정
+        compressor.stats["responses"] += 1
+        headers = MutableHeaders(scope=self.start_message)
+        if not self._compressible(headers) or (not more_body and len(body) < compressor.minimum_size):
+            if not more_body and len(body) < compressor.minimum_size:
+                compressor.stats["skipped_small"] += 1
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        self._set_encoded_headers(headers)
+        if not more_body:
+            compressed = compressor.cached_compress(self.encoding, body, "etag" in headers)
+            compressor.record(self.encoding, len(body), len(compressed))
+            headers["Content-Length"] = str(len(compressed))
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        # 길이를 모르는 스트리밍 응답
+        del headers["Content-Length"]
+        self.stream = compressor.stream_compressor(self.encoding)
+        compressor.stats["compressed"] += 1
+        await self.send(self.start_message)
+        await self.send_wrapper(message)
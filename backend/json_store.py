@@ -0,0 +1,198 @@
+# json_store.py - 사용자 JSON 상태 파일 저장 (원자적 쓰기, 사용자별 락, 인덱스 그룹 커밋)
+#
+# - 쓰기: 같은 디렉터리 임시 파일 -> fsync -> os.replace -> 디렉터리 fsync (중간에 죽어도 이전 내용 또는 새 내용만 남음)
+# - 락: 프로세스 안에서는 사용자별 스레드 락, 워커 사이에서는 user_data/{사용자}/.state.lock flock
+#   (요청 처리 코드가 동기 함수라 asyncio.Lock 대신 스레드 락을 쓴다 - 이벤트 루프와 스레드풀 양쪽에서 호출됨)
+# - 그룹 커밋: 같은 파일을 고치려는 호출이 몰리면 먼저 온 호출이 대기 중인 변경을 모아 한 번의 읽기/쓰기로 반영
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = ".state.lock"
+
+
+def fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: Path, data: Any, indent: Any = 2):
+    """JSON 파일 원자적 교체"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    fsync_dir(path.parent)
+
+
+def read_json(path: Path, default: Callable[[], Any]) -> Any:
+    """JSON 파일 읽기 (없으면 default())"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default()
+
+
+class _PendingOp:
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn: Callable[[Any], Any]):
+        self.fn = fn
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class UserStateStore:
+    """user_data/{사용자}/ 아래 JSON 상태 파일의 잠금 읽기-수정-쓰기
+
+    변경 함수는 읽은 데이터를 직접 수정하고, 반환값은 호출자에게 그대로 돌려준다.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._mutex = threading.Lock()
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._commit_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._pending: Dict[Tuple[str, str], List[_PendingOp]] = {}
+        self._held = threading.local()
+        self.stats = {"writes": 0, "commits": 0, "committed_ops": 0, "max_batch": 0,
+                      "lock_waits": 0, "lock_wait_ms_total": 0.0, "recovered": 0}
+
+    def path(self, username: str, name: str) -> Path:
+        return self.root / username / name
+
+    @contextmanager
+    def user_lock(self, username: str):
+        """사용자 상태 락 (같은 스레드에서 중첩 가능)"""
+        held = self._held.__dict__.setdefault("users", {})
+        if username in held:
+            held[username] += 1
+            try:
+                yield
+            finally:
+                held[username] -= 1
+            return
+
+        with self._mutex:
+            thread_lock = self._thread_locks.setdefault(username, threading.Lock())
+        start = time.perf_counter()
+        with thread_lock:
+            user_path = self.root / username
+            user_path.mkdir(parents=True, exist_ok=True)
+            fd = os.open(user_path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                waited_ms = (time.perf_counter() - start) * 1000
+                if waited_ms > 1:
+                    self.stats["lock_waits"] += 1
+                    self.stats["lock_wait_ms_total"] += waited_ms
+                held[username] = 1
+                try:
+                    yield
+                finally:
+                    del held[username]
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def _read(self, path: Path, default: Callable[[], Any]) -> Any:
+        try:
+            return read_json(path, default)
+        except ValueError as e:
+            # 원자적 쓰기 도입 전에 깨진 파일 - 옆으로 옮겨 두고 새로 시작 (요청이 계속 500 이 되지 않게)
+            corrupt = path.with_name(f"{path.name}.corrupt-{int(time.time())}")
+            os.replace(path, corrupt)
+            self.stats["recovered"] += 1
+            logger.error("❌ 손상된 상태 파일을 %s 로 옮기고 새로 만듭니다: %s", corrupt.name, e)
+            return default()
+
+    def read(self, username: str, name: str, default: Callable[[], Any]) -> Any:
+        """잠금 없이 읽기 (쓰기가 원자적 교체라 항상 완성된 파일을 읽음)"""
+        return read_json(self.path(username, name), default)
+
+    def write(self, username: str, name: str, data: Any):
+        with self.user_lock(username):
+            atomic_write_json(self.path(username, name), data)
+            self.stats["writes"] += 1
+
+    def update(self, username: str, name: str, fn: Callable[[Any], Any], default: Callable[[], Any]) -> Any:
+        """잠금 읽기-수정-쓰기, fn 의 반환값 반환"""
+        with self.user_lock(username):
+            path = self.path(username, name)
+            data = self._read(path, default)
+            result = fn(data)
+            atomic_write_json(path, data)
+            self.stats["writes"] += 1
+        return result
+
+    def commit(self, username: str, name: str, fn: Callable[[Any], Any], default: Callable[[], Any]) -> Any:
+        """update 와 같지만 동시에 들어온 변경을 모아 한 번에 쓰는 그룹 커밋 (인덱스 파일용)
+
+        먼저 커밋 락을 잡은 호출이 그때까지 쌓인 변경을 모두 적용하고, 나머지는 자기 변경이 이미 반영됐으면 바로 반환한다.
+        """
+        if username in self._held.__dict__.get("users", {}):
+            # 이미 사용자 락을 잡은 스레드 - 커밋 락을 기다리면 다른 커밋 담당과 교착되므로 바로 반영
+            return self.update(username, name, fn, default)
+
+        key = (username, name)
+        op = _PendingOp(fn)
+        with self._mutex:
+            self._pending.setdefault(key, []).append(op)
+            commit_lock = self._commit_locks.setdefault(key, threading.Lock())
+        with commit_lock:
+            if not op.done:
+                with self._mutex:
+                    batch = self._pending.pop(key, [])
+                self._apply(username, name, batch, default)
+        if op.error is not None:
+            raise op.error
+        return op.result
+
+    def _apply(self, username: str, name: str, batch: List[_PendingOp], default: Callable[[], Any]):
+        try:
+            with self.user_lock(username):
+                path = self.path(username, name)
+                data = self._read(path, default)
+                for op in batch:
+                    try:
+                        op.result = op.fn(data)
+                    except Exception as e:
+                        op.error = e
+                atomic_write_json(path, data)
+        except Exception as e:
+            for op in batch:
+                op.error = op.error or e
+        finally:
+            for op in batch:
+                op.done = True
+        self.stats["writes"] += 1
+        self.stats["commits"] += 1
+        self.stats["committed_ops"] += len(batch)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        commits = self.stats["commits"]
+        return {
+            **self.stats,
+            "ops_per_commit": round(self.stats["committed_ops"] / commits, 2) if commits else 0.0,
+        }
@@ -0,0 +1,173 @@
+# live_updates.py - 탭/프리셋 구독자에게 새 스냅샷 버전의 변경된 차트만 푸시 (SSE / WebSocket 공통)
+#
+# 채널: "tab:{탭 ID}" (기본 차트), "preset:{사용자}/{프리셋 ID}" (프리셋 차트)
+# 채널마다 마지막으로 보낸 차트 전체와 차트별 digest 를 보관하고, 새 버전을 한 번 계산해 publish 하면
+# digest 가 달라진 차트만 diff 메시지로 모든 구독자에게 보낸다 (구독자가 N 명이어도 계산은 채널당 한 번).
+#
+# 메시지 형식
+#   {"type": "snapshot", "channel", "version", "charts": [차트 전체]}             구독 직후 / 밀린 구독자 재동기화
+#   {"type": "diff", "channel", "version", "previous_version",
+#    "changed": [바뀌거나 추가된 차트], "removed": [키], "order": [키]}               새 버전에서 달라진 차트만
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def chart_digest(chart: Dict[str, Any], default: Optional[Callable[[Any], Any]] = None) -> str:
+    payload = json.dumps(chart, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=default or str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class Subscriber:
+    """연결 하나 (SSE 스트림 또는 WebSocket) - 보낼 메시지 대기열과 구독 채널"""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.channels: Set[str] = set()
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.connected_at = time.time()
+        self.resyncs = 0
+
+
+class LiveHub:
+    """채널별 마지막 차트 상태와 구독자 관리 (이벤트 루프 스레드에서만 호출)"""
+
+    def __init__(self, max_pending: int = 32, digest_default: Optional[Callable[[Any], Any]] = None):
+        # 대기 메시지가 max_pending 을 넘는 느린 구독자는 쌓인 diff 를 버리고 채널별 전체 차트로 다시 맞춤
+        self.max_pending = max_pending
+        self.digest_default = digest_default
+        self.subscribers: Set[Subscriber] = set()
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.wakeup = asyncio.Event()
+        self.stats = {"published": 0, "unchanged": 0, "charts_sent": 0, "charts_skipped": 0,
+                      "messages": 0, "resyncs": 0}
+
+    def add(self, username: str) -> Subscriber:
+        subscriber = Subscriber(username)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def remove(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        for channel in subscriber.channels:
+            if not self._channel_subscribers(channel):
+                # 구독자가 없는 채널은 상태를 버려 다음 구독 때 새로 계산
+                self.state.pop(channel, None)
+        subscriber.channels.clear()
+
+    def _channel_subscribers(self, channel: str) -> List[Subscriber]:
+        return [s for s in self.subscribers if channel in s.channels]
+
+    def channels(self) -> Dict[str, int]:
+        """구독 중인 채널별 구독자 수"""
+        counts: Dict[str, int] = {}
+        for subscriber in self.subscribers:
+            for channel in subscriber.channels:
+                counts[channel] = counts.get(channel, 0) + 1
+        return counts
+
+    def has_state(self, channel: str) -> bool:
+        return channel in self.state
+
+    def channel_meta(self, channel: str) -> Dict[str, Any]:
+        """publish 때 함께 저장한 채널 부가 정보 (예: 프리셋이 참조하는 탭별 버전)"""
+        return self.state.get(channel, {}).get("meta", {})
+
+    def version(self, channel: str) -> Optional[str]:
+        return self.state.get(channel, {}).get("version")
+
+    def wake(self):
+        """감시 작업을 주기를 기다리지 않고 바로 실행"""
+        self.wakeup.set()
+
+    def _snapshot_message(self, channel: str) -> Dict[str, Any]:
+        state = self.state[channel]
+        return {"type": "snapshot", "channel": channel, "version": state["version"],
+                "charts": list(state["charts"].values())}
+
+    def subscribe(self, subscriber: Subscriber, channel: str) -> bool:
+        """채널 구독 - 채널 상태가 있으면 현재 차트 전체를 보내고 True, 없으면 False (publish 후 send_snapshot)"""
+        subscriber.channels.add(channel)
+        if channel not in self.state:
+            return False
+        self.send_snapshot(subscriber, channel)
+        return True
+
+    def send_snapshot(self, subscriber: Subscriber, channel: str):
+        self._send(subscriber, self._snapshot_message(channel))
+
+    def unsubscribe(self, subscriber: Subscriber, channel: str):
+        subscriber.channels.discard(channel)
+        if not self._channel_subscribers(channel):
+            self.state.pop(channel, None)
+
+    def publish(self, channel: str, version: Optional[str], charts: Dict[str, Dict[str, Any]],
+                meta: Optional[Dict[str, Any]] = None) -> int:
+        """채널의 새 차트 상태 반영 후 달라진 차트만 구독자에게 전송, 보낸 차트 수 반환
+
+        charts 는 차트 키 -> 차트 (순서 유지). 처음 publish 하는 채널은 상태만 저장하고,
+        계산하는 사이 구독자가 모두 나간 채널은 상태를 남기지 않는다.
+        """
+        if not self._channel_subscribers(channel):
+            self.state.pop(channel, None)
+            return 0
+        digests = {key: chart_digest(chart, self.digest_default) for key, chart in charts.items()}
+        previous = self.state.get(channel)
+        self.state[channel] = {"version": version, "charts": charts, "digests": digests, "meta": meta or {}}
+        if previous is None:
+            return 0
+
+        changed = [charts[key] for key, digest in digests.items() if previous["digests"].get(key) != digest]
+        removed = [key for key in previous["digests"] if key not in digests]
+        order_changed = list(previous["digests"]) != list(digests)
+        self.stats["charts_skipped"] += len(digests) - len(changed)
+        if not changed and not removed and not order_changed:
+            self.stats["unchanged"] += 1
+            return 0
+
+        message = {
+            "type": "diff",
+            "channel": channel,
+            "version": version,
+            "previous_version": previous["version"],
+            "changed": changed,
+            "removed": removed,
+            "order": list(digests),
+        }
+        subscribers = self._channel_subscribers(channel)
+        for subscriber in subscribers:
+            self._send(subscriber, message)
+        self.stats["published"] += 1
+        self.stats["charts_sent"] += len(changed) * len(subscribers)
+        logger.info("📡 %s 버전 %s -> %s: 차트 %d개 변경, %d개 삭제 (구독자 %d명)",
+                    channel, previous["version"], version, len(changed), len(removed), len(subscribers))
+        return len(changed)
+
+    def _send(self, subscriber: Subscriber, message: Dict[str, Any]):
+        if subscriber.queue.qsize() >= self.max_pending:
+            # 밀린 diff 는 순서대로 적용해야 의미가 있으므로 모두 버리고 구독 채널 전체를 다시 보냄
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.resyncs += 1
+            self.stats["resyncs"] += 1
+            for channel in subscriber.channels:
+                if channel in self.state:
+                    subscriber.queue.put_nowait(self._snapshot_message(channel))
+                    self.stats["messages"] += 1
+            return
+        subscriber.queue.put_nowait(message)
+        self.stats["messages"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "channels": self.channels(),
+            "versions": {channel: state["version"] for channel, state in self.state.items()},
+            "pending": sum(s.queue.qsize() for s in self.subscribers),
+            **self.stats,
+        }
@@ -0,0 +1,260 @@
+# llm_client.py - 재시도/헤지 요청/서킷 브레이커/다중 엔드포인트 장애 조치를 갖춘 LLM 클라이언트
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 일시적 오류
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.TransportError)
+
+
+class CircuitOpenError(Exception):
+    """모든 엔드포인트의 서킷이 열려 있어 즉시 실패"""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class CircuitBreaker:
+    """연속 실패가 임계치를 넘으면 열림(open) -> reset_timeout 후 반열림(half-open)에서 1건 시험"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """반열림 시험 요청이 결과 없이 취소된 경우"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # 반열림 시험 실패 또는 임계치 도달 시 다시 열림
+            self.opened_at = time.monotonic()
+
+
+class _Endpoint:
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        self.breaker = breaker
+        self.latencies = deque(maxlen=200)
+        self.requests = 0
+        self.errors = 0
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class ResilientLLMClient:
+    """LLM 게이트웨이 호출 래퍼
+
+    - 일시적 오류(타임아웃/연결 오류/429/5xx)는 지수 백오프 + 지터로 재시도
+    - 재시도마다 다음 엔드포인트로 장애 조치
+    - 엔드포인트별 서킷 브레이커로 게이트웨이 장애 시 즉시 실패
+    - hedge=True 면 p95 지연 안에 응답이 없을 때 두 번째 요청을 보내 먼저 온 응답 사용
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        if not urls:
+            raise ValueError("LLM 엔드포인트가 설정되지 않았습니다")
+        self.endpoints = [_Endpoint(url, CircuitBreaker(failure_threshold, reset_timeout)) for url in urls]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self._next = 0
+        self.stats = {"calls": 0, "retries": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0, "circuit_rejections": 0}
+
+    def _pick(self, exclude: Optional[_Endpoint] = None) -> Optional[_Endpoint]:
+        """현재 엔드포인트부터 순서대로 서킷이 허용하는 엔드포인트 선택 (실패 시 다음으로 넘어감)"""
+        count = len(self.endpoints)
+        for i in range(count):
+            endpoint = self.endpoints[(self._next + i) % count]
+            if endpoint is exclude:
+                continue
+            if endpoint.breaker.allow():
+                if exclude is None:
+                    # 헤지용 보조 선택은 현재 엔드포인트를 바꾸지 않음
+                    self._next = (self._next + i) % count
+                return endpoint
+        return None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """지수 백오프 + 전체 지터 (429면 Retry-After 우선)"""
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _send(self, client: httpx.AsyncClient, endpoint: _Endpoint,
+                    json_for: Optional[Callable[[str], Any]] = None, **kwargs) -> httpx.Response:
+        """단일 요청 + 결과를 서킷/지연 통계에 반영 (json_for 가 있으면 엔드포인트별 본문 생성)"""
+        if json_for is not None:
+            kwargs["json"] = json_for(endpoint.url)
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            response = await client.post(endpoint.url, **kwargs)
+        except TRANSIENT_ERRORS:
+            endpoint.errors += 1
+            endpoint.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # 헤지 경쟁에서 진 요청
+            endpoint.breaker.release_trial()
+            raise
+        if response.status_code >= 500:
+            endpoint.errors += 1
+            endpoint.breaker.record_failure()
+        else:
+            endpoint.latencies.append(time.monotonic() - start)
+            endpoint.breaker.record_success()
+        return response
+
+    async def _send_hedged(self, client: httpx.AsyncClient, endpoint: _Endpoint, **kwargs) -> httpx.Response:
+        """p95 지연까지 응답이 없으면 다른(또는 같은) 엔드포인트로 두 번째 요청"""
+        delay = endpoint.p95()
+        if not self.hedge or delay is None:
+            return await self._send(client, endpoint, **kwargs)
+
+        primary = asyncio.create_task(self._send(client, endpoint, **kwargs))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=max(delay, self.hedge_min_delay))
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+
+        backup_endpoint = self._pick(exclude=endpoint) or endpoint
+        self.stats["hedges"] += 1
+        backup = asyncio.create_task(self._send(client, backup_endpoint, **kwargs))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is backup:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception() or error
+                    last = task
+            if error:
+                raise error
+            return last.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def post(self, client: httpx.AsyncClient, **kwargs) -> httpx.Response:
+        """재시도/장애 조치/헤지를 적용한 POST (마지막 실패 응답 또는 예외를 그대로 전달)
+
+        json 대신 json_for(엔드포인트 URL) 를 주면 요청을 보낼 엔드포인트에 맞춰 본문을 만든다.
+        """
+        self.stats["calls"] += 1
+        last_error: Optional[BaseException] = None
+        last_response: Optional[httpx.Response] = None
+        previous: Optional[_Endpoint] = None
+
+        for attempt in range(self.max_retries + 1):
+            endpoint = self._pick()
+            if endpoint is None:
+                self.stats["circuit_rejections"] += 1
+                retry_after = min(e.breaker.retry_after() for e in self.endpoints)
+                raise CircuitOpenError("LLM 게이트웨이를 일시적으로 사용할 수 없습니다.", retry_after)
+            if previous is not None and endpoint is not previous:
+                self.stats["failovers"] += 1
+            previous = endpoint
+
+            try:
+                response = await self._send_hedged(client, endpoint, **kwargs)
+                if response.status_code not in TRANSIENT_STATUS:
+                    return response
+                last_response, last_error = response, None
+                logger.warning("⚠️ LLM 응답 %s (%s), 재시도 %d/%d", response.status_code, endpoint.url, attempt + 1, self.max_retries)
+            except TRANSIENT_ERRORS as e:
+                last_response, last_error = None, e
+                logger.warning("⚠️ LLM 호출 오류 (%s): %s, 재시도 %d/%d", endpoint.url, type(e).__name__, attempt + 1, self.max_retries)
+
+            # 다음 시도는 다른 엔드포인트부터
+            self._next = (self.endpoints.index(endpoint) + 1) % len(self.endpoints)
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, last_response))
+
+        if last_error:
+            raise last_error
+        return last_response
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "endpoints": [
+                {
+                    "url": e.url,
+                    "state": e.breaker.state,
+                    "consecutive_failures": e.breaker.failures,
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "p95_ms": round(e.p95() * 1000, 1) if e.p95() is not None else None,
+                }
+                for e in self.endpoints
+            ],
+        }
@@ -0,0 +1,234 @@
+# llm_output.py - LLM 응답 구조화 출력 (JSON 스키마 요청, 관대한 JSON 추출, 스키마 검증, 파싱 실패율)
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+
+logger = logging.getLogger(__name__)
+
+CHART_TYPES = ("bar", "line", "pie", "doughnut", "scatter")
+
+
+class LLMAnalysis(BaseModel):
+    """LLM 분석 응답 스키마"""
+
+    chart_request: int = 0
+    sql_query: Optional[str] = None
+    chart_type: str = "bar"
+    description: str = ""
+
+    @field_validator("chart_request", mode="before")
+    @classmethod
+    def _coerce_chart_request(cls, value):
+        # true / "1" / 1.0 등도 허용
+        if isinstance(value, str):
+            value = value.strip().lower()
+            return 1 if value in ("1", "true", "yes") else 0
+        return 1 if value else 0
+
+    @field_validator("chart_type", mode="before")
+    @classmethod
+    def _normalize_chart_type(cls, value):
+        value = str(value or "bar").strip().lower()
+        return value if value in CHART_TYPES else "bar"
+
+    @field_validator("description", mode="before")
+    @classmethod
+    def _description_text(cls, value):
+        return "" if value is None else str(value)
+
+    @model_validator(mode="after")
+    def _sql_required_for_chart(self):
+        if self.chart_request == 1 and not (self.sql_query or "").strip():
+            raise ValueError("chart_request=1 이면 sql_query 가 필요합니다")
+        return self
+
+
+# 게이트웨이에 전달할 JSON 스키마 (OpenAI 호환 response_format)
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "chart_request": {"type": "integer", "enum": [0, 1]},
+        "sql_query": {"type": "string"},
+        "chart_type": {"type": "string", "enum": list(CHART_TYPES)},
+        "description": {"type": "string"},
+    },
+    "required": ["chart_request", "sql_query", "chart_type", "description"],
+    "additionalProperties": False,
+}
+
+
+class ResponseFormatNegotiator:
+    """게이트웨이 엔드포인트별 구조화 출력(response_format) 모드 선택
+
+    auto 면 json_schema -> json_object -> 사용 안 함 순으로, 엔드포인트가 response_format 을 이유로 400 을 줄 때마다
+    그 엔드포인트만 한 단계씩 내린다 (컨텍스트 길이 초과 등 다른 400 은 무시).
+    내린 엔드포인트는 retry_seconds 가 지나면 json_schema 부터 다시 시도한다 (게이트웨이 업그레이드 반영).
+    """
+
+    LEVELS = ("json_schema", "json_object", "none")
+    # 400 응답 본문에 이 단어가 있어야 response_format 미지원으로 판단
+    FORMAT_ERROR_MARKERS = ("response_format", "json_schema")
+
+    def __init__(self, mode: str = "auto", retry_seconds: float = 600):
+        self.auto = mode == "auto"
+        self.mode = "json_schema" if self.auto else mode
+        if self.mode not in self.LEVELS:
+            raise ValueError(f"지원하지 않는 response_format 모드입니다: {mode}")
+        self.retry_seconds = retry_seconds
+        self._downgraded: Dict[str, Dict[str, Any]] = {}  # 엔드포인트 -> {"mode", "since"}
+
+    def mode_for(self, endpoint: str) -> str:
+        state = self._downgraded.get(endpoint)
+        if state is None:
+            return self.mode
+        if time.monotonic() - state["since"] >= self.retry_seconds:
+            del self._downgraded[endpoint]
+            logger.info("🔁 %s response_format=%s 재시도", endpoint, self.mode)
+            return self.mode
+        return state["mode"]
+
+    def response_format(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        mode = self.mode_for(endpoint)
+        if mode == "json_schema":
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": "chart_analysis", "strict": True, "schema": RESPONSE_SCHEMA},
+            }
+        if mode == "json_object":
+            return {"type": "json_object"}
+        return None
+
+    def downgrade(self, endpoint: str, error_body: str) -> bool:
+        """400 응답이 response_format 거부면 그 엔드포인트를 다음 단계로 내림 (내렸으면 True)"""
+        if not self.auto or not any(marker in error_body for marker in self.FORMAT_ERROR_MARKERS):
+            return False
+        mode = self.mode_for(endpoint)
+        if mode == "none":
+            return False
+        mode = self.LEVELS[self.LEVELS.index(mode) + 1]
+        self._downgraded[endpoint] = {"mode": mode, "since": time.monotonic()}
+        logger.warning("⚠️ %s 가 구조화 출력을 지원하지 않아 response_format=%s 로 전환 (%d초 후 재시도)",
+                       endpoint, mode, self.retry_seconds)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.mode,
+            "downgraded": {endpoint: mode for endpoint in list(self._downgraded)
+                           if (mode := self.mode_for(endpoint)) != self.mode},
+        }
+
+
+class JSONObjectExtractor:
+    """텍스트(스트리밍 청크 포함)에서 완성되는 최상위 JSON 객체를 순서대로 찾아냄
+
+    중괄호 깊이와 문자열/이스케이프 상태만 추적하므로 청크를 이어 붙여 다시 스캔하지 않는다.
+    마크다운 코드 펜스나 앞뒤 설명 문장은 객체 밖이라 자연히 무시된다.
+    """
+
+    def __init__(self):
+        self._buffer: list = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """청크를 추가하고 이번 청크에서 완성된 JSON 객체 목록 반환"""
+        objects = []
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == "{":
+                    self._buffer = [ch]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        value = json.loads("".join(self._buffer))
+                    except ValueError:
+                        # 중괄호는 맞지만 JSON이 아님 (예: 설명 문장 속 {…}) -> 다음 객체 탐색
+                        value = None
+                    self._buffer = []
+                    if isinstance(value, dict):
+                        objects.append(value)
+        return objects
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """응답 텍스트에서 스키마 필드를 가진 첫 번째 JSON 객체 추출 (설명 속 예시 객체는 건너뜀)"""
+    for value in JSONObjectExtractor().feed(text):
+        if value.keys() & LLMAnalysis.model_fields.keys():
+            return value
+    return None
+
+
+class LLMReplyParser:
+    """LLM 응답 파싱 + 결과별 집계
+
+    결과 분류
+    - direct: 응답 전체가 유효한 JSON
+    - extracted: 코드 펜스/설명 문장 속 JSON을 추출
+    - text: JSON이 없어 텍스트 답변으로 처리
+    - invalid: JSON은 있지만 스키마 검증 실패 (텍스트 답변으로 처리)
+    text/invalid 는 JSON 응답을 요구했는데 받지 못한 경우이므로 파싱 실패로 집계한다.
+    """
+
+    def __init__(self):
+        self.stats = {"total": 0, "direct": 0, "extracted": 0, "text": 0, "invalid": 0}
+        self.last_errors: list = []
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        self.stats["total"] += 1
+        outcome = "direct"
+        data = None
+        stripped = content.strip()
+        if stripped.startswith("{"):
+            try:
+                data = json.loads(stripped)
+            except ValueError:
+                data = None
+        if not isinstance(data, dict):
+            outcome = "extracted"
+            data = extract_json_object(content)
+
+        if data is None:
+            self.stats["text"] += 1
+            return {"chart_request": 0, "description": content}
+
+        try:
+            analysis = LLMAnalysis.model_validate(data)
+        except ValidationError as e:
+            self.stats["invalid"] += 1
+            self.last_errors = (self.last_errors + [str(e.errors()[0].get("msg", e))])[-10:]
+            logger.warning("⚠️ LLM 응답 스키마 검증 실패: %s", e.errors()[0].get("msg"))
+            return {"chart_request": 0, "description": data.get("description") or content}
+
+        self.stats[outcome] += 1
+        return analysis.model_dump(exclude_none=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["total"]
+        failures = self.stats["text"] + self.stats["invalid"]
+        return {
+            **self.stats,
+            "extracted_rate": round(self.stats["extracted"] / total, 4) if total else 0.0,
+            "parse_failure_rate": round(failures / total, 4) if total else 0.0,
+            "recent_errors": self.last_errors,
+        }
@@ -0,0 +1,193 @@
+# llm_scheduler.py - LLM 호출 스케줄러 (전역 동시성 제한, 사용자별 토큰 버킷, 가중 공정 큐잉, 부하 차단)
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+
+class SchedulerRejected(Exception):
+    """스케줄러가 요청을 거절함 (HTTP 429 + Retry-After 로 응답)"""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after))
+
+
+class RateLimited(SchedulerRejected):
+    """사용자별 요청 한도 초과"""
+
+
+class Overloaded(SchedulerRejected):
+    """대기열이 가득 차 부하 차단"""
+
+
+class LLMScheduler:
+    """LLM 게이트웨이 앞단의 프로세스 내 스케줄러
+
+    - 전역 동시 호출 수 제한 (max_concurrency)
+    - 사용자별 토큰 버킷 (rate_per_minute, burst)
+    - 사용자 가중치 기반 공정 큐잉 (WFQ 가상 종료 시각 순으로 슬롯 배정)
+    - 대기열 길이 기반 부하 차단 (max_queue_depth)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        rate_per_minute: float = 30,
+        burst: int = 10,
+        max_queue_depth: int = 100,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_per_sec = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_queue_depth = max_queue_depth
+        self.weights = weights or {}
+
+        self._in_flight = 0
+        self._queue: list = []  # (가상 종료 시각, 순번, future)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._buckets: Dict[str, list] = {}  # 사용자 -> [토큰, 마지막 갱신 시각]
+
+        self._waits = deque(maxlen=1000)
+        self._service_times = deque(maxlen=200)
+        self._counters = {"admitted": 0, "completed": 0, "rate_limited": 0, "shed": 0}
+        self._per_user: Dict[str, Dict[str, float]] = {}
+
+    # ---------- 사용자별 토큰 버킷 ----------
+
+    def admit(self, username: str, cost: int = 1):
+        """요청 한도 확인 후 토큰 차감 (부족하면 RateLimited)
+
+        cost 는 burst 이하여야 한다 (버킷이 가득 차도 채울 수 없으므로). 더 큰 일괄 요청은 burst 단위로 나눠 호출한다.
+        """
+        if self.rate_per_sec <= 0:
+            return
+        if cost > self.burst:
+            raise ValueError(f"cost({cost})가 burst({self.burst})보다 큽니다")
+        now = time.monotonic()
+        tokens, last = self._buckets.get(username, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate_per_sec)
+        if tokens < cost:
+            self._buckets[username] = [tokens, now]
+            self._counters["rate_limited"] += 1
+            retry_after = math.ceil((cost - tokens) / self.rate_per_sec)
+            raise RateLimited("요청이 너무 많습니다. 잠시 후 다시 시도해주세요.", retry_after)
+        self._buckets[username] = [tokens - cost, now]
+
+    # ---------- 동시성 슬롯 / 공정 큐잉 ----------
+
+    def _estimated_wait(self) -> float:
+        """현재 대기열이 비워지기까지 예상 시간 (초)"""
+        service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 1.0
+        return (len(self._queue) + 1) / self.max_concurrency * service
+
+    def _release(self):
+        """슬롯 반환 - 대기 중인 요청이 있으면 가상 종료 시각이 가장 이른 요청에 슬롯을 넘김"""
+        while self._queue:
+            finish_tag, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._virtual_time = finish_tag
+            future.set_result(None)
+            return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, username: str):
+        """LLM 호출 1건 실행 슬롯 획득 (필요 시 공정 큐에서 대기)"""
+        enqueued = time.monotonic()
+        user_stats = self._per_user.setdefault(username, {"completed": 0, "wait_ms_total": 0.0, "queued": 0})
+
+        if self._in_flight < self.max_concurrency and not self._queue:
+            self._in_flight += 1
+        else:
+            if len(self._queue) >= self.max_queue_depth:
+                self._counters["shed"] += 1
+                raise Overloaded("LLM 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+                                 math.ceil(self._estimated_wait()))
+            weight = self.weights.get(username, 1.0)
+            finish_tag = max(self._virtual_time, self._last_finish.get(username, 0.0)) + 1.0 / weight
+            self._last_finish[username] = finish_tag
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (finish_tag, next(self._seq), future))
+            user_stats["queued"] += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                # 슬롯을 넘겨받은 직후 취소되면 슬롯을 다시 반환
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+            finally:
+                user_stats["queued"] -= 1
+
+        wait = time.monotonic() - enqueued
+        self._waits.append(wait)
+        user_stats["wait_ms_total"] += wait * 1000
+        self._counters["admitted"] += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_times.append(time.monotonic() - start)
+            self._counters["completed"] += 1
+            user_stats["completed"] += 1
+            self._release()
+
+    # ---------- 지표 ----------
+
+    @property
+    def in_flight(self) -> int:
+        """사용 중인 슬롯 수"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """슬롯을 기다리는 요청 수"""
+        return len(self._queue)
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        """처리/거절 누적 건수 (admitted, completed, rate_limited, shed)"""
+        return dict(self._counters)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """대기 시간 분포, 대기열 길이, 거절 건수"""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            **self._counters,
+            "queue_wait_ms": {
+                "count": len(waits),
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+            "users": {
+                user: {
+                    "queued": stats["queued"],
+                    "completed": stats["completed"],
+                    "avg_wait_ms": round(stats["wait_ms_total"] / stats["completed"], 1) if stats["completed"] else 0.0,
+                }
+                for user, stats in self._per_user.items()
+            },
+        }
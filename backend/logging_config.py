@@ -0,0 +1,102 @@
+# logging_config.py - 구조화 로깅 (JSON 출력, 모듈별 레벨, 요청 ID, 큐 기반 비동기 출력)
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# 현재 요청 ID (미들웨어가 설정, asyncio 태스크/스레드풀로 자동 전파)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# LogRecord 기본 속성 (이 외의 속성은 extra 로 넘어온 필드로 보고 JSON에 포함)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'main.preset=DEBUG,llm_client=WARNING' -> {"main.preset": "DEBUG", "llm_client": "WARNING"}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class JSONFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나 (ts, level, logger, request_id, msg + extra 필드)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """개발용 사람이 읽는 형식"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """호출한 쪽에서는 요청 ID 기록과 msg % args 치환만 하고, JSON/텍스트 포맷팅과 출력은 리스너 스레드에서 처리
+
+    기본 QueueHandler.prepare 는 호출 스레드(이벤트 루프)에서 전체 포맷팅(예외 traceback 포함)까지 하므로 재정의한다.
+    args 는 호출 시점에 치환해야 한다 - 리스너에서 치환하면 그 사이 바뀐 객체(dict 등)를 찍거나
+    다른 스레드가 크기를 바꾸는 중에 순회해 오류가 난다. 치환은 활성화된 레벨의 로그에서만 일어난다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # 출력이 밀리면 이벤트 루프를 막지 않고 버림
+            pass
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", module_levels: Optional[Dict[str, str]] = None,
+                  fmt: str = "json", queue_size: int = 10000) -> logging.handlers.QueueListener:
+    """루트 로거를 큐 핸들러로 구성하고 stdout 출력 리스너 스레드 시작 (여러 번 호출해도 한 번만 구성)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
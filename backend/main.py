@@ -1,21 +1,75 @@
 # main.py
-from fastapi import FastAPI, HTTPException, Body
+import time
+IMPORT_STARTED = time.perf_counter()  # 임포트 시작 ~ 준비 완료 시간 측정 기준
+from fastapi import FastAPI, HTTPException, Body, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-import oracledb
+from typing import Optional, Dict, Any, List, Tuple
 import sqlite3
 import pandas as pd
 import httpx
 import json
 import asyncio
 import os
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta
 import uuid
+import hashlib
+import functools
+import logging
 from pathlib import Path
 from fastapi import Path as FastPath
+from oracle_fetch import fetch_dataframe, format_stats, iter_dataframe_chunks
+from tab_loader import normalize_columns, stream_to_db
+from chart_registry import ChartAggregationPass, load_chart_registry
+from rollup import RollupManager
+from llm_scheduler import LLMScheduler, SchedulerRejected
+from llm_client import CircuitOpenError, ResilientLLMClient
+from fast_path import FastPathMatcher, load_fast_path_patterns
+from llm_output import LLMReplyParser, ResponseFormatNegotiator
+from conversation import ConversationSession
+from metrics import MetricsRegistry
+from logging_config import parse_module_levels, request_id_var, setup_logging
+from tracing import TraceExporter, Tracer, current_trace
+from snapshot_store import SnapshotStore
+from history_search import HistorySearch
+from query_library import QueryLibrary
+from history_archive import HistoryArchiver
+from json_store import UserStateStore, atomic_write_json
+from live_updates import LiveHub, Subscriber
+from http_cache import CompressionMiddleware, ResponseCompressor, conditional_response, weak_etag
 
-app = FastAPI()
+# 로깅 설정 (기본 레벨, 모듈별 레벨 예: "main.preset=DEBUG,llm_client=WARNING", 출력 형식 json/text)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = parse_module_levels(os.environ.get("LOG_LEVELS", "httpx=WARNING"))
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+
+setup_logging(LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+logger = logging.getLogger("main")
+db_logger = logging.getLogger("main.db")
+preset_logger = logging.getLogger("main.preset")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """시작 단계: 사용자 데이터 디렉터리 준비 후 프리웜과 히스토리 보관 작업을 백그라운드로 실행 (프리웜 완료 전까지 /health/ready 는 503)"""
+    USER_DATA_PATH.mkdir(exist_ok=True)
+    tasks = [asyncio.create_task(prewarm())]
+    if HISTORY_MAINTENANCE_INTERVAL_HOURS > 0:
+        tasks.append(asyncio.create_task(history_maintenance_loop()))
+    if LIVE_UPDATE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(live_update_loop()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 설정 (모든 origin 허용 - 개발용)
 app.add_middleware(
@@ -24,34 +78,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing", "ETag", "Last-Modified"],
 )
 
-# Oracle 클라이언트 초기화 (옵션)
+# Oracle 클라이언트 초기화 (옵션) - oracledb 임포트와 Thick 모드 초기화는 첫 Oracle 연결 때 한 번만
 USE_THICK_MODE = False  # True로 변경하면 Instant Client 사용
+ORACLE_CLIENT_LIB_DIR = r"/home/humandeep/oracle/instantclient_21_8"
+_oracle_client_initialized = False
 
-if USE_THICK_MODE:
-    client_lib_dir = r"/home/humandeep/oracle/instantclient_21_8"
-    if os.path.exists(client_lib_dir):
-        print(f"✅ Oracle 클라이언트 경로: {client_lib_dir}")
-        try:
-            if 'LD_LIBRARY_PATH' in os.environ:
-                os.environ['LD_LIBRARY_PATH'] = f"{client_lib_dir}:{os.environ['LD_LIBRARY_PATH']}"
-            else:
-                os.environ['LD_LIBRARY_PATH'] = client_lib_dir
-            
-            oracledb.init_oracle_client(lib_dir=client_lib_dir)
-            print("✅ Oracle 클라이언트 초기화 성공 (Thick 모드)")
-        except Exception as e:
-            print(f"⚠️ Oracle 클라이언트 초기화 경고: {e}")
-            print("💡 해결 방법: sudo apt-get install libaio-dev")
-            print("🔄 Thin 모드로 전환합니다...")
+def load_oracledb():
+    """oracledb 모듈 반환 (처음 호출될 때 임포트 및 클라이언트 초기화, 테스트 모드에서는 호출되지 않음)"""
+    global USE_THICK_MODE, _oracle_client_initialized
+    import oracledb
+    if _oracle_client_initialized:
+        return oracledb
+    _oracle_client_initialized = True
+    
+    if USE_THICK_MODE:
+        client_lib_dir = ORACLE_CLIENT_LIB_DIR
+        if os.path.exists(client_lib_dir):
+            logger.info("✅ Oracle 클라이언트 경로: %s", client_lib_dir)
+            try:
+                if 'LD_LIBRARY_PATH' in os.environ:
+                    os.environ['LD_LIBRARY_PATH'] = f"{client_lib_dir}:{os.environ['LD_LIBRARY_PATH']}"
+                else:
+                    os.environ['LD_LIBRARY_PATH'] = client_lib_dir
+                
+                oracledb.init_oracle_client(lib_dir=client_lib_dir)
+                logger.info("✅ Oracle 클라이언트 초기화 성공 (Thick 모드)")
+            except Exception as e:
+                logger.warning("⚠️ Oracle 클라이언트 초기화 경고: %s (해결 방법: sudo apt-get install libaio-dev) - Thin 모드로 전환합니다", e)
+                USE_THICK_MODE = False
+        else:
+            logger.error("❌ Oracle 클라이언트 경로가 없습니다: %s", client_lib_dir)
             USE_THICK_MODE = False
-    else:
-        print(f"❌ Oracle 클라이언트 경로가 없습니다: {client_lib_dir}")
-        USE_THICK_MODE = False
-
-if not USE_THICK_MODE:
-    print("✅ Oracle Thin 모드 사용 (Instant Client 불필요)")
+    
+    if not USE_THICK_MODE:
+        logger.info("✅ Oracle Thin 모드 사용 (Instant Client 불필요)")
+    return oracledb
 
 # Oracle DB 연결 설정
 # 테스트용 로컬 Oracle 연결 정보
@@ -68,10 +132,114 @@ ORACLE_DSN = "localhost:1521/XE"
 LLM_API_KEY = "test-api-key"  # 테스트용 더미 키
 LLM_API_URL = "http://localhost:8001/v1/chat/completions"
 
+# 장애 조치용 LLM 엔드포인트 목록 (쉼표 구분, 기본은 LLM_API_URL 하나)
+LLM_API_URLS = [u.strip() for u in os.environ.get("LLM_API_URLS", LLM_API_URL).split(",") if u.strip()]
+
+# LLM 호출 복원력 설정 (타임아웃, 재시도, 헤지 요청, 서킷 브레이커)
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "false").lower() == "true"
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# 구조화 출력 모드 (auto: json_schema -> json_object -> none 순으로 게이트웨이 지원 여부에 맞춰 전환)
+LLM_RESPONSE_FORMAT = os.environ.get("LLM_RESPONSE_FORMAT", "auto")
+# auto 에서 response_format 을 낮춘 엔드포인트를 다시 json_schema 로 시도하기까지 시간(초)
+LLM_RESPONSE_FORMAT_RETRY_SECONDS = float(os.environ.get("LLM_RESPONSE_FORMAT_RETRY_SECONDS", "600"))
+
 # 운영 API 설정 (주석 처리)
 # LLM_API_KEY = os.environ.get("API_KEY", "")
 # LLM_API_URL = "http://dev.assistant.llm.skhynix.com/v1/chat/completions"
 
+# Oracle 대량 조회 설정 (한 번의 라운드트립으로 가져올 행 수)
+ORACLE_FETCH_ARRAYSIZE = int(os.environ.get("ORACLE_FETCH_ARRAYSIZE", "10000"))
+
+# 탭 적재 청크 크기 (0이면 전체를 한 번에 조회, 양수면 청크 단위 스트리밍 적재)
+TAB_LOAD_CHUNK_ROWS = int(os.environ.get("TAB_LOAD_CHUNK_ROWS", "50000"))
+
+# 테스트 모드 샘플 데이터 규모 (0이면 소량 고정 샘플, 양수면 합성 데이터 생성기 스케일 - 1 = tab1 약 60만 행) / 시드
+SAMPLE_DATA_SCALE = float(os.environ.get("SAMPLE_DATA_SCALE", "0"))
+SAMPLE_DATA_SEED = int(os.environ.get("SAMPLE_DATA_SEED", "42"))
+
+# 탭 스냅샷 유효 시간 (초) - 지나면 다음 탭 요청 시 Oracle 원본 지문을 확인해 바뀌었을 때만 다시 적재
+TAB_SNAPSHOT_TTL_SECONDS = int(os.environ.get("TAB_SNAPSHOT_TTL_SECONDS", "300"))
+
+# 기본 차트 레지스트리 파일 (없으면 chart_registry.DEFAULT_CHARTS 사용)
+DEFAULT_CHARTS_PATH = os.environ.get("DEFAULT_CHARTS_PATH", "default_charts.json")
+
+# 로컬 쿼리 엔진 저장 위치 (워커 메모리보다 큰 탭은 파일 경로 지정)
+LOCAL_DB_PATH = os.environ.get("LOCAL_DB_PATH", ":memory:")
+
+# 디스크 스냅샷 저장소 디렉터리 - 재시작 후 바로 사용하고 여러 워커(uvicorn --workers N)가 공유 (비우면 워커마다 메모리에 적재)
+SNAPSHOT_STORE_DIR = os.environ.get("SNAPSHOT_STORE_DIR", "snapshots")
+SNAPSHOT_MMAP_BYTES = int(os.environ.get("SNAPSHOT_MMAP_BYTES", str(1 << 30)))
+SNAPSHOT_LOCK_TIMEOUT_SECONDS = float(os.environ.get("SNAPSHOT_LOCK_TIMEOUT_SECONDS", "300"))
+# 보관 정책: 탭별 남길 버전 수 (현재 버전 포함) / 현재 버전이 아닌 버전의 최대 보관 시간 (0 이면 개수만 적용)
+SNAPSHOT_KEEP_VERSIONS = int(os.environ.get("SNAPSHOT_KEEP_VERSIONS", "2"))
+SNAPSHOT_RETENTION_HOURS = float(os.environ.get("SNAPSHOT_RETENTION_HOURS", "24"))
+
+# 시작 시 프리웜: 미리 적재할 탭 (쉼표 구분, 비우면 안 함) / 미리 병합해 둘 최근 수정 프리셋 수
+PREWARM_TABS = [t.strip() for t in os.environ.get("PREWARM_TABS", "tab1,tab2,tab3").split(",") if t.strip()]
+PREWARM_PRESETS = int(os.environ.get("PREWARM_PRESETS", "20"))
+# 사용자 공통 쿼리 라이브러리 디렉터리 - 같은 질문/응답은 한 번만 저장하고 히스토리는 참조만 보관 (비우면 히스토리에 응답 전체 저장)
+QUERY_LIBRARY_DIR = os.environ.get("QUERY_LIBRARY_DIR", "query_library")
+
+# 히스토리 보존 기간 (일, 지나면 월별 압축 세그먼트로 보관 - 검색/조회/복원 가능, 0 이면 보관 안 함)
+# 사용자별/탭별 예외: {"users": {"이두원": 30}, "tabs": {"tab3": 365}} (사용자 > 탭 > 기본값)
+HISTORY_RETENTION_DAYS = float(os.environ.get("HISTORY_RETENTION_DAYS", "180"))
+HISTORY_RETENTION_POLICIES = json.loads(os.environ.get("HISTORY_RETENTION_POLICIES", "{}"))
+# 보관 작업 주기 (시간, 시작 1분 후 첫 실행, 0 이면 백그라운드 작업 없음 - /api/test/history-maintenance 로 수동 실행)
+HISTORY_MAINTENANCE_INTERVAL_HOURS = float(os.environ.get("HISTORY_MAINTENANCE_INTERVAL_HOURS", "24"))
+
+# 병합한 프리셋 번들 캐시 크기 (프리셋/참조 쿼리 파일이 바뀌면 다시 병합)
+PRESET_BUNDLE_CACHE_SIZE = int(os.environ.get("PRESET_BUNDLE_CACHE_SIZE", "256"))
+# 프리셋 새로 고침(?refresh=true): 차트 SQL 동시 실행 수 / (탭, 스냅샷 버전, SQL) 결과 캐시 크기
+PRESET_REFRESH_CONCURRENCY = int(os.environ.get("PRESET_REFRESH_CONCURRENCY", "4"))
+SQL_RESULT_CACHE_SIZE = int(os.environ.get("SQL_RESULT_CACHE_SIZE", "256"))
+
+# 실시간 대시보드 갱신 (SSE /live, WebSocket /live/ws): 구독 중인 탭/프리셋의 새 스냅샷 버전 확인 주기 (0 이면 푸시 안 함)
+LIVE_UPDATE_INTERVAL_SECONDS = float(os.environ.get("LIVE_UPDATE_INTERVAL_SECONDS", "2"))
+# 구독자별 최대 대기 메시지 수 (넘으면 쌓인 diff 대신 전체 차트로 재동기화) / SSE keepalive 주기
+LIVE_MAX_PENDING = int(os.environ.get("LIVE_MAX_PENDING", "32"))
+LIVE_KEEPALIVE_SECONDS = float(os.environ.get("LIVE_KEEPALIVE_SECONDS", "15"))
+
+# 응답 압축: 협상 순서 (br 은 brotli 패키지가 있을 때만, 비우면 압축 안 함) / 최소 크기 / 압축 수준 / 압축 결과 캐시 수 (ETag 있는 응답)
+COMPRESSION_ENCODINGS = [e.strip() for e in os.environ.get("COMPRESSION_ENCODINGS", "br,gzip").split(",") if e.strip()]
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_CACHE_SIZE = int(os.environ.get("COMPRESSION_CACHE_SIZE", "128"))
+# 히스토리 상세는 쓴 뒤 바뀌지 않으므로 브라우저가 다시 묻지 않고 쓰는 시간 (초)
+HISTORY_CACHE_MAX_AGE_SECONDS = int(os.environ.get("HISTORY_CACHE_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+
+# LLM 스케줄러 설정 (전역 동시 호출 수, 사용자별 분당 요청 수/버스트, 대기열 상한, 사용자 가중치)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_USER_RATE_PER_MIN = float(os.environ.get("LLM_USER_RATE_PER_MIN", "30"))
+LLM_USER_BURST = int(os.environ.get("LLM_USER_BURST", "10"))
+LLM_MAX_QUEUE_DEPTH = int(os.environ.get("LLM_MAX_QUEUE_DEPTH", "100"))
+LLM_USER_WEIGHTS = json.loads(os.environ.get("LLM_USER_WEIGHTS", "{}"))  # 예: {"admin": 2}
+
+# 일괄 쿼리 설정 (LLM 동시 호출 상한, 요청당 최대 질문 수)
+LLM_BATCH_CONCURRENCY = int(os.environ.get("LLM_BATCH_CONCURRENCY", "4"))
+LLM_BATCH_MAX_QUESTIONS = int(os.environ.get("LLM_BATCH_MAX_QUESTIONS", "50"))
+
+# 대화 맥락 (사용자/탭별 최근 턴 수, 프롬프트에 넣을 이전 대화 토큰 예산, 유휴 만료 시간)
+CONVERSATION_MAX_TURNS = int(os.environ.get("CONVERSATION_MAX_TURNS", "10"))
+CONVERSATION_TOKEN_BUDGET = int(os.environ.get("CONVERSATION_TOKEN_BUDGET", "800"))
+CONVERSATION_IDLE_SECONDS = int(os.environ.get("CONVERSATION_IDLE_SECONDS", "1800"))
+
+# 규칙 기반 빠른 경로 (신뢰도가 임계치 이상이면 LLM 호출 없이 SQL 템플릿으로 응답)
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.environ.get("FAST_PATH_THRESHOLD", "0.8"))
+FAST_PATH_PATTERNS_PATH = os.environ.get("FAST_PATH_PATTERNS_PATH", "fast_path_patterns.json")
+
+# 요청 트레이싱 (Server-Timing 헤더 포함 여부, OTLP JSON 내보내기 파일/수집기 주소, 서비스 이름)
+TRACE_SERVER_TIMING = os.environ.get("TRACE_SERVER_TIMING", "true").lower() == "true"
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")
+TRACE_EXPORT_URL = os.environ.get("TRACE_EXPORT_URL", "")  # 예: http://localhost:4318
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "chart-analysis-backend")
+
 # 탭별 고정 SQL 쿼리
 TAB_QUERIES = {
     "tab1": """
@@ -92,40 +260,85 @@ TAB_QUERIES = {
     """
 }
 
+# 탭 원본 변경 감지 쿼리 (행 수 + 최종 변경 SCN) - 스냅샷 TTL 이 지나면 전체 재적재 대신 먼저 실행
+TAB_FINGERPRINT_QUERIES = {
+    "tab1": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM performance_data WHERE year >= 2022",
+    "tab2": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM products WHERE status = 'active'",
+    "tab3": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM customer_metrics WHERE last_order_date >= ADD_MONTHS(SYSDATE, -12)"
+}
+
 # SQLite in-memory DB 관리
 class MemoryDB:
-    def __init__(self):
-        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False, uri=True)
         self.conn.row_factory = sqlite3.Row
         
     def store_data(self, table_name: str, df: pd.DataFrame):
         """데이터프레임을 테이블로 저장"""
         df.to_sql(table_name, self.conn, if_exists='replace', index=False)
-        print(f"✅ {table_name} 테이블 저장 완료: {len(df)}행")
+        db_logger.info("✅ %s 테이블 저장 완료: %d행", table_name, len(df))
+    
+    def append_data(self, table_name: str, df: pd.DataFrame, replace: bool = False):
+        """청크를 테이블에 추가 (replace=True면 새로 생성)"""
+        df.to_sql(table_name, self.conn, if_exists='replace' if replace else 'append', index=False)
+    
+    def drop_table(self, table_name: str):
+        """테이블 삭제"""
+        self.conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        self.conn.commit()
+    
+    def swap_table(self, staging_name: str, table_name: str):
+        """스테이징 테이블을 대상 테이블로 원자적으로 교체"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            cursor.execute(f'ALTER TABLE "{staging_name}" RENAME TO "{table_name}"')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    @contextmanager
+    def read_transaction(self):
+        """여러 조회를 하나의 읽기 트랜잭션(일관된 스냅샷)으로 묶음"""
+        self.conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            self.conn.commit()
     
     def execute_query(self, query: str, timeout: int = 10) -> pd.DataFrame:
         """SQL 쿼리 실행"""
         try:
             return pd.read_sql_query(query, self.conn)
         except Exception as e:
-            print(f"❌ SQL 실행 오류: {e}")
-            print(f"   쿼리: {query}")
-            tables = pd.read_sql_query(
-                "SELECT name FROM sqlite_master WHERE type='table'", 
-                self.conn
-            )
-            print(f"   현재 테이블: {tables['name'].tolist()}")
+            db_logger.error("❌ SQL 실행 오류: %s", e, extra={"query": query})
+            if db_logger.isEnabledFor(logging.DEBUG):
+                # 테이블 목록 조회는 디버깅할 때만
+                tables = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+                db_logger.debug("현재 테이블: %s", [row[0] for row in tables])
             raise
     
     def table_exists(self, table_name: str) -> bool:
-        """테이블 존재 여부 확인"""
+        """테이블 존재 여부 확인 (ATTACH 한 스냅샷 파일 포함)"""
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT count(*) FROM sqlite_master WHERE type='table' AND name=?",
+            "SELECT count(*) FROM pragma_table_list WHERE type='table' AND name=?",
             (table_name,)
         )
         return cursor.fetchone()[0] > 0
     
+    def attach(self, schema: str, path: Path, mmap_size: int = 0):
+        """변경되지 않는 스냅샷 파일을 읽기 전용으로 연결 (mmap 으로 읽어 워커 간 페이지 캐시 공유)"""
+        self.conn.execute("ATTACH DATABASE ? AS " + f'"{schema}"', (f"{path.resolve().as_uri()}?mode=ro&immutable=1",))
+        if mmap_size:
+            self.conn.execute(f'PRAGMA "{schema}".mmap_size = {int(mmap_size)}')
+    
+    def detach(self, schema: str):
+        """연결한 스냅샷 파일 해제"""
+        self.conn.execute(f'DETACH DATABASE "{schema}"')
+    
     def get_table_info(self, table_name: str) -> List[Dict]:
         """테이블 스키마 정보 조회"""
         if not self.table_exists(table_name):
@@ -137,13 +350,134 @@ class MemoryDB:
     def close(self):
         self.conn.close()
 
+# LLM 호출 스케줄러
+llm_scheduler = LLMScheduler(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    rate_per_minute=LLM_USER_RATE_PER_MIN,
+    burst=LLM_USER_BURST,
+    max_queue_depth=LLM_MAX_QUEUE_DEPTH,
+    weights=LLM_USER_WEIGHTS
+)
+
+# 재시도/헤지/서킷 브레이커/장애 조치를 적용한 LLM 클라이언트
+llm_client = ResilientLLMClient(
+    LLM_API_URLS,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_RETRY_BACKOFF_SECONDS,
+    hedge=LLM_HEDGE,
+    failure_threshold=LLM_BREAKER_FAILURES,
+    reset_timeout=LLM_BREAKER_RESET_SECONDS
+)
+
 # 전역 메모리 DB 인스턴스
-memory_db = MemoryDB()
+memory_db = MemoryDB(LOCAL_DB_PATH)
+
+# 탭별 롤업 큐브 (차원 컬럼 조합으로 미리 집계, 스냅샷 적재 시 생성)
+ROLLUP_CUBES = {
+    "tab1": {"dimensions": ["year", "quarter", "category"], "measures": ["rating", "sales"]},
+    "tab2": {"dimensions": ["category"], "measures": ["price", "stock"]},
+    "tab3": {"dimensions": ["region"], "measures": ["total_orders", "satisfaction_score"]},
+}
+rollup_manager = RollupManager(ROLLUP_CUBES)
+
+# 워커 공유 스냅샷 저장소 (적재는 락을 잡은 워커 하나가, 나머지는 게시된 버전 파일을 연결해서 사용)
+snapshot_store = (
+    SnapshotStore(SNAPSHOT_STORE_DIR, SNAPSHOT_LOCK_TIMEOUT_SECONDS, SNAPSHOT_KEEP_VERSIONS,
+                  SNAPSHOT_RETENTION_HOURS * 3600)
+    if SNAPSHOT_STORE_DIR else None
+)
+
+# 사용자 공통 쿼리 라이브러리 (내용 주소 저장, 참조 수로 인기 질문 제안)
+query_library = QueryLibrary(QUERY_LIBRARY_DIR) if QUERY_LIBRARY_DIR else None
+
+def resolve_query_record(record: Dict) -> Dict:
+    """라이브러리 참조형 히스토리 레코드에 response 채움"""
+    return query_library.resolve(record) if query_library else record
+
+# 지표 (/metrics, Prometheus 텍스트 형식)
+# 요청 경로에서는 버킷 카운트 증가만 하고, 기존 통계(스케줄러/캐시 등)는 수집 시점에 읽는다.
+metrics = MetricsRegistry()
+QUERY_STAGE_SECONDS = metrics.histogram(
+    "llm_query_stage_seconds", "LLM 쿼리 처리 단계별 소요 시간", ["stage"])
+QUERY_SECONDS = metrics.histogram(
+    "llm_query_seconds", "LLM 쿼리 전체 처리 시간", ["answered_by"])
+QUERIES_TOTAL = metrics.counter(
+    "llm_queries_total", "LLM 쿼리 처리 건수", ["answered_by", "status"])
+TAB_LOAD_SECONDS = metrics.histogram(
+    "tab_snapshot_load_seconds", "탭 스냅샷 적재 시간 (Oracle 조회 + 로컬 DB 저장)", ["tab_id", "mode"])
+TAB_REQUEST_SECONDS = metrics.histogram(
+    "tab_data_request_seconds", "탭 데이터 요청 처리 시간", ["tab_id"])
+PRESET_LOAD_SECONDS = metrics.histogram(
+    "preset_load_seconds", "프리셋 로드 시간 (참조 쿼리 병합 포함)")
+SNAPSHOT_REVALIDATIONS_TOTAL = metrics.counter(
+    "tab_snapshot_revalidations_total", "TTL 경과 후 원본 변경 확인 결과 (unchanged/changed)", ["result"])
+PRESET_BUNDLE_CACHE_TOTAL = metrics.counter(
+    "preset_bundle_cache_total", "프리셋 번들 캐시 조회 결과", ["result"])
+CHART_CACHE_TOTAL = metrics.counter(
+    "default_chart_cache_total", "기본 차트 캐시 조회 결과", ["result"])
+SQL_RESULT_CACHE_TOTAL = metrics.counter(
+    "sql_result_cache_total", "스냅샷 버전별 SQL 결과 캐시 조회 결과", ["result"])
+NOT_MODIFIED_TOTAL = metrics.counter(
+    "http_not_modified_total", "조건부 GET 304 응답 수", ["endpoint"])
+PRESET_CHART_REFRESH_TOTAL = metrics.counter(
+    "preset_chart_refresh_total", "프리셋 차트 새로 고침 결과 (refreshed/failed)", ["result"])
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "requests_in_flight", "처리 중인 요청 수", ["endpoint"])
+ORACLE_CONNECTIONS_OPEN = metrics.gauge(
+    "oracle_connections_open", "열려 있는 Oracle 연결 수")
+
+# 요청 트레이서 (API 요청마다 트레이스, 단계마다 스팬)
+trace_exporter = (TraceExporter(TRACE_SERVICE_NAME, TRACE_EXPORT_FILE, TRACE_EXPORT_URL)
+                  if TRACE_EXPORT_FILE or TRACE_EXPORT_URL else None)
+tracer = Tracer(trace_exporter)
+
+@contextmanager
+def query_stage(stage: str, **attributes):
+    """LLM 쿼리 처리 단계 - 지연 히스토그램 + 트레이스 스팬"""
+    with tracer.span(stage, **attributes) as span, QUERY_STAGE_SECONDS.time(stage):
+        yield span
+
+# 응답 압축 (차트 raw_data / Chart.js 옵션이 큰 JSON 응답)
+response_compressor = ResponseCompressor(
+    tuple(COMPRESSION_ENCODINGS), COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY, COMPRESSION_CACHE_SIZE
+)
+app.add_middleware(CompressionMiddleware, compressor=response_compressor)
+
+# 요청 ID (X-Request-ID 헤더가 있으면 그대로 사용) - 로그와 LLM 호출 헤더에 전파
+# /api/ 요청은 트레이스를 열고 단계별 소요 시간을 Server-Timing 헤더로 돌려줌
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        if not request.url.path.startswith("/api/"):
+            response = await call_next(request)
+        else:
+            with tracer.trace(f"{request.method} {request.url.path}", request_id=request_id) as trace:
+                response = await call_next(request)
+                route = request.scope.get("route")
+                if route is not None:
+                    trace.root.name = f"{request.method} {route.path}"
+                trace.root.set(status_code=response.status_code)
+            if TRACE_SERVER_TIMING:
+                response.headers["Server-Timing"] = trace.server_timing()
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 # Pydantic 모델
 class LLMQuery(BaseModel):
     question: str
     tab_id: str
+    new_conversation: bool = False  # True면 이전 대화 맥락 없이 시작
+
+class LLMBatchQuery(BaseModel):
+    tab_id: str
+    questions: List[str]
+    max_concurrency: Optional[int] = None
 
 class PresetCreate(BaseModel):
     name: str
@@ -160,7 +494,7 @@ class PresetUpdate(BaseModel):
 TEST_MODE = os.environ.get("TEST_MODE", "false").lower() == "true"
 
 if TEST_MODE:
-    print("🧪 테스트 모드 활성화 - Oracle 연결 없이 샘플 데이터 사용")
+    logger.info("🧪 테스트 모드 활성화 - Oracle 연결 없이 샘플 데이터 사용")
 
 # Oracle DB 연결 함수
 def get_oracle_connection():
@@ -172,20 +506,19 @@ def get_oracle_connection():
                 pass
         return DummyConnection()
     
+    oracledb = load_oracledb()
     try:
-        print(f"🔌 Oracle DB 연결 시도: {ORACLE_DSN}")
+        db_logger.info("🔌 Oracle DB 연결 시도: %s", ORACLE_DSN)
         connection = oracledb.connect(
             user=ORACLE_USER,
             password=ORACLE_PASSWORD,
             dsn=ORACLE_DSN
         )
-        print("✅ Oracle DB 연결 성공")
+        db_logger.info("✅ Oracle DB 연결 성공")
         return connection
     except oracledb.Error as e:
         error_obj, = e.args
-        print(f"❌ Oracle DB 연결 실패:")
-        print(f"   - 오류 코드: {error_obj.code}")
-        print(f"   - 오류 메시지: {error_obj.message}")
+        db_logger.error("❌ Oracle DB 연결 실패: %s", error_obj.message, extra={"oracle_code": error_obj.code})
         
         if error_obj.code == 12541:
             raise HTTPException(
@@ -203,7 +536,7 @@ def get_oracle_connection():
                 detail=f"Oracle DB 연결 실패: {error_obj.message}"
             )
     except Exception as e:
-        print(f"❌ 예상치 못한 오류: {str(e)}")
+        db_logger.exception("❌ 예상치 못한 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"데이터베이스 연결 실패: {str(e)}")
 
 # 데이터를 Chart.js 형식으로 변환
@@ -311,55 +644,467 @@ def check_and_create_tables(conn):
         exists = cursor.fetchone()[0] > 0
         
         if not exists:
-            print(f"📝 {table} 테이블 생성 중...")
+            db_logger.info("📝 %s 테이블 생성 중...", table)
             # 테이블 생성 로직 (간략화)
             conn.commit()
-            print(f"✅ {table} 테이블 생성 완료")
+            db_logger.info("✅ %s 테이블 생성 완료", table)
+
+# 탭별 최근 Oracle 조회 통계 / 적재 진행 상황
+fetch_stats: Dict[str, Dict[str, Any]] = {}
+load_progress: Dict[str, Dict[str, Any]] = {}
+
+# 탭별 현재 스냅샷 버전 및 버전별 기본 차트 / 테이블 스키마 캐시
+snapshot_versions: Dict[str, Dict[str, Any]] = {}
+chart_cache: Dict[str, Dict[str, Any]] = {}
+schema_cache: Dict[str, Dict[str, Any]] = {}
+
+# 탭별 기본 차트 레지스트리
+chart_registry = load_chart_registry(DEFAULT_CHARTS_PATH)
+
+# LLM 구조화 출력 모드 / 응답 파서 (파싱 결과 집계)
+response_format_negotiator = ResponseFormatNegotiator(LLM_RESPONSE_FORMAT, LLM_RESPONSE_FORMAT_RETRY_SECONDS)
+llm_reply_parser = LLMReplyParser()
+
+# 규칙 기반 빠른 경로 (탭별 질문 패턴 + 스키마 카탈로그)
+fast_path = FastPathMatcher(*load_fast_path_patterns(FAST_PATH_PATTERNS_PATH), threshold=FAST_PATH_THRESHOLD)
+
+def _report_load_progress(tab_id: str, state: Dict[str, Any]):
+    """스트리밍 적재 진행 상황 기록"""
+    load_progress[tab_id] = state
+    if state["status"] == "loading" and state["chunks"]:
+        logger.info("⏳ %s 적재 중: %d행 (%d청크)", tab_id, state["rows"], state["chunks"])
+
+def _store_frame(db: MemoryDB, table_name: str, df: pd.DataFrame, aggregators: List[Any]):
+    """DataFrame 전체를 저장하고 같은 데이터로 기본 차트 집계"""
+    with tracer.span("sqlite_store", rows=len(df)):
+        db.store_data(table_name, df)
+        for aggregator in aggregators:
+            aggregator.update(df)
+
+def _publish_snapshot(tab_id: str, total_rows: int, fingerprint: str):
+    """적재 완료된 스냅샷에 새 버전 부여 및 롤업 큐브 재생성"""
+    with tracer.span("rollup_build"):
+        rollup_manager.build(memory_db, tab_id)
+    snapshot_versions[tab_id] = {
+        "version": uuid.uuid4().hex[:12],
+        "loaded_at": datetime.now().isoformat(),
+        "rows": total_rows,
+        "fingerprint": fingerprint,
+        "validated_at": time.time()
+    }
+
+@functools.lru_cache(maxsize=None)
+def _snapshot_source_key(tab_id: str) -> str:
+    """스냅샷 내용을 결정하는 설정(원본 쿼리, 기본 차트/롤업 정의, 테스트 데이터 설정)의 해시
+    
+    배포로 이 값이 바뀌면 디스크에 남은 이전 스냅샷은 쓰지 않고 새로 적재한다.
+    """
+    spec = [TAB_QUERIES[tab_id], chart_registry.get(tab_id), ROLLUP_CUBES.get(tab_id),
+            TEST_MODE and [SAMPLE_DATA_SCALE, SAMPLE_DATA_SEED]]
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _source_fingerprint(tab_id: str, conn=None) -> str:
+    """원본 데이터 지문 (같으면 마지막 적재 이후 원본이 바뀌지 않은 것으로 봄)"""
+    if TEST_MODE:
+        return f"test:{SAMPLE_DATA_SCALE}:{SAMPLE_DATA_SEED}"
+    own_conn = conn is None
+    if own_conn:
+        conn = get_oracle_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(TAB_FINGERPRINT_QUERIES[tab_id])
+        return ":".join(str(value) for value in cursor.fetchone())
+    finally:
+        if own_conn:
+            conn.close()
+
+def _tab_load_mode() -> str:
+    return "sample" if TEST_MODE else ("streaming" if TAB_LOAD_CHUNK_ROWS > 0 else "full")
+
+def load_tab_snapshot(tab_id: str, aggregators: Optional[List[Any]] = None) -> int:
+    """탭 원본 데이터를 로컬 DB에 적재하고 행 수 반환 (실패/빈 결과 시 샘플 데이터)
+    
+    aggregators 는 update(chunk) 를 가진 객체 목록이며 적재와 같은 스캔에서 집계된다.
+    """
+    mode = _tab_load_mode()
+    with tracer.span("tab_snapshot_load", tab_id=tab_id, mode=mode) as span, TAB_LOAD_SECONDS.time(tab_id, mode):
+        if snapshot_store:
+            rows = _load_shared_snapshot(tab_id, aggregators or [])
+        else:
+            rows, fingerprint = _load_tab_snapshot(tab_id, memory_db, aggregators)
+            _publish_snapshot(tab_id, rows, fingerprint)
+        if span:
+            span.set(rows=rows)
+        return rows
+
+def _load_tab_snapshot(tab_id: str, db: MemoryDB, aggregators: Optional[List[Any]] = None) -> Tuple[int, str]:
+    """원본(Oracle/테스트 데이터)을 db 에 {tab_id}_data 로 적재하고 (행 수, 원본 지문) 반환"""
+    table_name = f"{tab_id}_data"
+    aggregators = aggregators or []
+    
+    if TEST_MODE and SAMPLE_DATA_SCALE > 0:
+        # 대용량 합성 데이터를 운영 경로와 같은 청크 스트리밍 적재로
+        logger.info("🧪 테스트 모드: %s 합성 데이터 생성 (스케일 %s)", tab_id, SAMPLE_DATA_SCALE)
+        # 합성 데이터 생성기(CLI 겸용)는 테스트 모드에서 스케일을 줬을 때만 필요하므로 여기서 임포트
+        from synthetic_data import SyntheticDataGenerator
+        generator = SyntheticDataGenerator(SAMPLE_DATA_SCALE, SAMPLE_DATA_SEED)
+        state = stream_to_db(
+            generator.iter_tab_chunks(tab_id, TAB_LOAD_CHUNK_ROWS or ORACLE_FETCH_ARRAYSIZE),
+            db,
+            table_name,
+            aggregators,
+            progress=lambda s: _report_load_progress(tab_id, s)
+        )
+        tracer.add_span("synthetic_generate", state["seconds"] - state["store_seconds"], rows=state["rows"])
+        tracer.add_span("sqlite_store", state["store_seconds"], rows=state["rows"])
+        fetch_stats[tab_id] = {**state, "method": "synthetic", "timestamp": datetime.now().isoformat()}
+        return state["rows"], _source_fingerprint(tab_id)
+    
+    if TEST_MODE:
+        logger.info("🧪 테스트 모드: %s 샘플 데이터 생성", tab_id)
+        df = generate_sample_data(tab_id)
+        _store_frame(db, table_name, df, aggregators)
+        return len(df), _source_fingerprint(tab_id)
+    
+    conn = get_oracle_connection()
+    ORACLE_CONNECTIONS_OPEN.inc()
+    try:
+        check_and_create_tables(conn)
+        # 조회 전에 지문을 떠서, 조회 중 바뀐 원본은 다음 확인 때 다시 적재되게 함
+        fingerprint = _source_fingerprint(tab_id, conn)
+        if TAB_LOAD_CHUNK_ROWS > 0:
+            state = stream_to_db(
+                iter_dataframe_chunks(conn, TAB_QUERIES[tab_id], TAB_LOAD_CHUNK_ROWS),
+                db,
+                table_name,
+                aggregators,
+                progress=lambda s: _report_load_progress(tab_id, s)
+            )
+            total_rows = state["rows"]
+            # 청크 조회와 저장이 번갈아 일어나므로 누적 시간으로 두 스팬을 기록
+            tracer.add_span("oracle_fetch", state["seconds"] - state["store_seconds"], rows=total_rows)
+            tracer.add_span("sqlite_store", state["store_seconds"], rows=total_rows)
+            fetch_stats[tab_id] = {**state, "method": "streaming", "timestamp": datetime.now().isoformat()}
+            logger.info("✅ 데이터 스트리밍 적재 완료: %d행, %ss, 최대 RSS %sMB",
+                        total_rows, state["seconds"], state["peak_rss_mb"], extra={"tab_id": tab_id})
+        else:
+            with tracer.span("oracle_fetch"):
+                df, stats = fetch_dataframe(conn, TAB_QUERIES[tab_id], ORACLE_FETCH_ARRAYSIZE)
+            fetch_stats[tab_id] = {**stats, "timestamp": datetime.now().isoformat()}
+            logger.info("✅ 데이터 로드 완료: %s", format_stats(stats), extra={"tab_id": tab_id})
+            total_rows = len(df)
+            if total_rows:
+                _store_frame(db, table_name, normalize_columns(df), aggregators)
+            del df
+    finally:
+        conn.close()
+        ORACLE_CONNECTIONS_OPEN.dec()
+    
+    if total_rows == 0:
+        logger.warning("⚠️ %s 데이터가 없습니다. 샘플 데이터를 생성합니다...", tab_id)
+        df = generate_sample_data(tab_id)
+        _store_frame(db, table_name, df, aggregators)
+        total_rows = len(df)
+    
+    return total_rows, fingerprint
+
+def _attach_shared_snapshot(tab_id: str) -> Optional[Dict[str, Any]]:
+    """디스크 저장소에 게시된 현재 버전을 연결 (새 버전이 게시됐으면 교체) 후 버전 정보 반환
+    
+    manifest stat 한 번으로 확인하므로 요청마다 호출해도 된다. 연결은 mmap 설정만 하고 데이터는
+    읽지 않으므로 재시작 직후 첫 요청도 적재 없이 바로 응답한다.
+    새 버전을 먼저 연결한 뒤 이전 버전을 해제하므로 연결에 실패해도 이전 버전으로 계속 응답한다.
+    """
+    current = snapshot_store.current(tab_id)
+    if current is None or current.get("source_key") != _snapshot_source_key(tab_id):
+        # 없거나 다른 설정(이전 배포의 쿼리/차트 정의)으로 만든 스냅샷
+        return snapshot_versions.get(tab_id)
+    snapshot = snapshot_versions.get(tab_id)
+    if snapshot and snapshot["version"] == current["version"]:
+        # 다른 워커가 원본 변경 없음을 확인했으면 그 시각을 반영
+        snapshot["validated_at"] = max(snapshot["validated_at"], current["validated_at"])
+        return snapshot
+    
+    schema = f"snap_{tab_id}_{current['version']}"
+    memory_db.attach(schema, snapshot_store.version_path(tab_id, current["version"]), SNAPSHOT_MMAP_BYTES)
+    if snapshot:
+        memory_db.detach(f"snap_{tab_id}_{snapshot['version']}")
+    rollup_manager.register(f"{tab_id}_data", current.get("rollup"))
+    row = memory_db.conn.execute(f'SELECT payload FROM "{schema}".default_charts').fetchone()
+    chart_cache[tab_id] = {"version": current["version"], "charts": json.loads(row[0])}
+    snapshot = snapshot_versions[tab_id] = {
+        "version": current["version"],
+        "loaded_at": current["loaded_at"],
+        "rows": current["rows"],
+        "fingerprint": current["fingerprint"],
+        "validated_at": current["validated_at"]
+    }
+    logger.info("🔗 %s 스냅샷 %s 연결 (%d행, %s 적재)", tab_id, current["version"], current["rows"], current["loaded_at"])
+    return snapshot
+
+def _json_default(value: Any) -> Any:
+    """numpy 스칼라 등을 JSON 기본 타입으로"""
+    return value.item() if hasattr(value, "item") else str(value)
+
+def _load_shared_snapshot(tab_id: str, aggregators: List[Any]) -> int:
+    """새 버전을 게시(적재 담당으로 선출된 경우)하거나 다른 워커가 게시한 버전을 연결하고 행 수 반환
+    
+    이미 연결한 이전 버전이 있으면 다른 워커의 적재를 기다리지 않고 이전 버전으로 응답한다.
+    """
+    previous = _attach_shared_snapshot(tab_id)
+    _publish_shared_snapshot(tab_id, aggregators, wait=previous is None)
+    return _attach_shared_snapshot(tab_id)["rows"]
+
+def _publish_shared_snapshot(tab_id: str, aggregators: List[Any], wait: bool = True) -> bool:
+    """적재 담당으로 선출되면 새 버전 파일을 만들어 게시 (게시했으면 True)
+    
+    로컬 DB(memory_db)는 건드리지 않으므로 스레드에서 실행해도 된다.
+    기본 차트와 롤업 큐브도 버전 파일에 함께 넣어 다른 워커가 다시 집계하지 않게 한다.
+    """
+    requested_at = time.time()
+    with snapshot_store.loader_lock(tab_id, wait=wait) as leader:
+        current = snapshot_store.current(tab_id)
+        if not leader or (current and current["published_at"] >= requested_at
+                          and current.get("source_key") == _snapshot_source_key(tab_id)):
+            # 다른 워커가 적재 중이거나, 기다리는 동안 새 버전을 게시함
+            return False
+        
+        aggregation = next((a for a in aggregators if isinstance(a, ChartAggregationPass)), None)
+        if aggregation is None:
+            aggregation = ChartAggregationPass(chart_registry.get(tab_id, []))
+            aggregators = aggregators + [aggregation]
+        
+        version, staging_path = snapshot_store.new_version(tab_id)
+        target = MemoryDB(str(staging_path))
+        try:
+            # 게시 전 fsync 한 번으로 내구성을 확보하므로 적재 중 저널/동기화는 끔
+            target.conn.execute("PRAGMA journal_mode = OFF")
+            target.conn.execute("PRAGMA synchronous = OFF")
+            rows, fingerprint = _load_tab_snapshot(tab_id, target, aggregators)
+            columns = [{"name": c["name"], "type": c["type"]} for c in target.get_table_info(f"{tab_id}_data")]
+            with tracer.span("rollup_build"):
+                cube = rollup_manager.build(target, tab_id)
+            with tracer.span("chart_build", tab_id=tab_id):
+                charts = build_default_charts(tab_id, aggregation.results())
+            target.conn.execute("CREATE TABLE default_charts (payload TEXT)")
+            target.conn.execute("INSERT INTO default_charts VALUES (?)",
+                                (json.dumps(charts, ensure_ascii=False, default=_json_default),))
+            target.conn.commit()
+            target.close()
+        except Exception:
+            target.close()
+            snapshot_store.discard(staging_path)
+            raise
+        snapshot_store.publish(
+            tab_id, version, staging_path,
+            rows=rows, columns=columns, fingerprint=fingerprint,
+            source_key=_snapshot_source_key(tab_id), rollup=cube
+        )
+        return True
+
+def _stored_snapshot_is_fresh(tab_id: str) -> bool:
+    """디스크 저장소의 현재 버전이 지금 설정으로 만든 것이고 TTL 이내(또는 원본 변경 없음)인지 확인"""
+    current = snapshot_store.current(tab_id)
+    if not current or current.get("source_key") != _snapshot_source_key(tab_id):
+        return False
+    if time.time() - current["validated_at"] < TAB_SNAPSHOT_TTL_SECONDS:
+        return True
+    return _revalidate_snapshot(tab_id, dict(current))
+
+def _revalidate_snapshot(tab_id: str, snapshot: Dict[str, Any]) -> bool:
+    """원본 지문이 적재 때와 같으면 전체 재적재 없이 스냅샷 유효 시간 연장"""
+    with tracer.span("snapshot_revalidate", tab_id=tab_id) as span:
+        try:
+            unchanged = _source_fingerprint(tab_id) == snapshot["fingerprint"]
+        except Exception as e:
+            logger.warning("⚠️ %s 원본 변경 확인 실패, 다시 적재합니다: %s", tab_id, e)
+            unchanged = False
+        if span:
+            span.set(unchanged=unchanged)
+    SNAPSHOT_REVALIDATIONS_TOTAL.labels("unchanged" if unchanged else "changed").inc()
+    if unchanged:
+        snapshot["validated_at"] = time.time()
+        if snapshot_store:
+            snapshot_store.mark_validated(tab_id, snapshot["version"])
+        logger.info("✅ %s 원본 변경 없음, 스냅샷 %s 계속 사용", tab_id, snapshot["version"])
+    return unchanged
+
+def _snapshot_is_fresh(tab_id: str) -> bool:
+    """로컬 스냅샷이 있고 TTL 이내인지 (TTL 이 지났으면 원본이 바뀌지 않았는지) 확인"""
+    if snapshot_store:
+        _attach_shared_snapshot(tab_id)
+    snapshot = snapshot_versions.get(tab_id)
+    if not snapshot or not memory_db.table_exists(f"{tab_id}_data"):
+        return False
+    if time.time() - snapshot["validated_at"] < TAB_SNAPSHOT_TTL_SECONDS:
+        return True
+    return _revalidate_snapshot(tab_id, snapshot)
+
+def current_snapshot_version(tab_id: Optional[str]) -> Optional[str]:
+    """탭의 현재 스냅샷 버전 (다른 워커가 게시한 새 버전이 있으면 연결, 이 워커에 아직 적재 전이면 None)"""
+    if snapshot_store and tab_id:
+        _attach_shared_snapshot(tab_id)
+    return snapshot_versions.get(tab_id, {}).get("version")
+
+def build_default_charts(tab_id: str, frames: Dict[str, pd.DataFrame]) -> List[Dict[str, Any]]:
+    """레지스트리 정의와 집계 결과로 Chart.js 차트 목록 생성"""
+    charts = []
+    for spec in chart_registry.get(tab_id, []):
+        frame = frames.get(spec["id"])
+        if frame is None or frame.empty:
+            continue
+        chart_config = convert_to_chartjs_format(frame, spec["chart_type"])
+        if chart_config:
+            chart_config["options"]["plugins"]["title"] = {
+                "display": True,
+                "text": spec["title"]
+            }
+            charts.append({
+                "id": spec["id"],
+                "config": chart_config,
+                "raw_data": frame.to_dict('records')
+            })
+    return charts
+
+def _scan_default_charts(tab_id: str) -> Dict[str, pd.DataFrame]:
+    """적재 시 집계하지 못한 스냅샷(LLM 쿼리로 먼저 적재된 경우 등)을 한 번 스캔해 집계"""
+    aggregation = ChartAggregationPass(chart_registry.get(tab_id, []))
+    if not aggregation.charts:
+        return {}
+    columns = ", ".join(aggregation.columns)
+    for chunk in pd.read_sql_query(
+        f'SELECT {columns} FROM "{tab_id}_data"', memory_db.conn,
+        chunksize=TAB_LOAD_CHUNK_ROWS or ORACLE_FETCH_ARRAYSIZE
+    ):
+        aggregation.update(chunk)
+    return aggregation.results()
+
+def get_default_charts(tab_id: str, refresh: bool = False, revalidate: bool = True) -> Dict[str, Any]:
+    """스냅샷 버전 기준으로 캐시된 기본 차트 반환 (스냅샷이 오래됐으면 재적재하며 같은 스캔에서 집계)
+    
+    revalidate=False 면 스냅샷이 있는 한 유효 시간을 확인하지 않는다 (prepare_shared_snapshot 이 이미 확인한 경우).
+    """
+    if revalidate:
+        reloaded = refresh or not _snapshot_is_fresh(tab_id)
+    else:
+        reloaded = refresh or tab_id not in snapshot_versions
+    if reloaded:
+        CHART_CACHE_TOTAL.labels("reload").inc()
+        aggregation = ChartAggregationPass(chart_registry.get(tab_id, []))
+        load_tab_snapshot(tab_id, [aggregation])
+        # 공유 저장소를 쓰면 적재(또는 다른 워커가 게시한 버전 연결) 중에 차트 캐시가 채워짐
+        if chart_cache.get(tab_id, {}).get("version") != snapshot_versions[tab_id]["version"]:
+            with tracer.span("chart_build", tab_id=tab_id):
+                chart_cache[tab_id] = {
+                    "version": snapshot_versions[tab_id]["version"],
+                    "charts": build_default_charts(tab_id, aggregation.results())
+                }
+    
+    snapshot = snapshot_versions[tab_id]
+    cached = chart_cache.get(tab_id)
+    if not cached or cached["version"] != snapshot["version"]:
+        CHART_CACHE_TOTAL.labels("miss").inc()
+        with tracer.span("chart_scan", tab_id=tab_id):
+            cached = chart_cache[tab_id] = {
+                "version": snapshot["version"],
+                "charts": build_default_charts(tab_id, _scan_default_charts(tab_id))
+            }
+    elif not reloaded:
+        CHART_CACHE_TOTAL.labels("hit").inc()
+        tracer.add_span("chart_cache_hit", 0.0, version=snapshot["version"])
+    return {
+        "charts": cached["charts"],
+        "total_rows": snapshot["rows"],
+        "snapshot_version": snapshot["version"],
+        "snapshot_loaded_at": snapshot["loaded_at"]
+    }
+
+async def prepare_shared_snapshot(tab_id: str, refresh: bool = False):
+    """공유 스냅샷 저장소의 새 버전 적재(다른 워커의 적재 락 대기 포함)를 스레드에서 실행한 뒤 연결
+    
+    락 대기와 적재가 이벤트 루프를 막지 않게 하고, memory_db 연결(attach)만 이벤트 루프에서 한다.
+    연결된 버전이 TTL 이내면 스레드로 넘기지 않는다.
+    """
+    previous = _attach_shared_snapshot(tab_id)
+    if not refresh and previous and time.time() - previous["validated_at"] < TAB_SNAPSHOT_TTL_SECONDS:
+        return
+    
+    def publish():
+        if refresh or not _stored_snapshot_is_fresh(tab_id):
+            mode = _tab_load_mode()
+            with tracer.span("tab_snapshot_load", tab_id=tab_id, mode=mode), TAB_LOAD_SECONDS.time(tab_id, mode):
+                # 이미 연결한 이전 버전이 있으면 다른 워커의 적재를 기다리지 않음
+                _publish_shared_snapshot(tab_id, [], wait=previous is None)
+    
+    await asyncio.to_thread(publish)
+    _attach_shared_snapshot(tab_id)
 
-# 사용자 데이터 저장 경로
+async def fetch_default_charts(tab_id: str, refresh: bool = False) -> Dict[str, Any]:
+    """이벤트 루프에서 쓰는 get_default_charts (공유 스냅샷 적재는 prepare_shared_snapshot 으로 스레드에서)"""
+    if snapshot_store:
+        await prepare_shared_snapshot(tab_id, refresh)
+        return get_default_charts(tab_id, revalidate=False)
+    return get_default_charts(tab_id, refresh)
+
+def get_table_schema(table_name: str) -> List[Dict]:
+    """스냅샷 버전별로 캐시한 테이블 스키마 (LLM 프롬프트/빠른 경로용)"""
+    version = snapshot_versions.get(table_name.removesuffix("_data"), {}).get("version")
+    cached = schema_cache.get(table_name)
+    if cached and version and cached["version"] == version:
+        return cached["columns"]
+    columns = memory_db.get_table_info(table_name)
+    if version:
+        schema_cache[table_name] = {"version": version, "columns": columns}
+    return columns
+
+# 사용자 데이터 저장 경로 (디렉터리는 시작 단계에서 생성)
 USER_DATA_PATH = Path("user_data")
-USER_DATA_PATH.mkdir(exist_ok=True)
+
+# 사용자 JSON 상태 파일 (메타데이터, 히스토리/프리셋 인덱스) 원자적 쓰기와 사용자별 락
+# (스레드 락 + flock 을 동기로 기다리므로 async 핸들러에서는 asyncio.to_thread 로 호출)
+state_store = UserStateStore(USER_DATA_PATH)
 
 class UserSessionManager:
     """사용자별 세션 및 히스토리 관리"""
     
     def __init__(self):
-        self.sessions = {}
+        # 사용자 -> 탭 -> ConversationSession (메모리 내 대화 맥락)
+        self.sessions: Dict[str, Dict[str, ConversationSession]] = {}
+    
+    def _update_metadata(self, username: str, fn) -> Dict:
+        """사용자 메타데이터 잠금 읽기-수정-쓰기 (없으면 생성, 마지막 접근 시각 갱신)"""
+        def apply(metadata: Dict) -> Dict:
+            if not metadata:
+                metadata.update({
+                    "username": username,
+                    "created_at": datetime.now().isoformat(),
+                    "total_queries": 0,
+                    "total_charts": 0
+                })
+            metadata["last_accessed"] = datetime.now().isoformat()
+            fn(metadata)
+            return dict(metadata)
+        return state_store.update(username, "metadata.json", apply, dict)
     
     def get_or_create_user(self, username: str) -> Dict:
         """사용자 정보 가져오기 또는 생성"""
-        user_path = USER_DATA_PATH / username
-        user_path.mkdir(exist_ok=True)
-        
-        meta_file = user_path / "metadata.json"
-        if meta_file.exists():
-            with open(meta_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-        else:
-            metadata = {
-                "username": username,
-                "created_at": datetime.now().isoformat(),
-                "last_accessed": datetime.now().isoformat(),
-                "total_queries": 0,
-                "total_charts": 0
-            }
-            self.save_metadata(username, metadata)
-        
-        metadata["last_accessed"] = datetime.now().isoformat()
-        self.save_metadata(username, metadata)
-        
-        return metadata
+        return self._update_metadata(username, lambda metadata: None)
+    
+    def record_queries(self, username: str, queries: int, charts: int) -> Dict:
+        """쿼리/차트 수 누적 (여러 요청이 동시에 와도 빠지지 않게 잠금 안에서 증가)"""
+        def add(metadata: Dict):
+            metadata["total_queries"] += queries
+            metadata["total_charts"] += charts
+        return self._update_metadata(username, add)
     
     def save_metadata(self, username: str, metadata: Dict):
         """사용자 메타데이터 저장"""
-        meta_file = USER_DATA_PATH / username / "metadata.json"
-        with open(meta_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        state_store.write(username, "metadata.json", metadata)
     
-    def save_query_history(self, username: str, query_data: Dict):
-        """LLM 쿼리 히스토리 저장"""
+    def _write_query_record(self, username: str, query_data: Dict) -> Dict:
+        """개별 쿼리 파일 저장"""
         history_path = USER_DATA_PATH / username / "queries"
-        history_path.mkdir(exist_ok=True)
+        history_path.mkdir(parents=True, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         query_id = f"{timestamp}_{uuid.uuid4().hex[:8]}"
@@ -370,38 +1115,72 @@ class UserSessionManager:
             "tab_id": query_data.get("tab_id"),
             "question": query_data.get("question"),
             "response": query_data.get("response"),
-            "chart_generated": query_data.get("chart_generated", False)
+            "chart_generated": query_data.get("chart_generated", False),
+            # 응답(SQL 결과)을 만든 스냅샷 버전 - 라이브러리 항목을 재사용하는 경우 그 항목의 버전을 그대로
+            "snapshot_version": (query_data["snapshot_version"] if "snapshot_version" in query_data
+                                 else snapshot_versions.get(query_data.get("tab_id"), {}).get("version"))
         }
+        if query_data.get("trace"):
+            query_record["trace"] = query_data["trace"]
         
-        query_file = history_path / f"{query_id}.json"
-        with open(query_file, 'w', encoding='utf-8') as f:
-            json.dump(query_record, f, ensure_ascii=False, indent=2)
+        # 응답은 공통 라이브러리에 한 번만 저장하고 히스토리 파일에는 참조만 기록
+        stored_record = query_record
+        if query_library and isinstance(query_record["response"], dict):
+            try:
+                response_ref = query_library.intern(
+                    username, query_id, query_record["tab_id"], query_record["question"],
+                    query_record["response"], query_record["snapshot_version"]
+                )
+                stored_record = {k: v for k, v in query_record.items() if k != "response"}
+                stored_record["response_ref"] = response_ref
+            except Exception as e:
+                logger.warning("⚠️ 쿼리 라이브러리 저장 실패, 응답을 히스토리에 직접 저장합니다: %s", e)
         
-        self.update_history_index(username, query_record)
+        atomic_write_json(history_path / f"{query_id}.json", stored_record)
         
-        return query_id
+        return query_record
+    
+    def save_query_history(self, username: str, query_data: Dict):
+        """LLM 쿼리 히스토리 저장"""
+        query_record = self._write_query_record(username, query_data)
+        self.update_history_index(username, query_record)
+        return query_record["id"]
+    
+    def save_query_history_batch(self, username: str, query_data_list: List[Dict]) -> List[str]:
+        """여러 쿼리 히스토리 저장 (인덱스는 한 번만 갱신)"""
+        records = [self._write_query_record(username, query_data) for query_data in query_data_list]
+        if records:
+            self.update_history_index_batch(username, records)
+        return [record["id"] for record in records]
     
     def update_history_index(self, username: str, query_record: Dict):
         """히스토리 인덱스 업데이트"""
-        index_file = USER_DATA_PATH / username / "history_index.json"
-        
-        if index_file.exists():
-            with open(index_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        else:
-            history = []
+        self.update_history_index_batch(username, [query_record])
+    
+    def update_history_index_batch(self, username: str, query_records: List[Dict]):
+        """히스토리 인덱스에 여러 항목 추가 (동시 요청의 추가는 그룹 커밋으로 한 번에 기록)"""
+        entries = [
+            {
+                "id": query_record["id"],
+                "timestamp": query_record["timestamp"],
+                "question": query_record["question"][:100],
+                "chart_generated": query_record["chart_generated"]
+            }
+            for query_record in reversed(query_records)
+        ]
         
-        history.insert(0, {
-            "id": query_record["id"],
-            "timestamp": query_record["timestamp"],
-            "question": query_record["question"][:100],
-            "chart_generated": query_record["chart_generated"]
-        })
+        def prepend(history: List[Dict]):
+            # 최신 항목을 앞에 추가, 최근 100개만 유지
+            history[:0] = entries
+            del history[100:]
         
-        history = history[:100]  # 최근 100개만 유지
+        state_store.commit(username, "history_index.json", prepend, list)
         
-        with open(index_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        # 검색 색인은 부가 기능이라 실패해도 저장은 성공으로 처리 (다음 검색 때 queries/ 와 동기화)
+        try:
+            history_search.add(username, query_records)
+        except Exception as e:
+            logger.warning("⚠️ 히스토리 검색 색인 실패: %s", e)
     
     def get_user_history(self, username: str, limit: int = 50) -> List[Dict]:
         """사용자 히스토리 조회"""
@@ -414,6 +1193,64 @@ class UserSessionManager:
             history = json.load(f)
         
         return history[:limit]
+    
+    def expire_idle_sessions(self) -> int:
+        """유휴 시간이 지난 대화 세션 제거"""
+        expired = 0
+        for username in list(self.sessions):
+            tabs = self.sessions[username]
+            for tab_id in [t for t, session in tabs.items() if session.is_idle(CONVERSATION_IDLE_SECONDS)]:
+                del tabs[tab_id]
+                expired += 1
+            if not tabs:
+                del self.sessions[username]
+        return expired
+    
+    def get_conversation(self, username: str, tab_id: str, create: bool = True) -> Optional[ConversationSession]:
+        """사용자/탭 대화 세션 (없으면 생성)"""
+        self.expire_idle_sessions()
+        tabs = self.sessions.setdefault(username, {}) if create else self.sessions.get(username, {})
+        if tab_id not in tabs and create:
+            tabs[tab_id] = ConversationSession(CONVERSATION_MAX_TURNS, CONVERSATION_TOKEN_BUDGET)
+        return tabs.get(tab_id)
+    
+    def reset_conversation(self, username: str, tab_id: str) -> bool:
+        """대화 세션 초기화"""
+        return self.sessions.get(username, {}).pop(tab_id, None) is not None
+
+# 병합한 프리셋 번들 캐시 ((사용자, 프리셋 ID) -> 읽은 파일들의 상태와 번들, LRU)
+preset_bundle_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int, int]]:
+    """파일 변경 확인용 (mtime, 크기, inode) - 없으면 None"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _chart_snapshot_status(query_data: Dict) -> Dict[str, Any]:
+    """참조 쿼리 차트의 스냅샷 기준 (current: 현재 버전 결과, stale: 이전 버전 결과, unknown: 버전 기록 없음/탭 미적재)"""
+    tab_id = query_data.get("tab_id")
+    version = query_data.get("snapshot_version")
+    current = current_snapshot_version(tab_id)
+    response = query_data.get("response") or {}
+    return {
+        "query_id": query_data.get("id"),
+        "tab_id": tab_id,
+        "version": version,
+        "current_version": current,
+        "status": "unknown" if not (version and current) else "current" if version == current else "stale",
+        "refreshable": response.get("chart_request") == 1 and bool(response.get("sql_query"))
+    }
+
+def _iso_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+PRESET_INDEX_FILE = "presets/preset_index.json"
+
+def _empty_preset_index() -> Dict:
+    return {"presets": [], "last_updated": ""}
 
 class PresetManager:
     """프리셋 관리 클래스"""
@@ -440,10 +1277,11 @@ class PresetManager:
             "grid_config": preset_data["grid_config"]
         }
         
-        # 개별 프리셋 파일 저장
+        # 개별 프리셋 파일 저장 (보관 작업과 엇갈리지 않게 사용자 보관 락 안에서, 참조한 보관 쿼리는 복원)
         preset_file = self.preset_path / f"{preset_id}.json"
-        with open(preset_file, 'w', encoding='utf-8') as f:
-            json.dump(preset_record, f, ensure_ascii=False, indent=2)
+        with history_archive.user_lock(self.username):
+            atomic_write_json(preset_file, preset_record)
+            self.restore_referenced_queries(preset_record["grid_config"])
         
         # 프리셋 인덱스 업데이트
         self.update_preset_index(preset_record)
@@ -451,27 +1289,29 @@ class PresetManager:
         return preset_id
     
     def update_preset(self, preset_id: str, update_data: Dict) -> bool:
-        """프리셋 업데이트"""
+        """프리셋 업데이트 (같은 프리셋 동시 수정은 사용자 락으로 직렬화)"""
         preset_file = self.preset_path / f"{preset_id}.json"
-        if not preset_file.exists():
-            return False
-        
-        with open(preset_file, 'r', encoding='utf-8') as f:
-            preset_data = json.load(f)
-        
-        # 업데이트 적용
-        if "name" in update_data:
-            preset_data["name"] = update_data["name"]
-        if "description" in update_data:
-            preset_data["description"] = update_data["description"]
-        if "grid_config" in update_data:
-            preset_data["grid_config"] = update_data["grid_config"]
-        
-        preset_data["updated_at"] = datetime.now().isoformat()
-        
-        # 파일 저장
-        with open(preset_file, 'w', encoding='utf-8') as f:
-            json.dump(preset_data, f, ensure_ascii=False, indent=2)
+        with state_store.user_lock(self.username):
+            if not preset_file.exists():
+                return False
+            
+            with open(preset_file, 'r', encoding='utf-8') as f:
+                preset_data = json.load(f)
+            
+            # 업데이트 적용
+            if "name" in update_data:
+                preset_data["name"] = update_data["name"]
+            if "description" in update_data:
+                preset_data["description"] = update_data["description"]
+            if "grid_config" in update_data:
+                preset_data["grid_config"] = update_data["grid_config"]
+            
+            preset_data["updated_at"] = datetime.now().isoformat()
+            
+            # 파일 저장
+            with history_archive.user_lock(self.username):
+                atomic_write_json(preset_file, preset_data)
+                self.restore_referenced_queries(preset_data["grid_config"])
         
         # 인덱스 업데이트
         self.update_preset_index(preset_data)
@@ -481,11 +1321,12 @@ class PresetManager:
     def delete_preset(self, preset_id: str) -> bool:
         """프리셋 삭제"""
         preset_file = self.preset_path / f"{preset_id}.json"
-        if not preset_file.exists():
-            return False
-        
-        # 파일 삭제
-        preset_file.unlink()
+        with state_store.user_lock(self.username):
+            if not preset_file.exists():
+                return False
+            
+            # 파일 삭제
+            preset_file.unlink()
         
         # 인덱스에서 제거
         self.remove_from_index(preset_id)
@@ -511,37 +1352,52 @@ class PresetManager:
         return presets
     
     def load_preset(self, preset_id: str) -> Dict:
-        """프리셋 로드 (차트 데이터 포함)"""
+        """프리셋 로드 (차트 데이터 포함) - 프리셋과 참조 쿼리 파일이 그대로면 캐시한 번들 반환"""
         preset_file = self.preset_path / f"{preset_id}.json"
         if not preset_file.exists():
             raise HTTPException(404, "프리셋을 찾을 수 없습니다")
         
-        with open(preset_file, 'r', encoding='utf-8') as f:
+        cache_key = (self.username, preset_id)
+        cached = preset_bundle_cache.get(cache_key)
+        if (cached and all(_file_stamp(path) == stamp for path, stamp in cached["files"])
+                and all(current_snapshot_version(tab_id) == version for tab_id, version in cached["versions"].items())):
+            preset_bundle_cache.move_to_end(cache_key)
+            PRESET_BUNDLE_CACHE_TOTAL.labels("hit").inc()
+            tracer.add_span("preset_cache_hit", 0.0)
+            return cached["bundle"]
+        PRESET_BUNDLE_CACHE_TOTAL.labels("miss").inc()
+        
+        # 읽기 전에 파일 상태를 기록해, 읽는 도중 바뀐 파일은 다음 로드에서 다시 병합되게 함
+        files = [(preset_file, _file_stamp(preset_file))]
+        with tracer.span("preset_read"), open(preset_file, 'r', encoding='utf-8') as f:
             preset_data = json.load(f)
         
-        print(f"🔍 프리셋 로드: {preset_id}")
-        print(f"🔍 프리셋 데이터: {preset_data}")
+        preset_logger.debug("🔍 프리셋 로드: %s, 데이터: %s", preset_id, preset_data)
         
-        # 차트 데이터 로드 및 병합
+        # 차트 데이터 로드 및 병합 (참조 쿼리 탭의 현재 스냅샷 버전이 바뀌면 차트별 stale 표시가 달라지므로 함께 기록)
         resolved_charts = []
+        versions: Dict[str, Optional[str]] = {}
         for chart_config in preset_data["grid_config"]["charts"]:
             try:
-                print(f"🔍 차트 설정: {chart_config}")
+                preset_logger.debug("🔍 차트 설정: %s", chart_config)
                 
                 if chart_config["source"]["type"] == "query_reference":
                     # 쿼리 참조 방식
                     query_id = chart_config["source"]["query_id"]
-                    print(f"🔍 쿼리 참조: {query_id}")
-                    
-                    query_data = self.load_query_data(query_id)
-                    print(f"🔍 쿼리 데이터 로드됨: {list(query_data.keys())}")
-                    
-                    resolved_chart = self.merge_chart_data(query_data, chart_config["source"])
-                    print(f"🔍 병합된 차트: {list(resolved_chart.keys())}")
+                    query_file = self.queries_path / f"{query_id}.json"
+                    files.append((query_file, _file_stamp(query_file)))
+                    with tracer.span("query_load", query_id=query_id):
+                        query_data = self.load_query_data(query_id)
+                    with tracer.span("chart_merge", query_id=query_id):
+                        resolved_chart = self.merge_chart_data(query_data, chart_config["source"])
+                    snapshot = _chart_snapshot_status(query_data)
+                    versions[snapshot["tab_id"]] = snapshot["current_version"]
+                    preset_logger.debug("🔍 쿼리 참조 %s 병합: %s", query_id, resolved_chart.keys())
                 else:
-                    # 인라인 데이터 방식
+                    # 인라인 데이터 방식 (저장 당시 데이터 그대로, 스냅샷 기준 없음)
                     resolved_chart = chart_config["source"]["chart_data"]
-                    print(f"🔍 인라인 차트: {list(resolved_chart.keys()) if resolved_chart else 'None'}")
+                    snapshot = None
+                    preset_logger.debug("🔍 인라인 차트: %s", resolved_chart.keys() if resolved_chart else None)
                 
                 # ID가 없는 경우 생성
                 if "id" not in resolved_chart or not resolved_chart["id"]:
@@ -549,64 +1405,82 @@ class PresetManager:
                 
                 resolved_charts.append({
                     "position": chart_config["position"],
-                    "chart_data": resolved_chart
+                    "chart_data": resolved_chart,
+                    **({"snapshot": snapshot} if snapshot else {})
                 })
-                print(f"✅ 차트 처리 완료 (position {chart_config['position']})")
                 
             except Exception as e:
-                print(f"⚠️ 차트 로드 실패 (position {chart_config['position']}): {e}")
-                import traceback
-                traceback.print_exc()
+                preset_logger.warning("⚠️ 차트 로드 실패 (position %s): %s", chart_config["position"], e,
+                                      exc_info=preset_logger.isEnabledFor(logging.DEBUG))
                 # 오류가 있는 차트는 건너뛰기
                 continue
         
-        print(f"🔍 최종 resolved_charts: {len(resolved_charts)}개")
-        for i, chart in enumerate(resolved_charts):
-            chart_data = chart["chart_data"]
-            print(f"  - 차트 {i}: keys={list(chart_data.keys())}")
-            if "config" in chart_data:
-                print(f"    config: {list(chart_data['config'].keys())}")
+        preset_logger.debug("🔍 프리셋 %s 차트 %d/%d개 로드", preset_id,
+                            len(resolved_charts), len(preset_data["grid_config"]["charts"]))
         
-        return {
+        bundle = {
             "preset": preset_data,
             "charts": resolved_charts
         }
+        # 조건부 GET 검증자 - 읽은 파일 상태와 참조 탭의 현재 스냅샷 버전이 같으면 같은 번들
+        last_modified = [stamp[0] / 1e9 for _, stamp in files if stamp]
+        last_modified += [_iso_timestamp(snapshot_versions[tab_id]["loaded_at"])
+                          for tab_id, version in versions.items() if version and tab_id in snapshot_versions]
+        preset_bundle_cache[cache_key] = {
+            "files": files,
+            "versions": versions,
+            "bundle": bundle,
+            "etag": weak_etag("preset", *files, *sorted(versions.items(), key=str)),
+            "last_modified": max(last_modified)
+        }
+        preset_bundle_cache.move_to_end(cache_key)
+        while len(preset_bundle_cache) > PRESET_BUNDLE_CACHE_SIZE:
+            preset_bundle_cache.popitem(last=False)
+        return bundle
+    
+    def restore_referenced_queries(self, grid_config: Dict):
+        """프리셋이 참조하는 쿼리 중 보관된 것을 queries/ 로 복원 (user_lock 안에서 호출)"""
+        query_ids = [
+            chart["source"]["query_id"] for chart in grid_config.get("charts", [])
+            if chart.get("source", {}).get("type") == "query_reference"
+        ]
+        archived = history_archive.archived_ids(self.username)
+        restore = [query_id for query_id in query_ids if query_id in archived]
+        if restore:
+            history_archive.restore(self.username, restore, locked=True)
     
     def load_query_data(self, query_id: str) -> Dict:
-        """쿼리 파일에서 데이터 로드"""
+        """쿼리 파일에서 데이터 로드 (보관된 쿼리는 보관 세그먼트에서)"""
         query_file = self.queries_path / f"{query_id}.json"
         if not query_file.exists():
+            archived = history_archive.load(self.username, query_id)
+            if archived:
+                return resolve_query_record(archived)
             raise Exception(f"쿼리 파일을 찾을 수 없습니다: {query_id}")
         
         with open(query_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return resolve_query_record(json.load(f))
     
     def merge_chart_data(self, query_data: Dict, source_config: Dict) -> Dict:
         """쿼리 데이터와 프리셋 설정 병합"""
-        print(f"🔍 merge_chart_data 호출")
-        print(f"🔍 query_data keys: {list(query_data.keys())}")
-        print(f"🔍 source_config: {source_config}")
+        preset_logger.debug("🔍 merge_chart_data: query_data keys=%s, source_config=%s", query_data.keys(), source_config)
         
         # 쿼리 데이터에서 response 부분 추출
         if "response" in query_data:
             chart_data = query_data["response"].copy()
         else:
-            print("❌ query_data에 response 키가 없습니다")
+            preset_logger.warning("❌ query_data에 response 키가 없습니다")
             chart_data = query_data.copy()
         
-        print(f"🔍 chart_data keys after copy: {list(chart_data.keys())}")
-        
         # ChartComponent가 기대하는 구조로 변환
         # response에서 나온 데이터는 이미 올바른 형태여야 함
         if "chart_config" in chart_data:
             # config 키로 이동
             chart_data["config"] = chart_data["chart_config"]
-            print(f"🔍 chart_config를 config로 복사")
         
-        # ID가 없는 경우 생성
+        # ID가 없는 경우 생성 (같은 쿼리는 같은 ID - 다시 병합해도 실시간 갱신 diff 에서 바뀐 차트로 보이지 않게)
         if "id" not in chart_data:
-            chart_data["id"] = f"query_chart_{uuid.uuid4().hex[:8]}"
-            print(f"🔍 ID 생성: {chart_data['id']}")
+            chart_data["id"] = f"query_chart_{query_data.get('id') or uuid.uuid4().hex[:8]}"
         
         # 커스텀 제목 적용
         if "title" in source_config:
@@ -617,29 +1491,16 @@ class PresetManager:
                 if "title" not in chart_data["config"]["options"]["plugins"]:
                     chart_data["config"]["options"]["plugins"]["title"] = {}
                 chart_data["config"]["options"]["plugins"]["title"]["text"] = source_config["title"]
-            print(f"🔍 커스텀 제목 적용: {source_config['title']}")
         
         # 커스텀 옵션 적용 (추후 확장 가능)
         if "custom_options" in source_config:
             # 깊은 병합 로직 구현 (예: lodash merge와 유사)
             pass
         
-        print(f"🔍 최종 chart_data keys: {list(chart_data.keys())}")
-        if "config" in chart_data:
-            print(f"🔍 config keys: {list(chart_data['config'].keys())}")
-        
         return chart_data
     
     def update_preset_index(self, preset_data: Dict):
-        """프리셋 인덱스 업데이트"""
-        index_file = self.preset_path / "preset_index.json"
-        
-        if index_file.exists():
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-        else:
-            index_data = {"presets": [], "last_updated": ""}
-        
+        """프리셋 인덱스 업데이트 (그룹 커밋)"""
         # 프리셋 요약 정보
         preset_summary = {
             "id": preset_data["id"],
@@ -651,47 +1512,268 @@ class PresetManager:
             "updated_at": preset_data["updated_at"]
         }
         
-        # 기존 프리셋 업데이트 또는 새로 추가
-        existing_index = next((i for i, p in enumerate(index_data["presets"]) 
-                              if p["id"] == preset_data["id"]), None)
-        
-        if existing_index is not None:
-            index_data["presets"][existing_index] = preset_summary
-        else:
-            index_data["presets"].insert(0, preset_summary)
-        
-        index_data["last_updated"] = datetime.now().isoformat()
+        def upsert(index_data: Dict):
+            # 기존 프리셋 업데이트 또는 새로 추가
+            existing_index = next((i for i, p in enumerate(index_data["presets"]) 
+                                  if p["id"] == preset_data["id"]), None)
+            
+            if existing_index is not None:
+                index_data["presets"][existing_index] = preset_summary
+            else:
+                index_data["presets"].insert(0, preset_summary)
+            
+            index_data["last_updated"] = datetime.now().isoformat()
         
-        with open(index_file, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, ensure_ascii=False, indent=2)
+        state_store.commit(self.username, PRESET_INDEX_FILE, upsert, _empty_preset_index)
     
     def remove_from_index(self, preset_id: str):
-        """인덱스에서 프리셋 제거"""
-        index_file = self.preset_path / "preset_index.json"
-        
-        if not index_file.exists():
-            return
-        
-        with open(index_file, 'r', encoding='utf-8') as f:
-            index_data = json.load(f)
-        
-        index_data["presets"] = [p for p in index_data["presets"] if p["id"] != preset_id]
-        index_data["last_updated"] = datetime.now().isoformat()
+        """인덱스에서 프리셋 제거 (그룹 커밋)"""
+        def remove(index_data: Dict):
+            index_data["presets"] = [p for p in index_data["presets"] if p["id"] != preset_id]
+            index_data["last_updated"] = datetime.now().isoformat()
         
-        with open(index_file, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, ensure_ascii=False, indent=2)
+        state_store.commit(self.username, PRESET_INDEX_FILE, remove, _empty_preset_index)
 
 # 전역 세션 매니저 인스턴스
 session_manager = UserSessionManager()
+history_archive = HistoryArchiver(
+    USER_DATA_PATH, HISTORY_RETENTION_DAYS,
+    HISTORY_RETENTION_POLICIES.get("users"), HISTORY_RETENTION_POLICIES.get("tabs")
+)
+history_search = HistorySearch(USER_DATA_PATH, load_record=resolve_query_record, archive=history_archive)
+
+async def history_maintenance_loop():
+    """주기적으로 보존 기간 지난 히스토리 보관 (여러 워커 중 락을 잡은 하나만 실행)"""
+    await asyncio.sleep(60)
+    while True:
+        try:
+            summary = await asyncio.to_thread(history_archive.run)
+            if summary.get("archived"):
+                logger.info("🗄️ 히스토리 보관 완료: %d건 (%.1fs)", summary["archived"], summary["seconds"])
+        except Exception as e:
+            logger.warning("⚠️ 히스토리 보관 작업 실패: %s", e)
+        await asyncio.sleep(HISTORY_MAINTENANCE_INTERVAL_HOURS * 3600)
+
+# 실시간 대시보드 갱신 - 탭/프리셋 채널마다 새 스냅샷 버전에서 한 번 계산해 달라진 차트만 구독자에게 푸시
+live_hub = LiveHub(LIVE_MAX_PENDING, digest_default=_json_default)
+
+def _tab_channel(tab_id: str) -> str:
+    return f"tab:{tab_id}"
+
+def _preset_channel(username: str, preset_id: str) -> str:
+    return f"preset:{username}/{preset_id}"
+
+async def publish_live_channel(channel: str) -> int:
+    """채널의 현재 차트를 계산해 live_hub 에 반영 (달라진 차트만 구독자에게 전송), 보낸 차트 수 반환"""
+    kind, _, key = channel.partition(":")
+    if kind == "tab":
+        result = await fetch_default_charts(key)
+        charts = OrderedDict((chart["id"], chart) for chart in result["charts"])
+        return live_hub.publish(channel, result["snapshot_version"], charts,
+                                {"tabs": {key: result["snapshot_version"]}})
+    
+    # 프리셋은 현재 스냅샷으로 새로 고친 차트를 보냄 (버전은 메시지에 있으므로 차트에는 새로 고침 실패 여부만)
+    username, _, preset_id = key.partition("/")
+    bundle = await refresh_preset_charts(PresetManager(username).load_preset(preset_id))
+    tabs: Dict[str, Optional[str]] = {}
+    charts = OrderedDict()
+    for chart in bundle["charts"]:
+        live_chart = {"position": chart["position"], "chart_data": chart["chart_data"]}
+        snapshot = chart.get("snapshot")
+        if snapshot:
+            tabs[snapshot["tab_id"]] = snapshot["current_version"]
+            live_chart["snapshot"] = {k: snapshot[k] for k in ("query_id", "tab_id", "refresh_error") if k in snapshot}
+        charts[str(chart["position"])] = live_chart
+    version = ",".join(f"{tab_id}@{v}" for tab_id, v in sorted(tabs.items())) or None
+    return live_hub.publish(channel, version, charts, {"tabs": tabs})
+
+async def live_subscribe(subscriber: Subscriber, tab_id: Optional[str] = None,
+                         preset_id: Optional[str] = None) -> str:
+    """탭 또는 프리셋 채널 구독 후 현재 차트 전체를 대기열에 넣고 채널 이름 반환"""
+    if tab_id:
+        if tab_id not in TAB_QUERIES:
+            raise HTTPException(status_code=404, detail="탭을 찾을 수 없습니다")
+        channel = _tab_channel(tab_id)
+    else:
+        channel = _preset_channel(subscriber.username, preset_id)
+    if not live_hub.subscribe(subscriber, channel):
+        try:
+            await publish_live_channel(channel)
+        except Exception:
+            live_hub.unsubscribe(subscriber, channel)
+            raise
+        live_hub.send_snapshot(subscriber, channel)
+    return channel
+
+async def live_update_loop():
+    """구독 중인 채널이 참조하는 탭의 새 스냅샷 버전 확인 (클라이언트 대신 주기적으로 TTL 확인/재적재)
+    
+    탭마다 한 번 확인하고, 버전이 바뀐 채널만 한 번 다시 계산해 구독자 수와 관계없이 diff 를 한 번 만든다.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(live_hub.wakeup.wait(), LIVE_UPDATE_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        live_hub.wakeup.clear()
+        channels = [channel for channel in live_hub.channels() if live_hub.has_state(channel)]
+        tabs = {tab_id for channel in channels for tab_id in live_hub.channel_meta(channel).get("tabs", {})
+                if tab_id in TAB_QUERIES}
+        versions = {}
+        for tab_id in tabs:
+            try:
+                versions[tab_id] = (await fetch_default_charts(tab_id))["snapshot_version"]
+            except Exception as e:
+                logger.warning("⚠️ %s 실시간 갱신 버전 확인 실패: %s", tab_id, e)
+        for channel in channels:
+            used = live_hub.channel_meta(channel).get("tabs", {})
+            if not live_hub.has_state(channel) or all(versions.get(t, v) == v for t, v in used.items()):
+                continue
+            try:
+                await publish_live_channel(channel)
+            except Exception as e:
+                logger.warning("⚠️ %s 실시간 갱신 실패: %s", channel, e)
+
+def _split_ids(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
 
 # ======================
 # API 엔드포인트들
 # ======================
 
-# 헬스 체크
+# 수집 시점에 읽는 지표 (스케줄러/서킷/캐시/빠른 경로/파싱/스냅샷 상태)
+metrics.callback("llm_scheduler_slots_in_use", "사용 중인 LLM 호출 슬롯 수", lambda: llm_scheduler.in_flight)
+metrics.callback("llm_scheduler_slots_capacity", "LLM 호출 슬롯 상한", lambda: llm_scheduler.max_concurrency)
+metrics.callback("llm_scheduler_queue_depth", "LLM 호출 대기열 길이", lambda: llm_scheduler.queue_depth)
+metrics.callback(
+    "llm_scheduler_events_total", "LLM 스케줄러 처리/거절 건수",
+    lambda: llm_scheduler.counters, ["event"], "counter")
+metrics.callback(
+    "llm_endpoint_circuit_state", "LLM 엔드포인트 서킷 상태 (현재 상태 라벨만 1)",
+    lambda: {(e.url, e.breaker.state): 1 for e in llm_client.endpoints}, ["url", "state"])
+metrics.callback(
+    "llm_client_events_total", "LLM 클라이언트 재시도/장애 조치/헤지 건수",
+    lambda: dict(llm_client.stats), ["event"], "counter")
+metrics.callback(
+    "llm_reply_parse_total", "LLM 응답 파싱 결과 (direct/extracted/text/invalid)",
+    lambda: {k: v for k, v in llm_reply_parser.stats.items() if k != "total"}, ["outcome"], "counter")
+metrics.callback(
+    "rollup_queries_total", "롤업 큐브 조회 결과",
+    lambda: {k: rollup_manager.stats[k] for k in ("hits", "misses", "fallbacks")}, ["result"], "counter")
+metrics.callback(
+    "fast_path_questions_total", "빠른 경로 매칭 결과",
+    lambda: {k: fast_path.stats[k] for k in ("hits", "misses", "fallbacks")}, ["result"], "counter")
+metrics.callback(
+    "fast_path_saved_seconds_total", "빠른 경로로 절약한 LLM 지연 추정치",
+    lambda: fast_path.stats["saved_ms_total"] / 1000, type_name="counter")
+metrics.callback(
+    "default_chart_cache_entries", "기본 차트 캐시 항목 수", lambda: len(chart_cache))
+metrics.callback(
+    "conversation_sessions_active", "메모리에 있는 대화 세션 수",
+    lambda: sum(len(tabs) for tabs in session_manager.sessions.values()))
+metrics.callback(
+    "tab_snapshot_rows", "탭 스냅샷 행 수",
+    lambda: {tab_id: snap["rows"] for tab_id, snap in snapshot_versions.items()}, ["tab_id"])
+metrics.callback(
+    "tab_snapshot_age_seconds", "탭 스냅샷 적재 후 경과 시간",
+    lambda: {tab_id: (datetime.now() - datetime.fromisoformat(snap["loaded_at"])).total_seconds()
+             for tab_id, snap in snapshot_versions.items()}, ["tab_id"])
+metrics.callback("live_subscribers", "실시간 갱신 연결 수 (SSE/WebSocket)", lambda: len(live_hub.subscribers))
+metrics.callback(
+    "live_updates_total", "실시간 갱신 diff 전송/변경 없음/재동기화 건수",
+    lambda: {k: live_hub.stats[k] for k in ("published", "unchanged", "resyncs")}, ["event"], "counter")
+metrics.callback(
+    "live_update_charts_total", "실시간 갱신 차트 전송/변경 없어 생략 수",
+    lambda: {"sent": live_hub.stats["charts_sent"], "skipped": live_hub.stats["charts_skipped"]},
+    ["result"], "counter")
+
+# 시작 단계 상태 (임포트/프리웜 소요 시간, 준비 완료 여부)
+startup_state: Dict[str, Any] = {
+    "ready": False,
+    "import_seconds": None,
+    "prewarm_seconds": None,
+    "import_to_ready_seconds": None,
+    "phases": {},
+    "errors": {}
+}
+STARTUP_SECONDS = metrics.gauge("startup_seconds", "시작 단계별 소요 시간 (import/prewarm/import_to_ready)", ["phase"])
+metrics.callback("ready", "준비 완료 여부 (프리웜이 끝나면 1)", lambda: int(startup_state["ready"]))
+
+def _hot_presets(limit: int) -> List[Tuple[str, str]]:
+    """모든 사용자의 프리셋 인덱스에서 최근 수정된 순서로 (사용자, 프리셋 ID)"""
+    entries = []
+    for index_file in USER_DATA_PATH.glob("*/presets/preset_index.json"):
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                presets = json.load(f).get("presets", [])
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ 프리셋 인덱스를 읽지 못했습니다: %s (%s)", index_file, e)
+            continue
+        username = index_file.parent.parent.name
+        entries += [(p.get("updated_at", ""), username, p["id"]) for p in presets]
+    entries.sort(reverse=True)
+    return [(username, preset_id) for _, username, preset_id in entries[:limit]]
+
+async def prewarm():
+    """설정한 탭 스냅샷, 스키마 카탈로그, 최근 프리셋 번들을 미리 적재한 뒤 준비 완료로 표시
+    
+    디스크 스냅샷 저장소를 쓰면 적재는 스레드에서 해 이벤트 루프가 liveness 요청에 계속 응답한다.
+    실패한 단계는 기록만 하고 넘어간다 (해당 탭은 첫 요청 때 다시 적재).
+    """
+    started = time.perf_counter()
+    for tab_id in PREWARM_TABS:
+        phase_start = time.perf_counter()
+        try:
+            if tab_id not in TAB_QUERIES:
+                raise KeyError(f"알 수 없는 탭입니다: {tab_id}")
+            await fetch_default_charts(tab_id)
+            get_table_schema(f"{tab_id}_data")
+        except Exception as e:
+            startup_state["errors"][tab_id] = str(e)
+            logger.warning("⚠️ %s 프리웜 실패: %s", tab_id, e)
+        startup_state["phases"][f"tab:{tab_id}"] = round(time.perf_counter() - phase_start, 3)
+    
+    phase_start = time.perf_counter()
+    hot_presets = _hot_presets(PREWARM_PRESETS) if PREWARM_PRESETS > 0 else []
+    for username, preset_id in hot_presets:
+        try:
+            PresetManager(username).load_preset(preset_id)
+        except Exception as e:
+            startup_state["errors"][f"preset:{username}/{preset_id}"] = str(e)
+        await asyncio.sleep(0)
+    startup_state["phases"]["presets"] = round(time.perf_counter() - phase_start, 3)
+    
+    now = time.perf_counter()
+    startup_state.update(
+        ready=True,
+        prewarm_seconds=round(now - started, 3),
+        import_to_ready_seconds=round(now - IMPORT_STARTED, 3)
+    )
+    STARTUP_SECONDS.labels("prewarm").set(startup_state["prewarm_seconds"])
+    STARTUP_SECONDS.labels("import_to_ready").set(startup_state["import_to_ready_seconds"])
+    logger.info("🚀 준비 완료: 임포트 %.2fs, 프리웜 %.2fs (탭 %d개, 프리셋 %d개), 임포트~준비 %.2fs",
+                startup_state["import_seconds"] or 0, startup_state["prewarm_seconds"], len(PREWARM_TABS),
+                len(hot_presets), startup_state["import_to_ready_seconds"])
+
+# 헬스 체크 (프로세스가 응답하면 200 - liveness, 준비 여부는 ready 필드와 /health/ready 로 구분)
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "ready": startup_state["ready"], "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/live")
+async def liveness_check():
+    """liveness 프로브 - 이벤트 루프가 응답하면 200"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """readiness 프로브 - 프리웜이 끝나면 200, 그 전에는 503 (시작 단계별 소요 시간 포함)"""
+    return JSONResponse(startup_state, status_code=200 if startup_state["ready"] else 503)
+
+# Prometheus 지표
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
 
 # 데이터베이스 연결 테스트
 @app.get("/api/test/db-connection")
@@ -747,11 +1829,234 @@ async def test_db_connection():
             "user": ORACLE_USER
         }
 
+# Oracle 조회 통계
+@app.get("/api/test/fetch-stats")
+async def get_fetch_stats():
+    """탭별 최근 Oracle 조회 처리량(rows/s) 및 메모리 통계"""
+    return {
+        "success": True,
+        "arraysize": ORACLE_FETCH_ARRAYSIZE,
+        "stats": fetch_stats
+    }
+
+# 롤업 큐브 통계
+@app.get("/api/test/rollup-stats")
+async def get_rollup_stats():
+    """롤업 큐브 적중률 및 큐브 크기"""
+    return {
+        "success": True,
+        **rollup_manager.get_stats()
+    }
+
+@app.get("/api/test/rollup-verify")
+async def verify_rollup():
+    """큐브가 있는 탭마다 검증용 쿼리를 원본 테이블과 큐브 재작성으로 실행해 결과가 같은지 확인"""
+    results = [
+        rollup_manager.verify(memory_db, sql)
+        for table_name in list(rollup_manager.cubes)
+        for sql in rollup_manager.equivalence_queries(table_name)
+    ]
+    return {
+        "success": all(r["equal"] is not False for r in results),
+        "checked": len(results),
+        "mismatches": [r for r in results if r["equal"] is False],
+        "results": results
+    }
+
+@app.get("/api/test/sql-result-cache-stats")
+async def get_sql_result_cache_stats():
+    """스냅샷 버전별 SQL 결과 캐시 항목 수 (적중/실패 수는 /metrics 의 sql_result_cache_total)"""
+    with sql_result_cache_lock:
+        keys = list(sql_result_cache)
+    by_version: Dict[str, int] = {}
+    for tab_id, version, _ in keys:
+        by_version[f"{tab_id}@{version}"] = by_version.get(f"{tab_id}@{version}", 0) + 1
+    return {
+        "success": True,
+        "entries": len(keys),
+        "max_entries": SQL_RESULT_CACHE_SIZE,
+        "by_version": by_version,
+        "current_versions": {tab_id: snap["version"] for tab_id, snap in snapshot_versions.items()}
+    }
+
+@app.get("/api/test/compression-stats")
+async def get_compression_stats():
+    """응답 압축 건수/인코딩별 건수, 압축 전후 바이트, 작아서 건너뛴 응답, 압축 결과 캐시 적중 수"""
+    return {
+        "success": True,
+        **response_compressor.get_stats()
+    }
+
+@app.get("/api/test/live-stats")
+async def get_live_stats():
+    """실시간 갱신 구독자/채널 수, 채널별 마지막 버전, 보낸 diff 와 변경 없어 생략한 차트 수"""
+    return {
+        "success": True,
+        **live_hub.get_stats()
+    }
+
+# 공유 스냅샷 저장소 상태
+@app.get("/api/test/snapshot-store-stats")
+async def get_snapshot_store_stats():
+    """이 워커가 사용 중인 스냅샷 버전과 공유 저장소의 탭별 현재 버전, 디스크 사용량, 적재 락 대기 횟수"""
+    return {
+        "success": True,
+        "enabled": snapshot_store is not None,
+        "pid": os.getpid(),
+        "versions": {tab_id: snap["version"] for tab_id, snap in snapshot_versions.items()},
+        **(snapshot_store.get_stats() if snapshot_store else {})
+    }
+
+# LLM 스케줄러 통계
+@app.get("/api/test/llm-scheduler-stats")
+async def get_llm_scheduler_stats():
+    """LLM 호출 대기열 길이, 대기 시간 분포, 거절 건수"""
+    return {
+        "success": True,
+        **llm_scheduler.get_stats()
+    }
+
+# 빠른 경로 통계
+@app.get("/api/test/fast-path-stats")
+async def get_fast_path_stats():
+    """규칙 기반 빠른 경로 적중률, 의도별 적중 수, 절약한 LLM 지연"""
+    return {
+        "success": True,
+        "enabled": FAST_PATH_ENABLED,
+        **fast_path.get_stats()
+    }
+
+# LLM 응답 파싱 통계
+@app.get("/api/test/llm-output-stats")
+async def get_llm_output_stats():
+    """LLM 응답 파싱 결과 분포 (직접 파싱/추출/텍스트/스키마 실패)와 파싱 실패율"""
+    return {
+        "success": True,
+        "response_format": response_format_negotiator.get_stats(),
+        **llm_reply_parser.get_stats()
+    }
+
+# LLM 클라이언트 통계
+@app.get("/api/test/llm-client-stats")
+async def get_llm_client_stats():
+    """엔드포인트별 서킷 상태, p95 지연, 재시도/장애 조치/헤지 횟수"""
+    return {
+        "success": True,
+        **llm_client.get_stats()
+    }
+
+@app.get("/api/test/history-search-stats")
+async def get_history_search_stats():
+    """히스토리 검색 횟수, 평균 검색 시간, 색인/동기화 건수"""
+    return {
+        "success": True,
+        **history_search.get_stats()
+    }
+
+@app.get("/api/test/query-library-stats")
+async def get_query_library_stats():
+    """쿼리 라이브러리 항목/참조 수, 저장 크기, 중복 제거로 절약한 크기"""
+    return {
+        "success": True,
+        "enabled": query_library is not None,
+        **(query_library.get_stats() if query_library else {})
+    }
+
+@app.get("/api/test/state-store-stats")
+async def get_state_store_stats():
+    """사용자 상태 파일 쓰기 수, 그룹 커밋당 변경 수, 락 대기 시간, 손상 파일 복구 수"""
+    return {
+        "success": True,
+        **state_store.get_stats()
+    }
+
+@app.get("/api/test/history-archive-stats")
+async def get_history_archive_stats():
+    """히스토리 보존 정책, 보관/복원/프리셋 참조로 제외한 건수, 마지막 보관 실행"""
+    return {
+        "success": True,
+        "interval_hours": HISTORY_MAINTENANCE_INTERVAL_HOURS,
+        **history_archive.get_stats()
+    }
+
+@app.post("/api/test/history-maintenance")
+async def run_history_maintenance(dry_run: bool = True):
+    """히스토리 보관 즉시 실행 (dry_run=true 면 보관 대상 건수만 계산)"""
+    summary = await asyncio.to_thread(history_archive.run, dry_run)
+    return {
+        "success": True,
+        **summary
+    }
+
+# 탭 적재 진행 상황
+@app.get("/api/users/{username}/api/tabs/{tab_id}/load-progress")
+async def get_tab_load_progress(tab_id: str):
+    """스트리밍 적재 진행 상황 (행 수, 청크 수, 처리량)"""
+    if tab_id not in TAB_QUERIES:
+        raise HTTPException(status_code=404, detail="탭을 찾을 수 없습니다")
+    return {
+        "success": True,
+        "progress": load_progress.get(tab_id, {"status": "idle"})
+    }
+
+# 탭별 인기 질문 (쿼리 라이브러리 참조 수 기준)
+@app.get("/api/users/{username}/api/tabs/{tab_id}/popular-queries")
+async def get_popular_queries(tab_id: str, limit: int = 10):
+    """여러 사용자가 자주 물은 질문 - 저장된 응답으로 LLM 호출 없이 바로 답할 수 있음
+
+    current 가 false 면 현재 스냅샷 이전 데이터로 만든 응답
+    """
+    if tab_id not in TAB_QUERIES:
+        raise HTTPException(status_code=404, detail="탭을 찾을 수 없습니다")
+    if not query_library:
+        return {"success": True, "enabled": False, "queries": []}
+    current_version = snapshot_versions.get(tab_id, {}).get("version")
+    queries = await asyncio.to_thread(query_library.popular, tab_id, max(1, min(limit, 100)), current_version)
+    return {
+        "success": True,
+        "enabled": True,
+        "snapshot_version": current_version,
+        "queries": queries
+    }
+
+# 인기 질문의 저장된 응답으로 답변 (LLM 호출 없음, 사용자 히스토리에 참조 추가)
+@app.post("/api/users/{username}/api/tabs/{tab_id}/popular-queries/{entry_hash}")
+async def answer_from_library(username: str, tab_id: str, entry_hash: str):
+    """라이브러리 항목의 응답을 그대로 반환하고 사용자 히스토리에 같은 항목 참조로 기록"""
+    if not query_library:
+        raise HTTPException(status_code=404, detail="쿼리 라이브러리가 비활성화되어 있습니다")
+    entry = await asyncio.to_thread(query_library.get, entry_hash)
+    if entry is None or entry["tab_id"] != tab_id:
+        raise HTTPException(status_code=404, detail="라이브러리 항목을 찾을 수 없습니다")
+    
+    response_data = entry["response"]
+    query_id = await asyncio.to_thread(session_manager.save_query_history, username, {
+        "tab_id": tab_id,
+        "question": entry["question"],
+        "response": response_data,
+        "chart_generated": response_data.get("chart_request") == 1,
+        "snapshot_version": entry["snapshot_version"]
+    })
+    
+    await asyncio.to_thread(
+        session_manager.record_queries, username, 1, 1 if response_data.get("chart_request") == 1 else 0)
+    QUERIES_TOTAL.labels("library", "ok").inc()
+    
+    # 저장 후에 붙이는 정보 (라이브러리 해시에 포함되지 않음)
+    response_data["query_id"] = query_id
+    response_data["answered_by"] = "library"
+    response_data["library"] = {
+        "hash": entry_hash,
+        "snapshot_version": entry["snapshot_version"],
+        "current": entry["snapshot_version"] == snapshot_versions.get(tab_id, {}).get("version")
+    }
+    return response_data
+
 # 사용자 정보 조회
 @app.get("/api/users/{username}/info")
 async def get_user_info(username: str = FastPath(..., description="사용자명")):
     """사용자 정보 조회"""
-    user_info = session_manager.get_or_create_user(username)
+    user_info = await asyncio.to_thread(session_manager.get_or_create_user, username)
     return {
         "success": True,
         "user": user_info
@@ -770,184 +2075,280 @@ async def get_user_history(
         "history": history
     }
 
+# 히스토리 검색 (/history/{query_id} 보다 먼저 등록해야 함)
+@app.get("/api/users/{username}/history/search")
+async def search_user_history(
+    username: str = FastPath(..., description="사용자명"),
+    q: str = "",
+    tab_id: Optional[str] = None,
+    chart_type: Optional[str] = None,
+    chart_generated: Optional[bool] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """질문/설명/SQL 전문 검색 (모든 검색어 포함, 관련도순)과 탭/차트 종류/차트 생성 여부/기간 필터
+
+    facets 는 현재 결과 집합의 tab_id, chart_type, chart_generated, 월별 건수
+    """
+    if not (USER_DATA_PATH / username).exists():
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
+    limit = max(1, min(limit, 200))
+    with tracer.span("history_search"):
+        result = await asyncio.to_thread(
+            history_search.search, username, q, tab_id, chart_type, chart_generated,
+            date_from, date_to, limit, max(0, offset)
+        )
+    return {
+        "success": True,
+        **result
+    }
+
+# 보관된 히스토리 (/history/{query_id} 보다 먼저 등록해야 함)
+@app.get("/api/users/{username}/history/archive")
+async def get_history_archive(username: str = FastPath(..., description="사용자명")):
+    """월별 보관 세그먼트 (건수, 압축 크기)"""
+    segments = history_archive.list_segments(username)
+    return {
+        "success": True,
+        "archived": sum(segment["count"] for segment in segments.values()),
+        "segments": segments
+    }
+
+# 보관된 히스토리 복원
+@app.post("/api/users/{username}/history/{query_id}/restore")
+async def restore_history(
+    username: str = FastPath(..., description="사용자명"),
+    query_id: str = FastPath(..., description="쿼리 ID")
+):
+    """보관 세그먼트의 쿼리를 queries/ 로 되돌림 (복원 시각부터 보존 기간을 다시 셈)"""
+    restored = await asyncio.to_thread(history_archive.restore, username, [query_id])
+    if not restored:
+        raise HTTPException(status_code=404, detail="보관된 쿼리를 찾을 수 없습니다")
+    return {
+        "success": True,
+        "restored": restored
+    }
+
 # 히스토리 상세 조회
 @app.get("/api/users/{username}/history/{query_id}")
 async def get_user_history_detail(
+    request: Request,
+    response: Response,
     username: str = FastPath(..., description="사용자명"),
     query_id: str = FastPath(..., description="쿼리 ID")
 ):
-    """특정 쿼리 히스토리 상세 조회"""
+    """특정 쿼리 히스토리 상세 조회
+    
+    queries/ 의 기록은 쓴 뒤 바뀌지 않으므로 오래 캐시하도록 표시하고 (Cache-Control immutable), 쿼리 ID 기준 ETag 로 304 응답.
+    보관된 기록은 복원되면 응답이 달라지므로 (archived 가 빠지고 restored_at 추가) no-cache 로 매번 ETag 재검증.
+    """
     query_file = USER_DATA_PATH / username / "queries" / f"{query_id}.json"
+    cache_control = f"private, max-age={HISTORY_CACHE_MAX_AGE_SECONDS}, immutable"
+    try:
+        created = datetime.strptime(query_id[:15], "%Y%m%d_%H%M%S").timestamp()
+    except ValueError:
+        created = None
     
     if not query_file.exists():
-        raise HTTPException(status_code=404, detail="쿼리를 찾을 수 없습니다")
+        # 보관된 쿼리는 세그먼트에서 조회
+        archived = await asyncio.to_thread(history_archive.load, username, query_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="쿼리를 찾을 수 없습니다")
+        not_modified = conditional_response(
+            request, response, weak_etag("archived", username, query_id), created, "private, no-cache")
+        if not_modified:
+            NOT_MODIFIED_TOTAL.labels("history_detail").inc()
+            return not_modified
+        return {
+            "success": True,
+            "archived": True,
+            "query": resolve_query_record(archived)
+        }
+    
+    # 파일을 읽기 전에 확인 (응답은 response_ref 로 가리키는 라이브러리 항목까지 바뀌지 않음)
+    not_modified = conditional_response(
+        request, response, weak_etag("query", username, query_id), created, cache_control)
+    if not_modified:
+        NOT_MODIFIED_TOTAL.labels("history_detail").inc()
+        return not_modified
     
     try:
         with open(query_file, 'r', encoding='utf-8') as f:
-            query_data = json.load(f)
+            query_data = resolve_query_record(json.load(f))
         
         return {
             "success": True,
             "query": query_data
         }
     except Exception as e:
-        print(f"❌ 쿼리 로드 실패: {str(e)}")
+        logger.error("❌ 쿼리 로드 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"쿼리 로드 실패: {str(e)}")
 
 # 탭 데이터 로드 (사용자 구분 없이 공통 사용)
 @app.get("/api/users/{username}/api/tabs/{tab_id}/data")
-async def get_tab_data(tab_id: str):
-    """탭 데이터 로드 - 사용자 구분 없이 공통 사용"""
+async def get_tab_data(tab_id: str, request: Request, response: Response, refresh: bool = False):
+    """탭 데이터 로드 - 사용자 구분 없이 공통 사용 (refresh=true 면 스냅샷 강제 재적재)
+    
+    ETag 는 스냅샷 버전 기준 - 버전이 그대로면 If-None-Match 요청에 본문 없이 304.
+    """
     if tab_id not in TAB_QUERIES:
         raise HTTPException(status_code=404, detail="탭을 찾을 수 없습니다")
     
     try:
-        print(f"📊 {tab_id} 데이터 로드 시작...")
-        
-        if TEST_MODE:
-            print("🧪 테스트 모드: 샘플 데이터 생성")
-            df = generate_sample_data(tab_id)
-        else:
-            conn = get_oracle_connection()
-            cursor = conn.cursor()
-            try:
-                check_and_create_tables(conn)
-                df = pd.read_sql(TAB_QUERIES[tab_id], conn)
-                print(f"✅ 데이터 로드 완료: {len(df)}행")
-            finally:
-                cursor.close()
-                conn.close()
-            
-            if df.empty:
-                print("⚠️ 데이터가 없습니다. 샘플 데이터를 생성합니다...")
-                df = generate_sample_data(tab_id)
-        
-        memory_db.store_data(f"{tab_id}_data", df)
-        
-        # 기본 차트 생성
-        charts = []
-        
-        if tab_id == "tab1" and not df.empty:
-            # 연도별 평균 레이팅
-            yearly_avg = df.groupby('year')['rating'].mean().reset_index()
-            chart_config = convert_to_chartjs_format(yearly_avg, "line")
-            if chart_config:
-                chart_config["options"]["plugins"]["title"] = {
-                    "display": True,
-                    "text": "연도별 평균 레이팅 추이"
-                }
-                charts.append({
-                    "id": f"{tab_id}_chart_1",
-                    "config": chart_config,
-                    "raw_data": yearly_avg.to_dict('records')
-                })
-            
-            # 카테고리별 매출
-            category_sales = df.groupby('category')['sales'].sum().reset_index()
-            chart_config = convert_to_chartjs_format(category_sales, "doughnut")
-            if chart_config:
-                chart_config["options"]["plugins"]["title"] = {
-                    "display": True,
-                    "text": "카테고리별 총 매출"
-                }
-                charts.append({
-                    "id": f"{tab_id}_chart_2",
-                    "config": chart_config,
-                    "raw_data": category_sales.to_dict('records')
-                })
-        
-        elif tab_id == "tab2" and not df.empty:
-            # 카테고리별 제품 수
-            category_count = df.groupby('category').size().reset_index(name='count')
-            chart_config = convert_to_chartjs_format(category_count, "bar")
-            if chart_config:
-                chart_config["options"]["plugins"]["title"] = {
-                    "display": True,
-                    "text": "카테고리별 제품 수"
-                }
-                charts.append({
-                    "id": f"{tab_id}_chart_1",
-                    "config": chart_config,
-                    "raw_data": category_count.to_dict('records')
-                })
-        
-        elif tab_id == "tab3" and not df.empty:
-            # 지역별 고객 수
-            region_count = df.groupby('region').size().reset_index(name='count')
-            chart_config = convert_to_chartjs_format(region_count, "pie")
-            if chart_config:
-                chart_config["options"]["plugins"]["title"] = {
-                    "display": True,
-                    "text": "지역별 고객 분포"
-                }
-                charts.append({
-                    "id": f"{tab_id}_chart_1",
-                    "config": chart_config,
-                    "raw_data": region_count.to_dict('records')
-                })
-        
+        logger.debug("📊 %s 데이터 로드 시작", tab_id)
+        
+        with REQUESTS_IN_FLIGHT.track_in_progress("tab_data"), TAB_REQUEST_SECONDS.time(tab_id):
+            result = await fetch_default_charts(tab_id, refresh)
+        if live_hub.version(_tab_channel(tab_id)) not in (None, result["snapshot_version"]):
+            # 이 요청으로 새 버전이 생겼으면 구독자에게 바로 푸시
+            live_hub.wake()
+        not_modified = conditional_response(
+            request, response, weak_etag("tab", tab_id, result["snapshot_version"]),
+            _iso_timestamp(result["snapshot_loaded_at"]))
+        if not_modified:
+            NOT_MODIFIED_TOTAL.labels("tab_data").inc()
+            return not_modified
         return {
             "success": True,
-            "charts": charts,
-            "total_rows": len(df)
+            **result
         }
         
     except Exception as e:
-        print(f"❌ 데이터 로드 실패: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ 데이터 로드 실패: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"데이터 로드 실패: {str(e)}"
         )
 
-# 사용자별 LLM 쿼리 처리
-@app.post("/api/users/{username}/llm/query")
-async def process_user_llm_query(
-    username: str,
-    query: LLMQuery
+def _sse_event(message: Dict[str, Any]) -> str:
+    data = json.dumps(message, ensure_ascii=False, default=_json_default)
+    return f"event: {message['type']}\ndata: {data}\n\n"
+
+# 실시간 갱신 구독 (SSE)
+@app.get("/api/users/{username}/live")
+async def live_updates_stream(
+    username: str = FastPath(..., description="사용자명"),
+    tabs: str = "",
+    presets: str = ""
 ):
-    """사용자별 LLM 쿼리 처리 (히스토리 저장 포함)"""
+    """탭(tabs=tab1,tab2)/프리셋(presets=ID,...) 구독 - 구독 직후 snapshot, 새 스냅샷 버전마다 바뀐 차트만 diff 이벤트"""
+    subscriber = live_hub.add(username)
     try:
-        # 테이블 존재 여부 확인
-        table_name = f"{query.tab_id}_data"
-        if not memory_db.table_exists(table_name):
-            print(f"📊 {table_name} 테이블이 없어서 데이터를 로드합니다...")
-            
-            if TEST_MODE:
-                print("🧪 테스트 모드: 샘플 데이터 생성")
-                df = generate_sample_data(query.tab_id)
-            else:
-                conn = get_oracle_connection()
-                cursor = conn.cursor()
+        for tab_id in _split_ids(tabs):
+            await live_subscribe(subscriber, tab_id=tab_id)
+        for preset_id in _split_ids(presets):
+            await live_subscribe(subscriber, preset_id=preset_id)
+        if not subscriber.channels:
+            raise HTTPException(status_code=400, detail="구독할 탭 또는 프리셋을 지정하세요")
+    except Exception:
+        live_hub.remove(subscriber)
+        raise
+    
+    async def events():
+        try:
+            while True:
                 try:
-                    check_and_create_tables(conn)
-                    df = pd.read_sql(TAB_QUERIES[query.tab_id], conn)
-                    print(f"✅ 데이터 로드 완료: {len(df)}행")
-                finally:
-                    cursor.close()
-                    conn.close()
-                
-                if df.empty:
-                    print("⚠️ 데이터가 없습니다. 샘플 데이터를 생성합니다...")
-                    df = generate_sample_data(query.tab_id)
-            
-            memory_db.store_data(table_name, df)
-            print(f"✅ {table_name} 테이블 생성 완료")
-        
-        # LLM API 호출
-        headers = {
-            "Authorization": f"Bearer {LLM_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        system_prompt = f"""
+                    message = await asyncio.wait_for(subscriber.queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse_event(message)
+        finally:
+            live_hub.remove(subscriber)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# 실시간 갱신 구독 (WebSocket)
+@app.websocket("/api/users/{username}/live/ws")
+async def live_updates_socket(websocket: WebSocket, username: str, tabs: str = "", presets: str = ""):
+    """SSE 와 같은 메시지를 WebSocket 으로 전송, 연결 중 구독 변경 가능
+    
+    클라이언트 메시지: {"action": "subscribe" | "unsubscribe", "tab": "tab1"} 또는 {"action": ..., "preset": "ID"}
+    """
+    await websocket.accept()
+    subscriber = live_hub.add(username)
+    
+    async def handle(action: str, tab_id: Optional[str] = None, preset_id: Optional[str] = None):
+        try:
+            if action == "subscribe":
+                await live_subscribe(subscriber, tab_id=tab_id, preset_id=preset_id)
+            elif action == "unsubscribe":
+                channel = _tab_channel(tab_id) if tab_id else _preset_channel(username, preset_id)
+                live_hub.unsubscribe(subscriber, channel)
+            else:
+                raise HTTPException(status_code=400, detail=f"알 수 없는 action 입니다: {action}")
+        except HTTPException as e:
+            subscriber.queue.put_nowait({"type": "error", "tab": tab_id, "preset": preset_id, "detail": e.detail})
+        except Exception as e:
+            logger.warning("⚠️ 실시간 갱신 구독 실패 (%s): %s", tab_id or preset_id, e)
+            subscriber.queue.put_nowait({"type": "error", "tab": tab_id, "preset": preset_id, "detail": str(e)})
+    
+    async def send_loop():
+        while True:
+            message = await subscriber.queue.get()
+            await websocket.send_text(json.dumps(message, ensure_ascii=False, default=_json_default))
+    
+    sender = asyncio.create_task(send_loop())
+    try:
+        for tab_id in _split_ids(tabs):
+            await handle("subscribe", tab_id=tab_id)
+        for preset_id in _split_ids(presets):
+            await handle("subscribe", preset_id=preset_id)
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                tab_id, preset_id = message.get("tab"), message.get("preset")
+                if not (tab_id or preset_id):
+                    raise ValueError("tab 또는 preset 이 필요합니다")
+            except (ValueError, AttributeError) as e:
+                subscriber.queue.put_nowait({"type": "error", "detail": f"잘못된 메시지: {e}"})
+                continue
+            await handle(message.get("action", "subscribe"), tab_id, preset_id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_hub.remove(subscriber)
+
+async def ensure_tab_snapshot(tab_id: str) -> str:
+    """탭 스냅샷 테이블이 없으면 적재하고 테이블명 반환 (공유 스냅샷 저장소 적재는 스레드에서)"""
+    table_name = f"{tab_id}_data"
+    if snapshot_store:
+        _attach_shared_snapshot(tab_id)
+        if not memory_db.table_exists(table_name):
+            logger.info("📊 %s 테이블이 없어서 데이터를 로드합니다", table_name)
+            await asyncio.to_thread(_publish_shared_snapshot, tab_id, [])
+            _attach_shared_snapshot(tab_id)
+    if not memory_db.table_exists(table_name):
+        logger.info("📊 %s 테이블이 없어서 데이터를 로드합니다", table_name)
+        load_tab_snapshot(tab_id)
+    return table_name
+
+async def request_llm_analysis(question: str, table_name: str, client: httpx.AsyncClient,
+                               username: str, context: Optional[str] = None) -> Dict[str, Any]:
+    """LLM 호출 후 응답 JSON 추출/스키마 검증 (JSON이 없거나 검증 실패 시 텍스트 답변으로 처리)
+    
+    호출은 llm_scheduler 슬롯 안에서 실행되어 전역 동시성/사용자 공정성이 적용된다.
+    게이트웨이가 지원하면 response_format 으로 JSON 스키마 출력을 강제한다.
+    context 는 이전 대화 요약 (토큰 예산 안에서 ConversationSession 이 조립)
+    """
+    stage_start = time.perf_counter()
+    headers = {
+        "Authorization": f"Bearer {LLM_API_KEY}",
+        "Content-Type": "application/json",
+        "X-Request-ID": request_id_var.get()
+    }
+    
+    system_prompt = f"""
         당신은 데이터 분석 전문가입니다. 사용자의 질문을 분석하여 적절한 SQL 쿼리를 생성하거나 텍스트로 답변해주세요.
         
         현재 사용 가능한 테이블: {table_name}
-        테이블 스키마: {memory_db.get_table_info(table_name)}
+        테이블 스키마: {get_table_schema(table_name)}
         
-        응답은 반드시 다음 JSON 형식으로 해주세요:
+        응답은 반드시 다음 JSON 형식으로만 해주세요 (코드 블록이나 다른 설명 없이):
         {{
             "chart_request": 1 또는 0,
             "sql_query": "SQL 쿼리 문자열",
@@ -955,74 +2356,306 @@ async def process_user_llm_query(
             "description": "설명 텍스트"
         }}
         """
-        
-        payload = {
-            "model": "your-model-name",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query.question}
-            ],
-            "temperature": 0.7
-        }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(LLM_API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            
+    if context:
+        system_prompt += f"\n{context}\n"
+    
+    payload = {
+        "model": "your-model-name",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": question}
+        ],
+        "temperature": 0.7
+    }
+    elapsed = time.perf_counter() - stage_start
+    QUERY_STAGE_SECONDS.labels("prompt_build").observe(elapsed)
+    tracer.add_span("prompt_build", elapsed)
+    
+    stage_start = time.perf_counter()
+    async with llm_scheduler.slot(username):
+        elapsed = time.perf_counter() - stage_start
+        QUERY_STAGE_SECONDS.labels("llm_queue_wait").observe(elapsed)
+        tracer.add_span("llm_queue_wait", elapsed)
+        # 엔드포인트마다 구조화 출력 지원 여부가 다를 수 있으므로 보낼 엔드포인트에 맞춰 response_format 결정
+        sent_formats: Dict[str, Optional[str]] = {}
+
+        def payload_for(url: str) -> Dict[str, Any]:
+            response_format = response_format_negotiator.response_format(url)
+            sent_formats[url] = response_format["type"] if response_format else None
+            return {**payload, "response_format": response_format} if response_format else payload
+
+        for _ in response_format_negotiator.LEVELS:
+            start = time.perf_counter()
+            response = await llm_client.post(client, headers=headers, json_for=payload_for)
+            elapsed = time.perf_counter() - start
+            fast_path.record_llm_latency(elapsed)
+            QUERY_STAGE_SECONDS.labels("llm_call").observe(elapsed)
+            endpoint = next((url for url in sent_formats if httpx.URL(url) == response.request.url),
+                            str(response.request.url))
+            tracer.add_span("llm_call", elapsed, status_code=response.status_code,
+                            endpoint=endpoint, response_format=sent_formats.get(endpoint) or "none")
+            # response_format 때문에 400 을 준 엔드포인트는 한 단계 낮춰 재요청 (다른 400 은 그대로 실패)
+            if not (response.status_code == 400 and sent_formats.get(endpoint)
+                    and response_format_negotiator.downgrade(endpoint, response.text)):
+                break
+    response.raise_for_status()
+    
+    with query_stage("json_parse"):
         llm_response = response.json()
         content = llm_response["choices"][0]["message"]["content"]
         
-        # JSON 파싱
-        try:
-            result = json.loads(content)
-        except:
-            result = {
-                "chart_request": 0,
-                "description": content
+        # 코드 펜스/설명 문장 속 JSON 추출 + 스키마 검증
+        return llm_reply_parser.parse(content)
+
+def llm_error_to_http(e: Exception) -> Optional[HTTPException]:
+    """스케줄러 거절/게이트웨이 429는 429, 서킷 열림은 503 + Retry-After 응답으로 변환"""
+    if isinstance(e, (SchedulerRejected, CircuitOpenError)):
+        return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+        return HTTPException(
+            status_code=429,
+            detail="LLM 게이트웨이 요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": e.response.headers.get("Retry-After", "1")}
+        )
+    return None
+
+def check_sql_allowed(sql_query: str):
+    """변경 명령이 들어간 SQL 거부 (LLM 응답/저장된 쿼리 재실행 공통)"""
+    forbidden_keywords = ["DROP", "DELETE", "UPDATE", "INSERT", "CREATE", "ALTER"]
+    if any(keyword in sql_query.upper() for keyword in forbidden_keywords):
+        raise HTTPException(status_code=400, detail="허용되지 않은 SQL 명령어입니다")
+
+# 스냅샷 버전별 SQL 결과 캐시 ((탭, 버전, 정규화한 SQL) -> 결과, LRU) - 버전이 바뀌면 키가 달라져 자연히 밀려남
+sql_result_cache: "OrderedDict[Tuple[str, str, str], pd.DataFrame]" = OrderedDict()
+sql_result_cache_lock = threading.Lock()
+
+# 프리셋 새로 고침 전용 스레드풀과 스레드별 읽기 전용 스냅샷 연결 (memory_db 는 연결 하나라 병렬 실행 불가)
+preset_refresh_executor = ThreadPoolExecutor(max_workers=max(PRESET_REFRESH_CONCURRENCY, 1),
+                                             thread_name_prefix="preset-refresh")
+_snapshot_readers = threading.local()
+
+def _snapshot_reader(tab_id: str, version: str) -> MemoryDB:
+    """현재 스레드의 스냅샷 버전 파일 읽기 전용 연결 (버전이 바뀌면 새로 연결)"""
+    readers = _snapshot_readers.__dict__.setdefault("readers", {})
+    reader = readers.get(tab_id)
+    if reader is None or reader[0] != version:
+        if reader:
+            reader[1].conn.close()
+        path = snapshot_store.version_path(tab_id, version).resolve()
+        db = MemoryDB(f"{path.as_uri()}?mode=ro&immutable=1")
+        db.conn.execute(f"PRAGMA mmap_size = {SNAPSHOT_MMAP_BYTES}")
+        reader = readers[tab_id] = (version, db)
+    return reader[1]
+
+def execute_snapshot_sql(tab_id: str, version: str, sql_query: str,
+                         db: Optional[MemoryDB] = None) -> Tuple[pd.DataFrame, bool]:
+    """스냅샷 버전 기준 SQL 실행 (결과 캐시 사용), (결과, 캐시 적중 여부) 반환
+    
+    db 를 주지 않으면 공유 스냅샷 저장소의 버전 파일을 스레드별 읽기 전용 연결로 열어 실행하므로
+    여러 스레드에서 동시에 호출해도 된다. memory_db 를 주는 경우는 이벤트 루프 스레드에서만 호출한다.
+    """
+    key = (tab_id, version, " ".join(sql_query.split()))
+    with sql_result_cache_lock:
+        df = sql_result_cache.get(key)
+        if df is not None:
+            sql_result_cache.move_to_end(key)
+    if df is not None:
+        SQL_RESULT_CACHE_TOTAL.labels("hit").inc()
+        return df, True
+    SQL_RESULT_CACHE_TOTAL.labels("miss").inc()
+    df = rollup_manager.execute(db or _snapshot_reader(tab_id, version), sql_query)
+    with sql_result_cache_lock:
+        sql_result_cache[key] = df
+        sql_result_cache.move_to_end(key)
+        while len(sql_result_cache) > SQL_RESULT_CACHE_SIZE:
+            sql_result_cache.popitem(last=False)
+    return df, False
+
+async def refresh_preset_charts(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """프리셋 번들에서 현재 스냅샷 결과가 아닌 참조 쿼리 차트의 저장된 SQL 을 현재 스냅샷으로 다시 실행
+    
+    차트별로 병렬 실행하고 (공유 스냅샷 저장소가 없으면 memory_db 에서 순서대로) 결과 캐시를 함께 쓴다.
+    히스토리 레코드는 실행 당시 결과 그대로 두고, 캐시된 번들도 수정하지 않고 새 번들을 반환한다.
+    """
+    targets = [
+        i for i, chart in enumerate(bundle["charts"])
+        if chart.get("snapshot", {}).get("refreshable") and chart["snapshot"]["status"] != "current"
+    ]
+    if not targets:
+        return bundle
+    
+    # 현재 스냅샷 보장 (TTL 이 지났으면 원본 변경 확인 후 필요하면 재적재)
+    for tab_id in {bundle["charts"][i]["snapshot"]["tab_id"] for i in targets}:
+        await fetch_default_charts(tab_id)
+    
+    loop = asyncio.get_running_loop()
+    
+    async def refresh(chart: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = chart["snapshot"]
+        tab_id = snapshot["tab_id"]
+        version = snapshot_versions[tab_id]["version"]
+        chart_data = copy.deepcopy(chart["chart_data"])
+        sql_query = chart_data["sql_query"]
+        check_sql_allowed(sql_query)
+        start = time.perf_counter()
+        if snapshot_store and snapshot_store.version_path(tab_id, version).exists():
+            df, cache_hit = await loop.run_in_executor(
+                preset_refresh_executor, execute_snapshot_sql, tab_id, version, sql_query)
+        else:
+            df, cache_hit = execute_snapshot_sql(tab_id, version, sql_query, memory_db)
+        
+        chart_config = convert_to_chartjs_format(df, chart_data.get("chart_type", "bar"))
+        if not chart_config:
+            raise ValueError("차트 생성에 실패했습니다")
+        # 제목(프리셋 커스텀 제목 포함)은 저장된 차트 것을 유지
+        title = (chart_data.get("config") or {}).get("options", {}).get("plugins", {}).get("title")
+        if title:
+            chart_config["options"]["plugins"]["title"] = title
+        chart_data["chart_config"] = chart_data["config"] = chart_config
+        chart_data["raw_data"] = df.to_dict('records')
+        return {
+            **chart,
+            "chart_data": chart_data,
+            "snapshot": {
+                **snapshot,
+                "current_version": version,
+                "status": "refreshed",
+                "cache_hit": cache_hit,
+                "refresh_ms": round((time.perf_counter() - start) * 1000, 1)
             }
-        
-        # 차트 요청인 경우 처리
-        if result.get("chart_request") == 1:
-            sql_query = result.get("sql_query", "")
-            
-            # SQL 인젝션 방지
-            forbidden_keywords = ["DROP", "DELETE", "UPDATE", "INSERT", "CREATE", "ALTER"]
-            if any(keyword in sql_query.upper() for keyword in forbidden_keywords):
-                raise HTTPException(status_code=400, detail="허용되지 않은 SQL 명령어입니다")
-            
-            # 쿼리 실행
-            df = memory_db.execute_query(sql_query)
+        }
+    
+    charts = list(bundle["charts"])
+    with tracer.span("preset_refresh", charts=len(targets)):
+        results = await asyncio.gather(*(refresh(charts[i]) for i in targets), return_exceptions=True)
+    for i, result in zip(targets, results):
+        if isinstance(result, Exception):
+            # 다시 실행하지 못한 차트는 저장된 결과를 그대로 보여 주고 이유를 표시
+            PRESET_CHART_REFRESH_TOTAL.labels("failed").inc()
+            preset_logger.warning("⚠️ 프리셋 차트 새로 고침 실패 (쿼리 %s): %s", charts[i]["snapshot"]["query_id"], result)
+            detail = result.detail if isinstance(result, HTTPException) else str(result)
+            charts[i] = {**charts[i], "snapshot": {**charts[i]["snapshot"], "refresh_error": detail}}
+        else:
+            PRESET_CHART_REFRESH_TOTAL.labels("refreshed").inc()
+            charts[i] = result
+    return {**bundle, "charts": charts}
+
+def build_query_response(question: str, result: Dict[str, Any], tab_id: Optional[str] = None) -> Dict[str, Any]:
+    """LLM 결과로 SQL 검증/실행 후 Chart.js 응답 생성 (tab_id 를 주면 스냅샷 버전별 결과 캐시 사용)"""
+    if result.get("chart_request") != 1:
+        return {
+            "success": True,
+            "chart_request": 0,
+            "description": result.get("description", "질문에 대한 답변을 생성할 수 없습니다.")
+        }
+    
+    sql_query = result.get("sql_query", "")
+    
+    # SQL 인젝션 방지
+    with query_stage("sql_validate"):
+        check_sql_allowed(sql_query)
+    
+    # 쿼리 실행 (롤업 큐브로 응답 가능하면 큐브에서)
+    with query_stage("sql_execute"):
+        version = snapshot_versions.get(tab_id, {}).get("version") if tab_id else None
+        if version:
+            df, _ = execute_snapshot_sql(tab_id, version, sql_query, memory_db)
+        else:
+            df = rollup_manager.execute(memory_db, sql_query)
+    
+    # Chart.js 형식으로 변환
+    with query_stage("chart_convert"):
+        chart_config = convert_to_chartjs_format(df, result.get("chart_type", "bar"))
+    
+    if not chart_config:
+        return {
+            "success": True,
+            "chart_request": 0,
+            "description": "차트 생성에 실패했습니다."
+        }
+    
+    chart_config["options"]["plugins"]["title"] = {
+        "display": True,
+        "text": question[:50] + "..."
+    }
+    
+    return {
+        "success": True,
+        "chart_request": 1,
+        "chart_config": chart_config,
+        "raw_data": df.to_dict('records'),
+        "description": result.get("description", ""),
+        "sql_query": sql_query,
+        "chart_type": result.get("chart_type", "bar")
+    }
+
+def match_fast_path(question: str, tab_id: str, table_name: str) -> Optional[Dict[str, Any]]:
+    """빠른 경로로 확신할 수 있는 질문이면 LLM 응답 형식의 결과, 아니면 None"""
+    if not FAST_PATH_ENABLED:
+        return None
+    return fast_path.match(question, tab_id, table_name, get_table_schema(table_name))
+
+def build_fast_path_response(question: str, result: Dict[str, Any],
+                             tab_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """빠른 경로 결과로 SQL 실행/차트 생성 (실패하면 None - LLM으로 넘김)"""
+    try:
+        response_data = build_query_response(question, result, tab_id)
+    except Exception as e:
+        logger.warning("⚠️ 빠른 경로 실행 실패, LLM으로 전환 (%s): %s", result["intent"], e)
+        response_data = None
+    if not response_data or response_data.get("chart_request") != 1:
+        fast_path.record_fallback()
+        return None
+    fast_path.record_hit(result["intent"])
+    response_data["answered_by"] = "fast_path"
+    response_data["fast_path"] = {"intent": result["intent"], "confidence": result["confidence"]}
+    return response_data
+
+# 사용자별 LLM 쿼리 처리
+@app.post("/api/users/{username}/llm/query")
+async def process_user_llm_query(
+    username: str,
+    query: LLMQuery
+):
+    """사용자별 LLM 쿼리 처리 (히스토리 저장 포함)
+    
+    같은 탭의 이전 질문 요약을 프롬프트에 포함해 "카테고리 A만" 같은 후속 질문을 해석한다.
+    """
+    query_start = time.perf_counter()
+    answered_by, status = "llm", "error"
+    REQUESTS_IN_FLIGHT.labels("llm_query").inc()
+    try:
+        # 테이블 존재 여부 확인
+        with query_stage("snapshot_load"):
+            table_name = await ensure_tab_snapshot(query.tab_id)
+        
+        # 사용자/탭 대화 세션
+        if query.new_conversation:
+            session_manager.reset_conversation(username, query.tab_id)
+        conversation = session_manager.get_conversation(username, query.tab_id)
+        
+        # 자주 묻는 질문은 LLM 없이 응답
+        response_data = None
+        with query_stage("fast_path_match"):
+            fast_result = match_fast_path(query.question, query.tab_id, table_name)
+        if fast_result:
+            response_data = build_fast_path_response(query.question, fast_result, query.tab_id)
+            if response_data:
+                answered_by = "fast_path"
+        
+        if response_data is None:
+            # 사용자별 요청 한도 확인
+            llm_scheduler.admit(username)
             
-            # Chart.js 형식으로 변환
-            chart_config = convert_to_chartjs_format(df, result.get("chart_type", "bar"))
+            # LLM API 호출 (클라이언트 생성 시 SSL 컨텍스트 구성 비용도 트레이스에 표시)
+            with tracer.span("llm_client_init"):
+                client = httpx.AsyncClient(timeout=LLM_TIMEOUT_SECONDS)
+            async with client:
+                result = await request_llm_analysis(query.question, table_name, client, username,
+                                                    conversation.build_context())
             
-            if chart_config:
-                chart_config["options"]["plugins"]["title"] = {
-                    "display": True,
-                    "text": query.question[:50] + "..."
-                }
-                
-                response_data = {
-                    "success": True,
-                    "chart_request": 1,
-                    "chart_config": chart_config,
-                    "raw_data": df.to_dict('records'),
-                    "description": result.get("description", ""),
-                    "sql_query": sql_query,
-                    "chart_type": result.get("chart_type", "bar")
-                }
-            else:
-                response_data = {
-                    "success": True,
-                    "chart_request": 0,
-                    "description": "차트 생성에 실패했습니다."
-                }
-        else:
-            response_data = {
-                "success": True,
-                "chart_request": 0,
-                "description": result.get("description", "질문에 대한 답변을 생성할 수 없습니다.")
-            }
+            # 차트 요청인 경우 처리
+            response_data = build_query_response(query.question, result, query.tab_id)
         
         # 히스토리 저장
         query_data = {
@@ -1032,23 +2665,211 @@ async def process_user_llm_query(
             "chart_generated": response_data.get("chart_request") == 1
         }
         
-        query_id = session_manager.save_query_history(username, query_data)
+        # 히스토리 기록 시점까지의 단계별 소요 시간 (느린 과거 질의 분석용)
+        trace = current_trace()
+        if trace:
+            query_data["trace"] = trace.to_record()
+        
+        with query_stage("history_write"):
+            query_id = await asyncio.to_thread(session_manager.save_query_history, username, query_data)
         response_data["query_id"] = query_id
         
+        # 다음 후속 질문을 위해 이번 턴 요약 보관
+        conversation.add_turn(query.question, response_data)
+        
         # 사용자 통계 업데이트
-        user_info = session_manager.get_or_create_user(username)
-        user_info["total_queries"] += 1
-        if query_data["chart_generated"]:
-            user_info["total_charts"] += 1
-        session_manager.save_metadata(username, user_info)
+        with query_stage("metadata_update"):
+            await asyncio.to_thread(
+                session_manager.record_queries, username, 1, 1 if query_data["chart_generated"] else 0)
         
+        status = "ok"
         return response_data
         
     except Exception as e:
-        print(f"❌ 쿼리 처리 실패: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        http_error = llm_error_to_http(e)
+        if http_error:
+            status = "rejected"
+            logger.warning("⏳ LLM 요청 거절 (%s): %s", username, http_error.detail)
+            raise http_error
+        logger.exception("❌ 쿼리 처리 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"쿼리 처리 실패: {str(e)}")
+    finally:
+        REQUESTS_IN_FLIGHT.labels("llm_query").dec()
+        QUERIES_TOTAL.labels(answered_by, status).inc()
+        QUERY_SECONDS.labels(answered_by).observe(time.perf_counter() - query_start)
+
+# 사용자/탭 대화 맥락 조회
+@app.get("/api/users/{username}/conversations/{tab_id}")
+async def get_user_conversation(username: str, tab_id: str):
+    """보관 중인 이전 턴 요약과 프롬프트에 들어갈 맥락 토큰 수"""
+    conversation = session_manager.get_conversation(username, tab_id, create=False)
+    if conversation is None:
+        return {"success": True, "tab_id": tab_id, "turns": [], "context_tokens": 0}
+    return {"success": True, "tab_id": tab_id, **conversation.to_dict()}
+
+# 사용자/탭 대화 맥락 초기화
+@app.delete("/api/users/{username}/conversations/{tab_id}")
+async def reset_user_conversation(username: str, tab_id: str):
+    """새 대화 시작 (이전 질문 맥락 제거)"""
+    return {"success": True, "reset": session_manager.reset_conversation(username, tab_id)}
+
+# 사용자별 LLM 일괄 쿼리 처리 (대시보드/프리셋 재구성용)
+@app.post("/api/users/{username}/llm/batch-query")
+async def process_user_llm_batch_query(
+    username: str,
+    batch: LLMBatchQuery
+):
+    """여러 질문을 한 번에 처리 - 중복 제거, LLM 동시 호출, 단일 읽기 트랜잭션, 히스토리 일괄 저장"""
+    if batch.tab_id not in TAB_QUERIES:
+        raise HTTPException(status_code=404, detail="탭을 찾을 수 없습니다")
+    if not batch.questions:
+        raise HTTPException(status_code=400, detail="질문이 없습니다")
+    if len(batch.questions) > LLM_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {LLM_BATCH_MAX_QUESTIONS}개까지 요청할 수 있습니다")
+    
+    batch_start = time.perf_counter()
+    try:
+        table_name = await ensure_tab_snapshot(batch.tab_id)
+        
+        # 동일 질문은 한 번만 처리
+        unique_questions = list(dict.fromkeys(q.strip() for q in batch.questions))
+        timings = {q: {} for q in unique_questions}
+        responses: Dict[str, Dict[str, Any]] = {}
+        snapshot_version = snapshot_versions.get(batch.tab_id, {}).get("version")
+        
+        # 빠른 경로로 확신할 수 있는 질문은 LLM 없이 SQL 템플릿 사용
+        fast_results = {}
+        for question in unique_questions:
+            result = match_fast_path(question, batch.tab_id, table_name)
+            if result:
+                fast_results[question] = result
+        llm_questions = [q for q in unique_questions if q not in fast_results]
+        llm_results: Dict[str, Any] = {}
+        
+        concurrency = min(batch.max_concurrency or LLM_BATCH_CONCURRENCY, LLM_BATCH_CONCURRENCY)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def call_llm(question: str, client: httpx.AsyncClient):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    llm_results[question] = await request_llm_analysis(question, table_name, client, username)
+                except Exception as e:
+                    http_error = llm_error_to_http(e)
+                    llm_results[question] = http_error.detail if http_error else e
+                timings[question]["llm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        
+        async def run_llm(questions: List[str]):
+            if not questions:
+                return
+            # 질문 수만큼 토큰 차감 - burst 단위로 나눠서 받고, 첫 묶음도 안 되면 전체를 429 로 거절
+            admitted: List[str] = []
+            for i in range(0, len(questions), llm_scheduler.burst):
+                chunk = questions[i:i + llm_scheduler.burst]
+                try:
+                    llm_scheduler.admit(username, len(chunk))
+                except SchedulerRejected as e:
+                    if not admitted:
+                        raise
+                    for question in questions[i:]:
+                        llm_results[question] = llm_error_to_http(e).detail
+                    break
+                admitted += chunk
+            questions = admitted
+            with tracer.span("llm_client_init"):
+                client = httpx.AsyncClient(timeout=LLM_TIMEOUT_SECONDS)
+            async with client:
+                await asyncio.gather(*(call_llm(q, client) for q in questions))
+        
+        def build_llm_responses(questions: List[str]):
+            for question in questions:
+                result = llm_results[question]
+                start = time.perf_counter()
+                if isinstance(result, (Exception, str)):
+                    responses[question] = {"success": False, "error": f"LLM 호출 실패: {result}"}
+                else:
+                    try:
+                        responses[question] = build_query_response(question, result, batch.tab_id)
+                    except HTTPException as e:
+                        responses[question] = {"success": False, "error": e.detail}
+                    except Exception as e:
+                        responses[question] = {"success": False, "error": f"쿼리 실행 실패: {e}"}
+                timings[question]["sql_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        
+        await run_llm(llm_questions)
+        
+        # 모든 SQL을 같은 스냅샷 위에서 하나의 읽기 트랜잭션으로 실행
+        fallback_questions = []
+        with memory_db.read_transaction():
+            for question, result in fast_results.items():
+                start = time.perf_counter()
+                response_data = build_fast_path_response(question, result, batch.tab_id)
+                timings[question]["sql_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                if response_data:
+                    responses[question] = response_data
+                else:
+                    fallback_questions.append(question)
+            build_llm_responses(llm_questions)
+        
+        # 빠른 경로 SQL이 실패한 질문만 LLM으로 다시 처리
+        if fallback_questions:
+            await run_llm(fallback_questions)
+            with memory_db.read_transaction():
+                build_llm_responses(fallback_questions)
+        
+        # 성공한 항목만 히스토리에 일괄 저장
+        saved = [q for q in unique_questions if responses[q].get("success")]
+        query_ids = await asyncio.to_thread(session_manager.save_query_history_batch, username, [
+            {
+                "tab_id": batch.tab_id,
+                "question": q,
+                "response": responses[q],
+                "chart_generated": responses[q].get("chart_request") == 1
+            }
+            for q in saved
+        ])
+        for question, query_id in zip(saved, query_ids):
+            responses[question]["query_id"] = query_id
+        
+        # 사용자 통계 업데이트 (한 번만)
+        if saved:
+            await asyncio.to_thread(
+                session_manager.record_queries,
+                username, len(saved), sum(1 for q in saved if responses[q].get("chart_request") == 1)
+            )
+        
+        items = []
+        for index, question in enumerate(batch.questions):
+            key = question.strip()
+            first_index = next(i for i, q in enumerate(batch.questions) if q.strip() == key)
+            items.append({
+                "index": index,
+                "question": question,
+                "duplicate_of": first_index if first_index != index else None,
+                "timings": timings[key],
+                **responses[key]
+            })
+        
+        return {
+            "success": True,
+            "tab_id": batch.tab_id,
+            "snapshot_version": snapshot_version,
+            "unique_questions": len(unique_questions),
+            "fast_path_answered": sum(1 for q in unique_questions if responses[q].get("answered_by") == "fast_path"),
+            "concurrency": concurrency,
+            "total_ms": round((time.perf_counter() - batch_start) * 1000, 1),
+            "results": items
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        http_error = llm_error_to_http(e)
+        if http_error:
+            logger.warning("⏳ LLM 일괄 요청 거절 (%s): %s", username, http_error.detail)
+            raise http_error
+        logger.exception("❌ 일괄 쿼리 처리 실패: %s", e)
+        raise HTTPException(status_code=500, detail=f"일괄 쿼리 처리 실패: {str(e)}")
 
 # ==================
 # 프리셋 API 엔드포인트
@@ -1068,7 +2889,7 @@ async def get_user_presets(
             "presets": presets
         }
     except Exception as e:
-        print(f"❌ 프리셋 목록 조회 실패: {str(e)}")
+        preset_logger.error("❌ 프리셋 목록 조회 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"프리셋 목록 조회 실패: {str(e)}")
 
 @app.post("/api/users/{username}/presets")
@@ -1076,36 +2897,60 @@ async def create_user_preset(
     username: str = FastPath(..., description="사용자명"),
     preset_data: PresetCreate = Body(...)
 ):
-    """새 프리셋 생성"""
+    """새 프리셋 생성 (보관 작업이 사용자 보관 락을 오래 잡을 수 있어 스레드에서 저장)"""
     try:
         preset_manager = PresetManager(username)
-        preset_id = preset_manager.save_preset(preset_data.dict())
+        preset_id = await asyncio.to_thread(preset_manager.save_preset, preset_data.dict())
         return {
             "success": True,
             "preset_id": preset_id,
             "message": "프리셋이 성공적으로 저장되었습니다."
         }
     except Exception as e:
-        print(f"❌ 프리셋 생성 실패: {str(e)}")
+        preset_logger.error("❌ 프리셋 생성 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"프리셋 생성 실패: {str(e)}")
 
 @app.get("/api/users/{username}/presets/{preset_id}")
 async def get_user_preset(
+    request: Request,
+    response: Response,
     username: str = FastPath(..., description="사용자명"),
-    preset_id: str = FastPath(..., description="프리셋 ID")
+    preset_id: str = FastPath(..., description="프리셋 ID"),
+    refresh: bool = False
 ):
-    """프리셋 로드 (차트 데이터 포함)"""
+    """프리셋 로드 (차트 데이터 포함)
+    
+    참조 쿼리 차트마다 snapshot 에 결과를 만든 스냅샷 버전과 현재 버전, 상태(current/stale/unknown)를 표시한다.
+    refresh=true 면 현재 버전이 아닌 차트의 저장된 SQL 을 현재 스냅샷으로 다시 실행한다 (상태 refreshed).
+    ETag 는 프리셋/참조 쿼리 파일 상태와 참조 탭의 스냅샷 버전 기준 (If-None-Match 가 맞으면 병합/새로 고침 없이 304).
+    """
     try:
         preset_manager = PresetManager(username)
-        result = preset_manager.load_preset(preset_id)
+        with REQUESTS_IN_FLIGHT.track_in_progress("preset_load"), PRESET_LOAD_SECONDS.time():
+            result = preset_manager.load_preset(preset_id)
+            cached = preset_bundle_cache.get((username, preset_id))
+            if cached:
+                not_modified = conditional_response(
+                    request, response, weak_etag(cached["etag"], "refresh") if refresh else cached["etag"],
+                    cached["last_modified"], "private, no-cache")
+                if not_modified:
+                    NOT_MODIFIED_TOTAL.labels("preset").inc()
+                    return not_modified
+            if refresh:
+                result = await refresh_preset_charts(result)
+        staleness: Dict[str, int] = {}
+        for chart in result["charts"]:
+            if "snapshot" in chart:
+                staleness[chart["snapshot"]["status"]] = staleness.get(chart["snapshot"]["status"], 0) + 1
         return {
             "success": True,
-            **result
+            **result,
+            "staleness": staleness
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 프리셋 로드 실패: {str(e)}")
+        preset_logger.error("❌ 프리셋 로드 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"프리셋 로드 실패: {str(e)}")
 
 @app.put("/api/users/{username}/presets/{preset_id}")
@@ -1114,10 +2959,10 @@ async def update_user_preset(
     preset_id: str = FastPath(..., description="프리셋 ID"),
     update_data: PresetUpdate = Body(...)
 ):
-    """프리셋 수정"""
+    """프리셋 수정 (보관 작업이 사용자 보관 락을 오래 잡을 수 있어 스레드에서 저장)"""
     try:
         preset_manager = PresetManager(username)
-        success = preset_manager.update_preset(preset_id, update_data.dict(exclude_unset=True))
+        success = await asyncio.to_thread(preset_manager.update_preset, preset_id, update_data.dict(exclude_unset=True))
         
         if not success:
             raise HTTPException(status_code=404, detail="프리셋을 찾을 수 없습니다")
@@ -1129,7 +2974,7 @@ async def update_user_preset(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 프리셋 수정 실패: {str(e)}")
+        preset_logger.error("❌ 프리셋 수정 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"프리셋 수정 실패: {str(e)}")
 
 @app.delete("/api/users/{username}/presets/{preset_id}")
@@ -1140,7 +2985,7 @@ async def delete_user_preset(
     """프리셋 삭제"""
     try:
         preset_manager = PresetManager(username)
-        success = preset_manager.delete_preset(preset_id)
+        success = await asyncio.to_thread(preset_manager.delete_preset, preset_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="프리셋을 찾을 수 없습니다")
@@ -1152,9 +2997,12 @@ async def delete_user_preset(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 프리셋 삭제 실패: {str(e)}")
+        preset_logger.error("❌ 프리셋 삭제 실패: %s", e)
         raise HTTPException(status_code=500, detail=f"프리셋 삭제 실패: {str(e)}")
 
+startup_state["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 3)
+STARTUP_SECONDS.labels("import").set(startup_state["import_seconds"])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,207 @@
+# oracle_fetch.py - Oracle 대량 조회 경로 (Arrow / 컬럼 단위 변환)
+import logging
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource  # Windows에는 없음
+except ImportError:
+    resource = None
+
+# 한 번의 라운드트립으로 가져올 행 수
+DEFAULT_ARRAYSIZE = 10000
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# float64 로 정확히 표현되는 정수 범위 (NULL 이 섞인 정수 컬럼을 NaN 으로 표현할 때)
+_FLOAT_EXACT_INT = 2 ** 53
+
+# Oracle 타입 이름 -> 컬럼 종류
+_NUMBER_TYPES = {"DB_TYPE_NUMBER"}
+_FLOAT_TYPES = {"DB_TYPE_BINARY_FLOAT", "DB_TYPE_BINARY_DOUBLE", "DB_TYPE_BINARY_INTEGER"}
+_STRING_TYPES = {"DB_TYPE_VARCHAR", "DB_TYPE_NVARCHAR", "DB_TYPE_CHAR", "DB_TYPE_NCHAR",
+                 "DB_TYPE_LONG", "DB_TYPE_ROWID"}
+_DATE_TYPES = {"DB_TYPE_DATE", "DB_TYPE_TIMESTAMP", "DB_TYPE_TIMESTAMP_LTZ", "DB_TYPE_TIMESTAMP_TZ"}
+
+
+def _type_name(type_code: Any) -> str:
+    """oracledb DbType 또는 문자열에서 타입 이름 추출"""
+    return getattr(type_code, "name", str(type_code)).upper()
+
+
+def column_kind(description: tuple) -> str:
+    """cursor.description 항목을 int/float/number/str/datetime/object 중 하나로 매핑"""
+    name = _type_name(description[1])
+    if name in _NUMBER_TYPES:
+        precision = description[4] if len(description) > 4 else None
+        scale = description[5] if len(description) > 5 else None
+        # NUMBER(p, 0) 이고 int64 범위 안이면 정수
+        if scale == 0 and precision and 0 < precision <= 18:
+            return "int"
+        # 소수 자릿수가 있는 NUMBER(p, s) 는 실수
+        if scale is not None and scale > 0:
+            return "float"
+        # 정밀도 미지정 NUMBER(COUNT(*), EXTRACT 등 계산 컬럼 포함)와 NUMBER(19~38, 0)는 청크 값을 보고 결정
+        return "number"
+    if name in _FLOAT_TYPES:
+        return "float"
+    if name in _STRING_TYPES:
+        return "str"
+    if name in _DATE_TYPES:
+        return "datetime"
+    return "object"
+
+
+def _is_integral(value: Any) -> bool:
+    if isinstance(value, Decimal):
+        return value.is_finite() and value == value.to_integral_value()
+    return isinstance(value, int)
+
+
+def _number_array(values: tuple):
+    """정밀도 미지정 NUMBER 청크 변환 - 모두 int64 범위 정수면 int64, 소수가 섞이면 float64,
+    int64 를 넘는 정수나 정밀도를 잃는 값은 object(int/Decimal 그대로)"""
+    present = [v for v in values if v is not None]
+    if all(_is_integral(v) for v in present):
+        ints = [int(v) for v in present]
+        if all(_INT64_MIN <= v <= _INT64_MAX for v in ints):
+            if len(ints) == len(values):
+                return np.fromiter(ints, dtype=np.int64, count=len(ints))
+            # NULL 이 섞이면 pandas.read_sql 과 같이 float64 + NaN (정확히 표현되는 범위일 때만)
+            if all(-_FLOAT_EXACT_INT <= v <= _FLOAT_EXACT_INT for v in ints):
+                return np.array([None if v is None else int(v) for v in values], dtype=np.float64)
+        return np.array(values, dtype=object)
+    if all(isinstance(v, (int, float)) for v in present):
+        return np.array(values, dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+def _to_array(values: tuple, kind: str):
+    """한 청크의 컬럼 값을 타입이 지정된 NumPy/pandas 배열로 변환"""
+    if kind == "int":
+        try:
+            return np.fromiter(values, dtype=np.int64, count=len(values))
+        except TypeError:
+            # NULL이 섞이면 pandas.read_sql과 동일하게 float64 + NaN
+            return np.array(values, dtype=np.float64)
+    if kind == "number":
+        return _number_array(values)
+    if kind == "float":
+        return np.array(values, dtype=np.float64)
+    if kind == "datetime":
+        # np.array(datetime64)보다 pandas 변환 경로가 훨씬 빠름
+        return pd.array(values, dtype="datetime64[ns]")
+    return np.array(values, dtype=object)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """프로세스 최대 RSS (MB)"""
+    if resource is None:
+        return None
+    # Linux는 KB 단위
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def open_cursor(conn, sql: str, arraysize: int = DEFAULT_ARRAYSIZE):
+    """대량 조회용 커서 생성 (arraysize/prefetchrows 확대)"""
+    cursor = conn.cursor()
+    cursor.arraysize = arraysize
+    if hasattr(cursor, "prefetchrows"):
+        cursor.prefetchrows = arraysize + 1
+    cursor.execute(sql)
+    return cursor
+
+
+def iter_column_chunks(cursor, arraysize: int = DEFAULT_ARRAYSIZE) -> Iterator[pd.DataFrame]:
+    """fetchmany 결과를 행 튜플 대신 타입이 지정된 컬럼 배열로 바로 변환해 청크 단위로 반환"""
+    names = [d[0] for d in cursor.description]
+    kinds = [column_kind(d) for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        if not rows:
+            break
+        columns = zip(*rows)
+        yield pd.DataFrame(
+            {name: _to_array(values, kind) for name, kind, values in zip(names, kinds, columns)},
+            copy=False
+        )
+
+
+def _oracle_df_to_pandas(odf) -> pd.DataFrame:
+    """OracleDataFrame -> pandas 변환 (pyarrow 없으면 interchange 프로토콜 사용)"""
+    try:
+        import pyarrow
+        return pyarrow.table(odf).to_pandas()
+    except ImportError:
+        return pd.api.interchange.from_dataframe(odf)
+
+
+def _fetch_arrow(conn, sql: str, arraysize: int) -> Optional[pd.DataFrame]:
+    """드라이버의 DataFrame(Arrow) 조회 기능 사용 (python-oracledb 2.4+)"""
+    if not hasattr(conn, "fetch_df_all"):
+        return None
+    return _oracle_df_to_pandas(conn.fetch_df_all(statement=sql, arraysize=arraysize))
+
+
+def iter_dataframe_chunks(conn, sql: str, chunk_rows: int = DEFAULT_ARRAYSIZE) -> Iterator[pd.DataFrame]:
+    """조회 결과를 chunk_rows 단위 DataFrame으로 스트리밍 (전체 결과를 메모리에 올리지 않음)"""
+    if hasattr(conn, "fetch_df_batches"):
+        for odf in conn.fetch_df_batches(statement=sql, size=chunk_rows):
+            yield _oracle_df_to_pandas(odf)
+        return
+
+    cursor = open_cursor(conn, sql, chunk_rows)
+    try:
+        yield from iter_column_chunks(cursor, chunk_rows)
+    finally:
+        cursor.close()
+
+
+def _fetch_columnar(conn, sql: str, arraysize: int) -> pd.DataFrame:
+    """청크 단위 컬럼 변환 후 한 번에 결합"""
+    cursor = open_cursor(conn, sql, arraysize)
+    try:
+        names = [d[0] for d in cursor.description]
+        chunks = list(iter_column_chunks(cursor, arraysize))
+    finally:
+        cursor.close()
+    if not chunks:
+        return pd.DataFrame(columns=names)
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+def fetch_dataframe(conn, sql: str, arraysize: int = DEFAULT_ARRAYSIZE) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Oracle 조회 결과를 DataFrame으로 가져오고 처리량/메모리 통계를 함께 반환"""
+    start = time.perf_counter()
+    df = None
+    method = "arrow"
+    try:
+        df = _fetch_arrow(conn, sql, arraysize)
+    except Exception as e:
+        logger.warning("⚠️ Arrow 조회 실패, 컬럼 조회로 전환: %s", e)
+    if df is None:
+        method = "columnar"
+        df = _fetch_columnar(conn, sql, arraysize)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "method": method,
+        "rows": len(df),
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(len(df) / elapsed) if elapsed > 0 else None,
+        "frame_mb": round(df.memory_usage(deep=False).sum() / 1024 / 1024, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return df, stats
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """조회 통계를 로그용 문자열로 변환"""
+    rate = f"{stats['rows_per_sec']:,} rows/s" if stats.get("rows_per_sec") else "-"
+    return (f"{stats['rows']}행, {stats['seconds']}s, {rate}, "
+            f"DataFrame {stats['frame_mb']}MB, 최대 RSS {stats['peak_rss_mb']}MB ({stats['method']})")
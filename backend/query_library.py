@@ -0,0 +1,232 @@
+# query_library.py - 사용자 공통 쿼리 라이브러리 (내용 주소 저장 + 참조 수)
+#
+# {root}/objects/{hash[:2]}/{hash}.json  질문/스냅샷 버전/응답(SQL, raw_data 포함) 한 벌 (쓴 뒤 변경하지 않음)
+# {root}/library.db                      항목 메타데이터와 (사용자, 쿼리 ID) -> 항목 참조 (여러 워커 공유, WAL)
+#
+# 같은 탭, 같은 질문, 같은 스냅샷 버전, 같은 응답은 해시가 같아 한 번만 저장되고,
+# 사용자 히스토리 파일(user_data/{사용자}/queries/{ID}.json)에는 response 대신 response_ref 만 남는다.
+# 참조 수가 많은 질문은 LLM 호출 없이 바로 답할 수 있는 인기 질문으로 제안한다.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    hash TEXT PRIMARY KEY,
+    tab_id TEXT,
+    question TEXT,
+    question_key TEXT,
+    snapshot_version TEXT,
+    chart_generated INTEGER,
+    chart_type TEXT,
+    bytes INTEGER,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS entries_question ON entries (tab_id, question_key);
+CREATE TABLE IF NOT EXISTS refs (
+    username TEXT NOT NULL,
+    query_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    created_at REAL,
+    PRIMARY KEY (username, query_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash);
+"""
+
+
+def question_key(question: Optional[str]) -> str:
+    """인기 질문 집계용 질문 정규화 (공백/대소문자/끝 문장부호 차이 무시)"""
+    return re.sub(r"\s+", " ", (question or "").strip().lower()).rstrip("?.! ")
+
+
+def content_hash(tab_id: Optional[str], question: Optional[str], snapshot_version: Optional[str],
+                 response: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"tab_id": tab_id, "question": question, "snapshot_version": snapshot_version, "response": response},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryLibrary:
+    """내용 주소 쿼리 저장소와 참조 수 관리"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.root / "library.db", check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "bytes_saved": 0, "resolved": 0, "missing": 0}
+
+    def object_path(self, entry_hash: str) -> Path:
+        return self.root / "objects" / entry_hash[:2] / f"{entry_hash}.json"
+
+    def intern(self, username: str, query_id: str, tab_id: Optional[str], question: Optional[str],
+               response: Dict[str, Any], snapshot_version: Optional[str] = None) -> str:
+        """응답을 라이브러리에 저장(이미 있으면 재사용)하고 사용자 쿼리의 참조를 기록, 해시 반환"""
+        entry_hash = content_hash(tab_id, question, snapshot_version, response)
+        path = self.object_path(entry_hash)
+        if path.exists():
+            self.stats["deduplicated"] += 1
+            self.stats["bytes_saved"] += path.stat().st_size
+        else:
+            # 임시 파일에 쓰고 이름 변경 - 다른 워커가 같은 항목을 동시에 써도 내용이 같아 어느 쪽이 남아도 됨
+            # 객체는 raw_data 가 커서 들여쓰기 없이 저장
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            entry = {
+                "hash": entry_hash,
+                "tab_id": tab_id,
+                "question": question,
+                "snapshot_version": snapshot_version,
+                "created_at": time.time(),
+                "response": response,
+            }
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(",", ":"), default=str)
+            os.replace(tmp, path)
+            self.stats["stored"] += 1
+
+        chart_type = response.get("chart_type") or (response.get("chart_config") or {}).get("type")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO entries (hash, tab_id, question, question_key, snapshot_version, "
+                "chart_generated, chart_type, bytes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry_hash, tab_id, question, question_key(question), snapshot_version,
+                 1 if response.get("chart_request") == 1 else 0, chart_type, path.stat().st_size, time.time()),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO refs (username, query_id, hash, created_at) VALUES (?, ?, ?, ?)",
+                (username, query_id, entry_hash, time.time()),
+            )
+        return entry_hash
+
+    def get(self, entry_hash: str) -> Optional[Dict[str, Any]]:
+        """라이브러리 항목 (없으면 None). 호출자가 수정해도 되도록 매번 파일에서 새로 읽음"""
+        try:
+            with open(self.object_path(entry_hash), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """참조형 히스토리 레코드에 response 를 채움 (기존 인라인 레코드는 그대로)"""
+        entry_hash = record.get("response_ref")
+        if not entry_hash or "response" in record:
+            return record
+        entry = self.get(entry_hash)
+        if entry is None:
+            self.stats["missing"] += 1
+            logger.warning("⚠️ 쿼리 라이브러리 항목이 없습니다: %s (쿼리 %s)", entry_hash, record.get("id"))
+            return {**record, "response": {"success": False, "chart_request": 0,
+                                           "description": "저장된 응답을 찾을 수 없습니다."}}
+        self.stats["resolved"] += 1
+        return {**record, "response": entry["response"]}
+
+    def popular(self, tab_id: str, limit: int = 10,
+                current_version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """탭별 인기 질문 (정규화한 질문별 참조 수 순)
+
+        질문마다 현재 스냅샷 버전의 항목을 우선, 없으면 가장 최근 항목을 대표로 고른다.
+        current 가 False 인 항목은 이전 데이터 기준 응답이다.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT e.hash, e.question, e.question_key, e.snapshot_version, e.chart_generated, e.chart_type,
+                       e.created_at, COUNT(r.query_id), COUNT(DISTINCT r.username), MAX(r.created_at)
+                FROM entries e JOIN refs r ON r.hash = e.hash
+                WHERE e.tab_id = ?
+                GROUP BY e.hash
+                """,
+                (tab_id,),
+            ).fetchall()
+
+        groups: Dict[str, Dict[str, Any]] = {}
+        for (entry_hash, question, key, version, chart_generated, chart_type,
+             created_at, refs, users, last_used) in rows:
+            group = groups.setdefault(key, {"refs": 0, "users": 0, "last_used": 0.0, "best": None})
+            group["refs"] += refs
+            group["users"] = max(group["users"], users)
+            group["last_used"] = max(group["last_used"], last_used or 0.0)
+            rank = (current_version is not None and version == current_version, created_at)
+            if group["best"] is None or rank > group["best"][0]:
+                group["best"] = (rank, {
+                    "hash": entry_hash,
+                    "question": question,
+                    "snapshot_version": version,
+                    "current": rank[0],
+                    "chart_generated": bool(chart_generated),
+                    "chart_type": chart_type,
+                })
+
+        ranked = sorted(groups.values(), key=lambda g: (g["refs"], g["last_used"]), reverse=True)[:limit]
+        return [
+            {**g["best"][1], "refs": g["refs"], "users": g["users"], "last_used": g["last_used"]}
+            for g in ranked
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+            refs = self._conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {
+            "root": str(self.root),
+            "entries": entries,
+            "refs": refs,
+            "stored_bytes": stored_bytes,
+            **self.stats,
+        }
+
+
+def migrate_user_data(library: QueryLibrary, user_data_path: Path) -> Dict[str, int]:
+    """기존 인라인 히스토리 파일을 라이브러리 참조로 변환 (스냅샷 버전은 알 수 없어 None)"""
+    counts = {"migrated": 0, "skipped": 0}
+    for query_file in sorted(user_data_path.glob("*/queries/*.json")):
+        username = query_file.parent.parent.name
+        with open(query_file, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        if "response" not in record or not isinstance(record["response"], dict):
+            counts["skipped"] += 1
+            continue
+        response = record.pop("response")
+        record["response_ref"] = library.intern(
+            username, record["id"], record.get("tab_id"), record.get("question"), response)
+        tmp = query_file.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, query_file)
+        counts["migrated"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자 히스토리의 인라인 응답을 공유 쿼리 라이브러리 참조로 변환")
+    parser.add_argument("--user-data", default="user_data")
+    parser.add_argument("--library", default=os.environ.get("QUERY_LIBRARY_DIR", "query_library"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    library = QueryLibrary(args.library)
+    counts = migrate_user_data(library, Path(args.user_data))
+    stats = library.get_stats()
+    logger.info("📚 변환 %d건, 건너뜀 %d건 -> 항목 %d개, 참조 %d개, 중복 제거로 절약한 크기 %.1fKB",
+                counts["migrated"], counts["skipped"], stats["entries"], stats["refs"], stats["bytes_saved"] / 1024)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# rollup.py - 스냅샷 적재 시 미리 집계한 롤업 큐브와 GROUP BY 쿼리 재작성
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 재작성된 쿼리에 남아도 되는 SQL 키워드/함수
+_ALLOWED_WORDS = {
+    "SELECT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT", "OFFSET",
+    "AS", "AND", "OR", "NOT", "IN", "BETWEEN", "LIKE", "IS", "NULL", "ASC", "DESC",
+    "SUM", "MIN", "MAX", "ROUND", "CAST", "REAL", "INTEGER", "TEXT", "ABS", "COALESCE",
+}
+
+_QUERY_PATTERN = re.compile(
+    r"^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<table>\w+)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+    r"(?:\s+HAVING\s+(?P<having>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_AGG_PATTERN = re.compile(r"\b(SUM|AVG|COUNT|MIN|MAX)\s*\(\s*(DISTINCT\s+)?(\*|\w+)\s*\)", re.IGNORECASE)
+_ALIAS_PATTERN = re.compile(r'\bAS\s+(\w+|"(?:[^"]|"")*")', re.IGNORECASE)
+_IMPLICIT_ALIAS_PATTERN = re.compile(r"\)\s*(\w+)\s*$")
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_QUOTED_PATTERN = re.compile(r'"(?:[^"]|"")*"')
+_IDENT_PATTERN = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]*\b")
+
+
+class _NotRewritable(Exception):
+    pass
+
+
+def _split_select_items(select: str) -> List[str]:
+    """괄호 밖의 쉼표 기준으로 SELECT 항목 분리"""
+    items, depth, current = [], 0, []
+    for ch in select:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    items.append("".join(current))
+    return items
+
+
+def _sub_outside_quotes(pattern: re.Pattern, repl, text: str) -> str:
+    """문자열 리터럴/따옴표 식별자 밖에서만 치환"""
+    parts = re.split(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""", text)
+    return "".join(part if i % 2 else pattern.sub(repl, part) for i, part in enumerate(parts))
+
+
+def _unquote_identifiers(text: str) -> str:
+    """"sales" 처럼 따옴표로 감싼 단순 식별자의 따옴표 제거 (별칭 "SUM(sales)" 등 단순하지 않은 것과 문자열 리터럴은 그대로)
+
+    큐브에 없는 컬럼을 "..." 로 감싸 두면 SQLite 가 문자열 리터럴로 해석해 틀린 결과를 내므로,
+    검사 전에 풀어서 일반 식별자와 똑같이 확인한다.
+    """
+    parts = re.split(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""", text)
+    return "".join(
+        part[1:-1] if i % 2 and re.fullmatch(r'"[A-Za-z_][A-Za-z0-9_]*"', part) else part
+        for i, part in enumerate(parts)
+    )
+
+
+def _preserve_column_names(select: str) -> str:
+    """별칭 없는 집계 항목에 원래 표현식을 별칭으로 붙여 재작성 후에도 결과 컬럼명 유지"""
+    items = []
+    for item in _split_select_items(select):
+        text = item.strip()
+        if (_AGG_PATTERN.search(_unquote_identifiers(text)) and not _ALIAS_PATTERN.search(text)
+                and not _IMPLICIT_ALIAS_PATTERN.search(text)):
+            quoted = text.replace('"', '""')
+            item = f'{text} AS "{quoted}"'
+        items.append(item)
+    return ",".join(items)
+
+
+class RollupManager:
+    """탭별 차원 컬럼 조합으로 미리 집계한 큐브를 관리하고, 맞는 쿼리를 큐브로 응답"""
+
+    def __init__(self, cube_specs: Dict[str, Dict[str, List[str]]]):
+        # {"tab1": {"dimensions": [...], "measures": [...]}}
+        self.cube_specs = cube_specs
+        self.cubes: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"queries": 0, "hits": 0, "misses": 0, "fallbacks": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cube_table(table_name: str) -> str:
+        return f"{table_name}__cube"
+
+    def build(self, memory_db, tab_id: str) -> Optional[Dict[str, Any]]:
+        """스냅샷 테이블에서 최하위 그레인 큐브 생성 후 큐브 정보 반환 (SUM/COUNT/MIN/MAX 는 상위 그룹으로 재집계 가능)"""
+        spec = self.cube_specs.get(tab_id)
+        table_name = f"{tab_id}_data"
+        self.cubes.pop(table_name, None)
+        if not spec or not memory_db.table_exists(table_name):
+            return None
+
+        columns = {c["name"].lower() for c in memory_db.get_table_info(table_name)}
+        dimensions = [d for d in spec["dimensions"] if d in columns]
+        measures = [m for m in spec["measures"] if m in columns]
+        if not dimensions:
+            return None
+
+        select_parts = list(dimensions) + ["COUNT(*) AS __rows"]
+        for m in measures:
+            select_parts += [
+                f"SUM({m}) AS {m}__sum",
+                f"COUNT({m}) AS {m}__cnt",
+                f"MIN({m}) AS {m}__min",
+                f"MAX({m}) AS {m}__max",
+            ]
+        cube_table = self.cube_table(table_name)
+        dims = ", ".join(dimensions)
+        memory_db.drop_table(cube_table)
+        memory_db.conn.execute(
+            f'CREATE TABLE "{cube_table}" AS SELECT {", ".join(select_parts)} '
+            f'FROM "{table_name}" GROUP BY {dims}'
+        )
+        memory_db.conn.commit()
+
+        cube_rows = memory_db.conn.execute(f'SELECT COUNT(*) FROM "{cube_table}"').fetchone()[0]
+        base_rows = memory_db.conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+        self.cubes[table_name] = {
+            "table": cube_table,
+            "dimensions": dimensions,
+            "measures": measures,
+            "cube_rows": cube_rows,
+            "base_rows": base_rows,
+        }
+        logger.info("🧊 %s 롤업 큐브 생성: %d행 -> %d행 (%s)", table_name, base_rows, cube_rows, ", ".join(dimensions))
+        return self.cubes[table_name]
+
+    def register(self, table_name: str, cube: Optional[Dict[str, Any]]):
+        """다른 워커가 만들어 공유 스냅샷에 넣어 둔 큐브 정보 등록 (None 이면 해제)"""
+        if cube:
+            self.cubes[table_name] = cube
+        else:
+            self.cubes.pop(table_name, None)
+
+    def rewrite(self, sql: str) -> Optional[str]:
+        """큐브로 응답 가능한 GROUP BY/집계 쿼리면 큐브 쿼리로 재작성, 아니면 None"""
+        match = _QUERY_PATTERN.match(sql)
+        if not match or re.search(r"\b(JOIN|UNION|DISTINCT|OVER)\b|\(\s*SELECT", sql, re.IGNORECASE):
+            return None
+        cube = self.cubes.get(match.group("table").lower())
+        if not cube:
+            return None
+
+        try:
+            aggregates = []
+
+            def replace_aggregate(m) -> str:
+                func, distinct, arg = m.group(1).upper(), m.group(2), m.group(3).lower()
+                if distinct:
+                    raise _NotRewritable()
+                aggregates.append(func)
+                if arg == "*":
+                    if func != "COUNT":
+                        raise _NotRewritable()
+                    # 조건에 맞는 큐브 행이 없으면 SUM 은 NULL 이지만 COUNT 는 0
+                    return "COALESCE(SUM(__rows), 0)"
+                if arg in cube["dimensions"] and func in ("MIN", "MAX"):
+                    return f"{func}({arg})"
+                if arg not in cube["measures"]:
+                    raise _NotRewritable()
+                if func == "SUM":
+                    return f"SUM({arg}__sum)"
+                if func == "COUNT":
+                    return f"COALESCE(SUM({arg}__cnt), 0)"
+                if func == "AVG":
+                    return f"(SUM({arg}__sum) * 1.0 / SUM({arg}__cnt))"
+                return f"{func}({arg}__{func.lower()})"
+
+            select = match.group("select")
+            rewritten = sql[:match.start("select")] + _preserve_column_names(select) + sql[match.end("select"):]
+            rewritten = _sub_outside_quotes(_AGG_PATTERN, replace_aggregate, _unquote_identifiers(rewritten))
+            # GROUP BY 없이 집계도 없으면 행 단위 조회이므로 큐브로 답할 수 없음
+            if not match.group("group") and not aggregates:
+                return None
+
+            rewritten = re.sub(
+                rf"\bFROM\s+{re.escape(match.group('table'))}\b",
+                f"FROM {cube['table']}",
+                rewritten,
+                count=1,
+                flags=re.IGNORECASE,
+            )
+            self._check_identifiers(rewritten, cube)
+            # SQLite는 WHERE 에서도 별칭을 허용하므로, 측정값과 같은 이름의 별칭이 원본 컬럼을 가리지 않게 별도 확인
+            if match.group("where"):
+                self._check_identifiers(_unquote_identifiers(match.group("where")), cube, use_aliases=False)
+            return rewritten
+        except _NotRewritable:
+            return None
+
+    @staticmethod
+    def _check_identifiers(sql: str, cube: Dict[str, Any], use_aliases: bool = True):
+        """재작성 결과에 큐브에 없는 컬럼(집계되지 않은 측정값 등)이 남아 있는지 확인"""
+        aliases = set()
+        if use_aliases:
+            aliases = {a.lower() for a in _ALIAS_PATTERN.findall(sql)}
+            aliases |= {a.lower() for item in _split_select_items(sql) for a in _IMPLICIT_ALIAS_PATTERN.findall(item)}
+        allowed = set(cube["dimensions"]) | aliases | {cube["table"].lower(), "__rows"}
+        for m in cube["measures"]:
+            allowed |= {f"{m}__sum", f"{m}__cnt", f"{m}__min", f"{m}__max"}
+        # 따옴표가 남은 식별자(단순 식별자는 이미 풀었음)는 AS 로 정의한 별칭일 때만 허용
+        without_strings = _STRING_PATTERN.sub("''", sql)
+        quoted_aliases = set()
+        if use_aliases:
+            quoted_aliases = {a.lower() for a in _ALIAS_PATTERN.findall(without_strings) if a.startswith('"')}
+        for quoted in _QUOTED_PATTERN.findall(without_strings):
+            if quoted.lower() not in quoted_aliases:
+                raise _NotRewritable()
+        # 문자열 리터럴과 "..." 로 감싼 별칭은 검사 대상에서 제외
+        for word in _IDENT_PATTERN.findall(_QUOTED_PATTERN.sub("", without_strings)):
+            if word.upper() in _ALLOWED_WORDS or word.lower() in allowed:
+                continue
+            raise _NotRewritable()
+
+    def equivalence_queries(self, table_name: str) -> List[str]:
+        """큐브 재작성 검증용 쿼리 (집계 전체, 그룹별, 아무 행도 맞지 않는 조건 포함)"""
+        cube = self.cubes.get(table_name)
+        if not cube:
+            return []
+        dim = cube["dimensions"][0]
+        aggregates = ["COUNT(*)"]
+        for m in cube["measures"]:
+            aggregates += [f"COUNT({m})", f"SUM({m})", f"AVG({m})", f"MIN({m})", f"MAX({m})"]
+        select = ", ".join(aggregates)
+        empty = f"{dim} = '__no_such_value__'"
+        queries = [
+            f"SELECT {select} FROM {table_name}",
+            f"SELECT {select} FROM {table_name} WHERE {empty}",
+            f"SELECT {dim}, {select} FROM {table_name} GROUP BY {dim} ORDER BY {dim}",
+            f"SELECT {dim}, {select} FROM {table_name} WHERE {empty} GROUP BY {dim}",
+            # 따옴표로 감싼 식별자 (LLM 이 만든 SQL 에 흔함)
+            f'SELECT COUNT(*) FROM {table_name} WHERE "{dim}" = \'__no_such_value__\'',
+        ]
+        if cube["measures"]:
+            m = cube["measures"][0]
+            queries += [
+                f'SELECT "{dim}", SUM("{m}") AS total, COUNT("{m}") AS "Row Count" '
+                f'FROM {table_name} GROUP BY "{dim}" ORDER BY "{dim}"',
+                f'SELECT SUM("{m}") FROM {table_name} WHERE "{dim}" IS NOT NULL',
+            ]
+        return queries
+
+    def verify(self, memory_db, sql: str) -> Dict[str, Any]:
+        """같은 쿼리를 원본 테이블과 큐브 재작성으로 실행해 결과 비교 (실수 합계 순서 차이는 허용)"""
+        rewritten = self.rewrite(sql)
+        if rewritten is None:
+            return {"sql": sql, "rewritten": None, "equal": None}
+        base = memory_db.execute_query(sql)
+        cube = pd.read_sql_query(rewritten, memory_db.conn)
+        try:
+            pd.testing.assert_frame_equal(base, cube, check_dtype=False, rtol=1e-9)
+            return {"sql": sql, "rewritten": rewritten, "equal": True}
+        except AssertionError as e:
+            return {"sql": sql, "rewritten": rewritten, "equal": False, "error": str(e)}
+
+    def execute(self, memory_db, sql: str) -> pd.DataFrame:
+        """큐브로 재작성 가능하면 큐브에서, 아니면 원본 테이블에서 실행"""
+        rewritten = self.rewrite(sql)
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["hits" if rewritten else "misses"] += 1
+        if rewritten:
+            try:
+                return pd.read_sql_query(rewritten, memory_db.conn)
+            except Exception as e:
+                logger.warning("⚠️ 큐브 쿼리 실패, 원본 테이블로 실행: %s", e)
+                with self._lock:
+                    self.stats["hits"] -= 1
+                    self.stats["fallbacks"] += 1
+        return memory_db.execute_query(sql)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """큐브 적중률 및 큐브별 크기"""
+        queries = self.stats["queries"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / queries, 4) if queries else 0.0,
+            "cubes": {
+                name: {k: v for k, v in cube.items() if k != "table"}
+                for name, cube in self.cubes.items()
+            },
+        }
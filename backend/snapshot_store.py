@@ -0,0 +1,231 @@
+# snapshot_store.py - 디스크에 남는 버전별 탭 스냅샷 저장소 (재시작 후 즉시 사용, 여러 워커 공유)
+#
+# {root}/{tab_id}/{version}.db   탭 스냅샷 한 버전 (SQLite 파일, 게시 후 변경하지 않음)
+# {root}/{tab_id}/manifest.json  현재 버전과 보관 중인 버전별 메타데이터 (임시 파일 작성 후 os.replace 로 원자적 교체)
+# {root}/{tab_id}/.lock          적재 담당 선출용 flock (manifest 쓰기도 이 락 안에서만)
+#
+# 워커는 현재 버전 파일을 읽기 전용(immutable)으로 ATTACH 해서 mmap 으로 읽는다.
+# 페이지는 처음 읽을 때 OS 페이지 캐시에서 매핑되므로 재시작 직후에도 적재 없이 바로 응답하고,
+# 여러 워커가 같은 페이지 캐시를 공유하므로 워커 수가 늘어도 워커별 사설 메모리는 늘지 않는다.
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# manifest 구조가 바뀌면 올림 (다른 형식의 manifest 는 없는 것으로 보고 새로 적재)
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SnapshotStore:
+    """탭별 스냅샷 버전 파일과 manifest 관리
+
+    - keep_versions: 현재 버전을 포함해 남길 버전 수 (이전 버전을 아직 읽는 워커를 위해 2 이상 권장)
+    - retention_seconds: 현재 버전이 아닌 버전은 게시 후 이 시간이 지나면 개수와 관계없이 삭제 (0 이면 개수만 적용)
+    """
+
+    def __init__(self, root: str, lock_timeout: float = 300.0, keep_versions: int = 2,
+                 retention_seconds: float = 0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.lock_timeout = lock_timeout
+        self.keep_versions = max(1, keep_versions)
+        self.retention_seconds = retention_seconds
+        # manifest (mtime_ns, inode) 기준 캐시 - 요청마다 stat 한 번으로 새 버전 확인
+        self._manifest_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self.stats = {"published": 0, "validated": 0, "lock_waits": 0, "lock_timeouts": 0, "pruned": 0}
+
+    def tab_dir(self, tab_id: str) -> Path:
+        path = self.root / tab_id
+        path.mkdir(exist_ok=True)
+        return path
+
+    def version_path(self, tab_id: str, version: str) -> Path:
+        return self.tab_dir(tab_id) / f"{version}.db"
+
+    def manifest(self, tab_id: str) -> Dict[str, Any]:
+        """탭 manifest (없거나 읽을 수 없거나 형식이 다르면 빈 manifest)"""
+        path = self.tab_dir(tab_id) / MANIFEST_FILE
+        empty = {"format_version": FORMAT_VERSION, "tab_id": tab_id, "current": None, "versions": {}}
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return empty
+        key = (st.st_mtime_ns, st.st_ino)
+        cached = self._manifest_cache.get(tab_id)
+        if cached and cached[0] == key:
+            return cached[1]
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ %s 스냅샷 manifest 를 읽지 못했습니다: %s", tab_id, e)
+            return empty
+        if manifest.get("format_version") != FORMAT_VERSION:
+            logger.warning("⚠️ %s 스냅샷 manifest 형식이 다릅니다 (%s), 새로 적재합니다",
+                           tab_id, manifest.get("format_version"))
+            return empty
+        self._manifest_cache[tab_id] = (key, manifest)
+        return manifest
+
+    def current(self, tab_id: str) -> Optional[Dict[str, Any]]:
+        """현재 버전 메타데이터 (없으면 None)"""
+        manifest = self.manifest(tab_id)
+        if not manifest["current"]:
+            return None
+        return manifest["versions"].get(manifest["current"])
+
+    def _write_manifest(self, tab_id: str, manifest: Dict[str, Any]):
+        """manifest 원자적 교체 (loader_lock 안에서만 호출)"""
+        tab_dir = self.tab_dir(tab_id)
+        tmp = tab_dir / f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, tab_dir / MANIFEST_FILE)
+        _fsync_dir(tab_dir)
+
+    @contextmanager
+    def loader_lock(self, tab_id: str, wait: bool = True):
+        """탭 적재 담당 선출 (flock). 잡으면 True, wait=False 인데 다른 워커가 적재 중이면 False
+
+        프로세스가 죽으면 커널이 락을 풀어주므로 오래된 락 파일을 정리할 필요가 없다.
+        """
+        fd = os.open(self.tab_dir(tab_id) / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        acquired = False
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if not wait:
+                        break
+                    if time.monotonic() >= deadline:
+                        self.stats["lock_timeouts"] += 1
+                        raise TimeoutError(f"{tab_id} 스냅샷 적재 락 대기 시간 초과 ({self.lock_timeout}s)")
+                    if not waited:
+                        waited = True
+                        self.stats["lock_waits"] += 1
+                        logger.info("⏳ %s 다른 워커가 스냅샷을 적재 중입니다. 완료를 기다립니다", tab_id)
+                    time.sleep(0.05)
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def new_version(self, tab_id: str) -> Tuple[str, Path]:
+        """새 버전 ID와 적재용 임시 파일 경로 (publish 전에는 다른 워커에게 보이지 않음)
+
+        loader_lock 안에서만 호출하므로, 남아 있는 임시 파일은 중간에 죽은 적재의 것이라 정리한다.
+        """
+        for stale in self.tab_dir(tab_id).glob("*.db.tmp"):
+            stale.unlink(missing_ok=True)
+        version = uuid.uuid4().hex[:12]
+        return version, self.tab_dir(tab_id) / f"{version}.db.tmp"
+
+    def publish(self, tab_id: str, version: str, staging_path: Path, **meta) -> Dict[str, Any]:
+        """적재가 끝난 임시 파일을 디스크에 내리고 manifest 의 현재 버전으로 원자적 교체 (loader_lock 안에서)"""
+        with open(staging_path, "rb") as f:
+            os.fsync(f.fileno())
+        path = self.version_path(tab_id, version)
+        os.rename(staging_path, path)
+
+        now = time.time()
+        entry = {
+            "version": version,
+            "file": path.name,
+            "bytes": path.stat().st_size,
+            "loaded_at": datetime.now().isoformat(),
+            "published_at": now,
+            "validated_at": now,
+            "pid": os.getpid(),
+            **meta,
+        }
+        manifest = self.manifest(tab_id)
+        manifest = {**manifest, "current": version, "versions": {**manifest["versions"], version: entry}}
+        self._write_manifest(tab_id, self._apply_retention(tab_id, manifest))
+        self.stats["published"] += 1
+        logger.info("📦 %s 스냅샷 %s 게시 (%s행)", tab_id, version, meta.get("rows"))
+        return entry
+
+    def mark_validated(self, tab_id: str, version: str) -> bool:
+        """원본이 바뀌지 않았음을 확인한 시각 기록 (다른 워커가 적재 중이면 기록하지 않음)"""
+        with self.loader_lock(tab_id, wait=False) as acquired:
+            if not acquired:
+                return False
+            manifest = self.manifest(tab_id)
+            entry = manifest["versions"].get(version)
+            if manifest["current"] != version or not entry:
+                return False
+            entry = {**entry, "validated_at": time.time()}
+            self._write_manifest(tab_id, {**manifest, "versions": {**manifest["versions"], version: entry}})
+            self.stats["validated"] += 1
+            return True
+
+    def discard(self, staging_path: Path):
+        """실패한 적재의 임시 파일 삭제"""
+        try:
+            staging_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _apply_retention(self, tab_id: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """보관 정책을 넘은 버전과 manifest 에 없는 버전 파일 삭제
+
+        아직 이전 버전을 ATTACH 하고 있는 워커는 열린 파일 핸들로 계속 읽을 수 있다 (POSIX unlink).
+        """
+        now = time.time()
+        current = manifest["current"]
+        keep = {current: manifest["versions"][current]} if current else {}
+        # 현재 버전 다음으로 최근에 게시된 순서대로 채움
+        for entry in sorted(manifest["versions"].values(), key=lambda v: v["published_at"], reverse=True):
+            expired = self.retention_seconds and now - entry["published_at"] > self.retention_seconds
+            if entry["version"] != current and len(keep) < self.keep_versions and not expired:
+                keep[entry["version"]] = entry
+
+        files = {entry["file"] for entry in keep.values()}
+        for path in self.tab_dir(tab_id).glob("*.db"):
+            if path.name not in files:
+                path.unlink(missing_ok=True)
+                self.stats["pruned"] += 1
+        return {**manifest, "versions": keep}
+
+    def get_stats(self) -> Dict[str, Any]:
+        tabs = {}
+        for tab_dir in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            manifest = self.manifest(tab_dir.name)
+            tabs[tab_dir.name] = {
+                "current": self.current(tab_dir.name),
+                "versions": sorted(manifest["versions"]),
+                "bytes_on_disk": sum(p.stat().st_size for p in tab_dir.glob("*.db")),
+            }
+        return {
+            "root": str(self.root),
+            "format_version": FORMAT_VERSION,
+            "keep_versions": self.keep_versions,
+            "retention_seconds": self.retention_seconds,
+            **self.stats,
+            "tabs": tabs,
+        }
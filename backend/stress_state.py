@@ -0,0 +1,205 @@
+# stress_state.py - 사용자 상태 파일 동시 쓰기 스트레스 테스트 (여러 프로세스 x 스레드가 같은 사용자에 쓰고 유실/손상 확인)
+#
+#   python stress_state.py --processes 4 --threads 4 --ops 6
+#
+# 임시 디렉터리를 작업 디렉터리로 삼아 main 의 UserSessionManager / PresetManager 를 직접 호출한다 (HTTP 없이 경합 극대화).
+# --crash 를 주면 별도 사용자에 쓰는 프로세스를 임의 시점에 SIGKILL 해서 남은 파일이 모두 온전한지도 확인한다.
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent
+USERNAME = "stress"
+CRASH_USERNAME = "stress_crash"
+
+
+def _import_main(workdir: str):
+    os.chdir(workdir)
+    os.environ.update({
+        "TEST_MODE": "true",
+        "LOG_LEVEL": "WARNING",
+        "PREWARM_TABS": "",
+        "SNAPSHOT_STORE_DIR": "",
+        "HISTORY_MAINTENANCE_INTERVAL_HOURS": "0",
+        "QUERY_LIBRARY_DIR": os.path.join(workdir, "query_library"),
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main
+    return main
+
+
+def _response(question: str, i: int) -> Dict[str, Any]:
+    return {"success": True, "chart_request": i % 2, "description": f"{question} 설명 {i}",
+            "sql_query": f"SELECT {i} FROM dual"}
+
+
+def worker(workdir: str, worker_id: int, threads: int, ops: int, seed: int, result_queue):
+    main = _import_main(workdir)
+    main.session_manager.get_or_create_user(USERNAME)
+    results: List[Dict[str, Any]] = []
+
+    def run(thread_id: int):
+        rng = random.Random(seed * 1000 + worker_id * 100 + thread_id)
+        done = {"queries": [], "charts": 0, "presets_created": [], "presets_deleted": []}
+        presets = main.PresetManager(USERNAME)
+        for i in range(ops):
+            question = f"질문 w{worker_id} t{thread_id} #{i}"
+            query_id = main.session_manager.save_query_history(USERNAME, {
+                "tab_id": rng.choice(["tab1", "tab2", "tab3"]),
+                "question": question,
+                "response": _response(question, i),
+                "chart_generated": i % 2 == 1,
+            })
+            main.session_manager.record_queries(USERNAME, 1, i % 2)
+            done["queries"].append(query_id)
+            done["charts"] += i % 2
+
+            preset_id = presets.save_preset({
+                "name": f"프리셋 w{worker_id} t{thread_id} #{i}", "tab_id": "tab1",
+                "grid_config": {"charts": [{"position": 0, "source": {"type": "query_reference", "query_id": query_id}}]},
+            })
+            done["presets_created"].append(preset_id)
+            presets.update_preset(preset_id, {"description": f"수정 {i}"})
+            if rng.random() < 0.5:
+                presets.delete_preset(preset_id)
+                done["presets_deleted"].append(preset_id)
+            time.sleep(rng.random() * 0.002)
+        results.append(done)
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    result_queue.put({"worker": worker_id, "results": results, "stats": main.state_store.get_stats()})
+
+
+def crash_victim(workdir: str):
+    """SIGKILL 당할 때까지 별도 사용자 상태 파일을 계속 씀"""
+    main = _import_main(workdir)
+    main.session_manager.get_or_create_user(CRASH_USERNAME)
+    presets = main.PresetManager(CRASH_USERNAME)
+    i = 0
+    while True:
+        question = f"충돌 질문 {i}"
+        main.session_manager.save_query_history(CRASH_USERNAME, {
+            "tab_id": "tab1", "question": question, "response": _response(question, i), "chart_generated": False})
+        main.session_manager.record_queries(CRASH_USERNAME, 1, 0)
+        presets.save_preset({"name": f"p{i}", "tab_id": "tab1", "grid_config": {"charts": []}})
+        i += 1
+
+
+def verify(workdir: Path, outcomes: List[Dict[str, Any]], crashed: bool) -> List[str]:
+    errors = []
+    user_path = workdir / "user_data" / USERNAME
+    queries = [q for o in outcomes for r in o["results"] for q in r["queries"]]
+    charts = sum(r["charts"] for o in outcomes for r in o["results"])
+    created = {p for o in outcomes for r in o["results"] for p in r["presets_created"]}
+    deleted = {p for o in outcomes for r in o["results"] for p in r["presets_deleted"]}
+
+    metadata = json.loads((user_path / "metadata.json").read_text(encoding="utf-8"))
+    if metadata["total_queries"] != len(queries) or metadata["total_charts"] != charts:
+        errors.append(f"metadata 누적 유실: total_queries {metadata['total_queries']}/{len(queries)}, "
+                      f"total_charts {metadata['total_charts']}/{charts}")
+
+    history = json.loads((user_path / "history_index.json").read_text(encoding="utf-8"))
+    indexed = [h["id"] for h in history]
+    if len(indexed) != len(set(indexed)):
+        errors.append("history_index 중복 항목")
+    expected = set(queries) if len(queries) <= 100 else None
+    if expected is not None and set(indexed) != expected:
+        errors.append(f"history_index 유실: {len(expected - set(indexed))}건 없음")
+    if expected is None and (len(indexed) != 100 or not set(indexed) <= set(queries)):
+        errors.append(f"history_index 항목 수 {len(indexed)} (기대 100)")
+    missing_files = [q for q in queries if not (user_path / "queries" / f"{q}.json").exists()]
+    if missing_files:
+        errors.append(f"쿼리 파일 없음: {len(missing_files)}건")
+
+    preset_index = json.loads((user_path / "presets" / "preset_index.json").read_text(encoding="utf-8"))
+    index_ids = [p["id"] for p in preset_index["presets"]]
+    if set(index_ids) != created - deleted or len(index_ids) != len(set(index_ids)):
+        errors.append(f"preset_index 불일치: 없음 {len(created - deleted - set(index_ids))}건, "
+                      f"삭제됐는데 남음 {len(set(index_ids) & deleted)}건")
+    for preset_id in created - deleted:
+        preset = json.loads((user_path / "presets" / f"{preset_id}.json").read_text(encoding="utf-8"))
+        if not preset.get("description", "").startswith("수정"):
+            errors.append(f"프리셋 수정 유실: {preset_id}")
+
+    # 중간에 죽은 프로세스가 있어도 모든 상태 파일은 온전한 JSON 이어야 함
+    users = [USERNAME] + ([CRASH_USERNAME] if crashed else [])
+    for username in users:
+        for path in (workdir / "user_data" / username).rglob("*.json"):
+            try:
+                json.loads(path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                errors.append(f"손상된 파일 {path.relative_to(workdir)}: {e}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자 상태 파일 동시 쓰기 스트레스 테스트")
+    parser.add_argument("--processes", type=int, default=4, help="워커 프로세스 수")
+    parser.add_argument("--threads", type=int, default=4, help="프로세스당 스레드 수")
+    parser.add_argument("--ops", type=int, default=6, help="스레드당 반복 (질의 저장 + 프리셋 생성/수정/삭제)")
+    parser.add_argument("--crash", action="store_true", help="쓰는 도중 SIGKILL 당하는 프로세스 추가")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="작업 디렉터리 남기기")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="stress_state_"))
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    start = time.perf_counter()
+
+    victim = None
+    if args.crash:
+        victim = ctx.Process(target=crash_victim, args=(str(workdir),))
+        victim.start()
+    procs = [ctx.Process(target=worker, args=(str(workdir), w, args.threads, args.ops, args.seed, result_queue))
+             for w in range(args.processes)]
+    for p in procs:
+        p.start()
+    if victim:
+        time.sleep(random.Random(args.seed).uniform(1.5, 3.0))
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join()
+    outcomes = [result_queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    errors = verify(workdir, outcomes, args.crash)
+    total_ops = args.processes * args.threads * args.ops
+    commits = sum(o["stats"]["commits"] for o in outcomes)
+    committed = sum(o["stats"]["committed_ops"] for o in outcomes)
+    print(f"프로세스 {args.processes} x 스레드 {args.threads} x {args.ops}회 = 질의 {total_ops}건, {elapsed:.1f}s")
+    print(f"그룹 커밋 {commits}회 / 인덱스 변경 {committed}건 (커밋당 {committed / max(commits, 1):.2f}건, "
+          f"최대 {max(o['stats']['max_batch'] for o in outcomes)}건), "
+          f"락 대기 {sum(o['stats']['lock_waits'] for o in outcomes)}회")
+    if args.crash:
+        print("SIGKILL 프로세스 포함")
+    if errors:
+        print("❌ 실패")
+        for error in errors:
+            print(f"  - {error}")
+    else:
+        print("✅ 유실/손상 없음")
+    if args.keep:
+        print(f"작업 디렉터리: {workdir}")
+    else:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+# synthetic_data.py - 대용량 합성 데이터 생성기 (스케일 팩터, NumPy 벡터화, 시드 고정, 로컬 엔진/CSV/Parquet/Oracle 적재)
+import argparse
+import math
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 스케일 1 기준 행 수 (스케일에 비례)
+BASE_ROWS = {
+    "performance_data": 1_000_000,
+    "products": 100_000,
+    "customer_metrics": 200_000,
+    "qms_rat_ymqt_n": 1_000_000,
+    "qms_gbw_view": 1_000_000,
+    "qms_rat_cust": 100_000,
+}
+
+# 컬럼 타입 (Oracle 바인드 타입 / DDL 용: ("str", 길이) / ("int",) / ("float",) / ("date",))
+COLUMNS = {
+    "performance_data": {"year": ("int",), "quarter": ("str", 2), "category": ("str", 10),
+                         "rating": ("float",), "sales": ("int",)},
+    "products": {"product_id": ("str", 20), "product_name": ("str", 100), "category": ("str", 20),
+                 "price": ("int",), "stock": ("int",), "status": ("str", 20)},
+    "customer_metrics": {"customer_id": ("str", 20), "region": ("str", 20), "total_orders": ("int",),
+                         "satisfaction_score": ("float",), "last_order_date": ("date",)},
+    "qms_rat_ymqt_n": {"hiq1_app_cd": ("str", 20), "hiq1_cust_cd": ("str", 20), "ym_qt": ("str", 20),
+                       "revenue": ("str", 20), "forecast": ("str", 20), "actual": ("str", 20), "score": ("str", 20),
+                       "file_group_id": ("str", 50), "file_upload_user": ("str", 20), "expected_date": ("date",)},
+    "qms_gbw_view": {"plan_quarter": ("str", 20), "hiq1_app_cd": ("str", 20), "hiq1_cust_cd": ("str", 20),
+                     "amt": ("int",), "actual": ("str", 20), "score": ("str", 20), "max_score": ("str", 20)},
+    "qms_rat_cust": {"hiq1_cust_cd": ("str", 20), "hiq1_app_cd": ("str", 20), "app_cd": ("str", 200),
+                     "mode_grp": ("str", 20), "use_yn": ("str", 20), "last_mdfy_dt": ("date",),
+                     "last_mdfy_id": ("str", 20), "memo": ("str", 4000)},
+}
+
+# 탭 데이터 = 원본 테이블 + 탭 쿼리(TAB_QUERIES)의 필터/컬럼
+TAB_SOURCES = {
+    "tab1": ("performance_data", ["year", "quarter", "category", "rating", "sales"]),
+    "tab2": ("products", ["product_id", "product_name", "category", "price", "stock"]),
+    "tab3": ("customer_metrics", ["customer_id", "region", "total_orders", "satisfaction_score"]),
+}
+
+# 차원 값
+YEARS = np.arange(2019, 2025)
+QUARTER_CODES = np.array([f"{y}{q:02d}" for y in YEARS for q in range(1, 5)])
+QUARTER_STARTS = np.array([f"{y}-{(q - 1) * 3 + 1:02d}-01" for y in YEARS for q in range(1, 5)], dtype="datetime64[D]")
+APP_CODES = np.array(["HBM", "SERVER", "CLIENT", "MOBILE", "GRAPHICS", "AUTO", "NETWORK", "AI", "EDGE", "IOT"]
+                     + [f"APP{i:02d}" for i in range(11, 31)])
+CATEGORIES = np.array(list("ABCDEFGH"))
+PRODUCT_CATEGORIES = np.array(["전자제품", "액세서리", "저장장치", "주변기기", "네트워크", "모바일", "가전", "부품",
+                               "소프트웨어", "서비스", "케이블", "전원", "음향", "영상", "기타"])
+# 지역과 대략적인 인구 비중
+REGIONS = np.array(["서울", "경기", "부산", "인천", "대구", "경남", "경북", "충남", "전남", "전북",
+                    "충북", "강원", "대전", "광주", "울산", "제주", "세종"])
+REGION_WEIGHTS = np.array([18.6, 26.4, 6.4, 5.8, 4.6, 6.3, 5.0, 4.2, 3.5, 3.4, 3.1, 2.9, 2.8, 2.8, 2.2, 1.3, 0.7])
+
+# PK 가 (분기, 앱, 고객) 인 테이블은 키 공간이 목표 행 수의 몇 배가 되도록 고객 수를 정함
+KEY_SPACE_FACTOR = 4
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """순위 i 의 비중이 1/i^exponent 인 분포 (소수의 큰 고객/앱에 데이터가 몰림)"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def ramp_weights(n: int, growth: float) -> np.ndarray:
+    """최근 구간일수록 (1 + growth) 배까지 늘어나는 분포 (분기별 데이터 증가)"""
+    weights = 1.0 + growth * np.arange(n) / max(1, n - 1)
+    return weights / weights.sum()
+
+
+def inclusion_scale(target: int, row_weights: np.ndarray, key_weights: np.ndarray) -> float:
+    """Σ min(1, m·target·w_row·w_key) = target 이 되는 배율 m (확률이 1로 잘리는 큰 고객 몫을 나머지에 재분배)
+
+    키 비중을 정렬해 두면 행마다 "확률 1 이 되는 키 수" 를 이분 탐색으로 구할 수 있어 키 공간 전체를 만들지 않는다.
+    """
+    keys = np.sort(key_weights.ravel())
+    prefix = np.concatenate([[0.0], np.cumsum(keys)])
+    if row_weights.size * keys.size <= target:
+        return math.inf
+
+    def expected(m: float) -> float:
+        scale = m * target * row_weights
+        cut = np.searchsorted(keys, 1.0 / scale)
+        return float(np.sum(scale * prefix[cut] + (keys.size - cut)))
+
+    low, high = 1.0, 2.0
+    while expected(high) < target:
+        low, high = high, high * 2
+    for _ in range(40):
+        middle = (low + high) / 2
+        low, high = (middle, high) if expected(middle) < target else (low, middle)
+    return high
+
+
+def _codes(prefix: str, count: int, width: int) -> np.ndarray:
+    return np.char.add(prefix, np.char.zfill(np.arange(1, count + 1).astype(str), width))
+
+
+def _lookup(values, rng: np.random.Generator, size: int, p: Optional[np.ndarray] = None) -> np.ndarray:
+    """값 목록에서 (가중) 추출 - 인덱스를 뽑아 배열 조회하므로 문자열도 벡터화"""
+    values = np.asarray(values)
+    return values[rng.choice(len(values), size=size, p=p)]
+
+
+def _hex(rng: np.random.Generator, size: int, digits: int) -> np.ndarray:
+    return np.char.mod(f"%0{digits}X", rng.integers(0, 16 ** digits, size=size, dtype=np.int64))
+
+
+class SyntheticDataGenerator:
+    """스케일 팩터 기반 합성 데이터
+
+    - 모든 테이블은 청크(DataFrame) 단위로 생성되어 메모리는 청크 크기에 비례한다.
+    - 청크마다 (seed, 테이블, 청크 번호) 로 난수 생성기를 만들므로 같은 설정이면 항상 같은 데이터가 나온다.
+    - 고객/앱은 Zipf 분포, 분기는 최근일수록 늘어나는 분포로 치우치게 만든다.
+    """
+
+    def __init__(self, scale: float = 1.0, seed: int = 42, skew: float = 1.1,
+                 reference_date: Optional[date] = None):
+        self.scale = scale
+        self.seed = seed
+        self.skew = skew
+        # 최근 주문일 기준 (탭3 쿼리가 최근 12개월만 조회)
+        self.reference_date = np.datetime64(reference_date or date.today(), "D")
+
+        self.app_weights = zipf_weights(len(APP_CODES), skew + 0.2)
+        self.quarter_weights = ramp_weights(len(QUARTER_CODES), growth=2.0)
+        key_space = len(APP_CODES) * len(QUARTER_CODES)
+        qms_customers = max(10, math.ceil(KEY_SPACE_FACTOR * self.rows("qms_rat_ymqt_n") / key_space))
+        self.customers = _codes("G", qms_customers, max(4, len(str(qms_customers))))
+        self.customer_weights = zipf_weights(qms_customers, skew)
+
+    def rows(self, table: str) -> int:
+        return max(1, int(BASE_ROWS[table] * self.scale))
+
+    def cardinalities(self) -> Dict[str, int]:
+        return {"customers": len(self.customers), "app_codes": len(APP_CODES), "quarters": len(QUARTER_CODES)}
+
+    def _rng(self, table: str, chunk_index: int) -> np.random.Generator:
+        table_index = list(BASE_ROWS).index(table)
+        return np.random.default_rng(np.random.SeedSequence([self.seed, table_index, chunk_index]))
+
+    def iter_chunks(self, table: str, chunk_rows: int = 500_000) -> Iterator[pd.DataFrame]:
+        """테이블 청크 생성"""
+        if table in ("qms_rat_ymqt_n", "qms_gbw_view", "qms_rat_cust"):
+            yield from self._iter_keyed(table, chunk_rows)
+            return
+        generate = getattr(self, f"_gen_{table}")
+        total = self.rows(table)
+        for index, start in enumerate(range(0, total, chunk_rows)):
+            yield generate(self._rng(table, index), start, min(chunk_rows, total - start))
+
+    def iter_tab_chunks(self, tab_id: str, chunk_rows: int = 500_000) -> Iterator[pd.DataFrame]:
+        """탭 쿼리와 같은 필터/컬럼을 적용한 탭 데이터 청크 (로컬 엔진 적재용)"""
+        table, columns = TAB_SOURCES[tab_id]
+        for chunk in self.iter_chunks(table, chunk_rows):
+            if tab_id == "tab1":
+                chunk = chunk[chunk["year"] >= 2022]
+            elif tab_id == "tab2":
+                chunk = chunk[chunk["status"] == "active"]
+            elif tab_id == "tab3":
+                chunk = chunk[chunk["last_order_date"] >= self.reference_date - np.timedelta64(365, "D")]
+            yield chunk[columns].reset_index(drop=True)
+
+    # --- 탭 원본 테이블 (PK 없음, 복원 추출) ---
+
+    def _gen_performance_data(self, rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+        return pd.DataFrame({
+            "year": YEARS[rng.choice(len(YEARS), size=n, p=ramp_weights(len(YEARS), 1.5))],
+            "quarter": _lookup(["Q1", "Q2", "Q3", "Q4"], rng, n),
+            "category": _lookup(CATEGORIES, rng, n, zipf_weights(len(CATEGORIES), 0.8)),
+            "rating": np.clip(rng.normal(3.9, 0.6, n), 1.0, 5.0).round(1),
+            "sales": rng.lognormal(13.8, 0.6, n).astype(np.int64),
+        })
+
+    def _gen_products(self, rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+        ids = np.arange(start + 1, start + n + 1).astype(str)
+        return pd.DataFrame({
+            "product_id": np.char.add("PRD", np.char.zfill(ids, 7)),
+            "product_name": np.char.add("제품 ", ids),
+            "category": _lookup(PRODUCT_CATEGORIES, rng, n, zipf_weights(len(PRODUCT_CATEGORIES), 1.0)),
+            "price": (rng.lognormal(11.5, 0.9, n) // 100 * 100).astype(np.int64),
+            "stock": rng.negative_binomial(2, 0.01, n),
+            "status": np.where(rng.random(n) < 0.85, "active", "discontinued"),
+        })
+
+    def _gen_customer_metrics(self, rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+        ids = np.arange(start + 1, start + n + 1).astype(str)
+        days_ago = np.minimum(rng.exponential(180, n), 730).astype("timedelta64[D]")
+        return pd.DataFrame({
+            "customer_id": np.char.add("CUST", np.char.zfill(ids, 8)),
+            "region": _lookup(REGIONS, rng, n, REGION_WEIGHTS / REGION_WEIGHTS.sum()),
+            # 소수 고객이 주문 대부분을 차지하는 긴 꼬리
+            "total_orders": np.minimum(rng.pareto(1.3, n) * 5 + 1, 100_000).astype(np.int64),
+            "satisfaction_score": np.clip(rng.normal(4.0, 0.5, n), 1.0, 5.0).round(1),
+            "last_order_date": (self.reference_date - days_ago).astype("datetime64[ns]"),
+        })
+
+    # --- QMS 테이블 (PK 조합이 유일해야 하므로 키 공간에서 가중치 비례 확률로 선택) ---
+
+    def _iter_keyed(self, table: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        target = self.rows(table)
+        with_quarter = table != "qms_rat_cust"
+        per_customer = len(APP_CODES) * (len(QUARTER_CODES) if with_quarter else 1)
+        block = max(1, chunk_rows * KEY_SPACE_FACTOR // per_customer)
+        key_weights = np.multiply.outer(self.app_weights, self.quarter_weights) if with_quarter else self.app_weights
+        multiplier = inclusion_scale(target, self.customer_weights, key_weights)
+
+        for index, start in enumerate(range(0, len(self.customers), block)):
+            rng = self._rng(table, index)
+            customer_index = np.arange(start, min(start + block, len(self.customers)))
+            # 포함 확률 = 배율 x 목표 행 수 x 고객 비중 x 앱(x 분기) 비중 (1 초과는 1로)
+            probability = np.minimum(
+                1.0, multiplier * target * np.multiply.outer(self.customer_weights[customer_index], key_weights))
+            keys = np.nonzero(rng.random(probability.shape) < probability)
+            if not len(keys[0]):
+                continue
+            customers = self.customers[customer_index[keys[0]]]
+            apps = APP_CODES[keys[1]]
+            if table == "qms_rat_cust":
+                yield self._gen_rat_cust(rng, customers, apps)
+            else:
+                quarters = keys[2]
+                generate = self._gen_rat_ymqt if table == "qms_rat_ymqt_n" else self._gen_gbw
+                yield generate(rng, customers, apps, quarters, customer_index[keys[0]])
+
+    def _gen_rat_ymqt(self, rng, customers, apps, quarters, customer_rank) -> pd.DataFrame:
+        n = len(customers)
+        grades = np.array(["1", "2", "3", "4", "5"])
+        file_group_id = _hex(rng, n, 8)
+        for digits in (4, 4, 4, 12):
+            file_group_id = np.char.add(np.char.add(file_group_id, "-"), _hex(rng, n, digits))
+        return pd.DataFrame({
+            "hiq1_app_cd": apps,
+            "hiq1_cust_cd": customers,
+            "ym_qt": QUARTER_CODES[quarters],
+            "revenue": _lookup(grades, rng, n),
+            "forecast": _lookup(grades, rng, n),
+            "actual": _lookup(grades, rng, n),
+            "score": rng.integers(55, 101, n).astype(str),
+            "file_group_id": file_group_id,
+            "file_upload_user": _codes("", 50, 7)[rng.integers(0, 50, n)],
+            "expected_date": (QUARTER_STARTS[quarters] + rng.integers(80, 120, n).astype("timedelta64[D]"))
+            .astype("datetime64[ns]"),
+        })
+
+    def _gen_gbw(self, rng, customers, apps, quarters, customer_rank) -> pd.DataFrame:
+        n = len(customers)
+        # 큰 고객(순위가 높은 고객)일수록 금액이 큼
+        size_factor = 1.0 + 20.0 / np.sqrt(customer_rank + 1)
+        return pd.DataFrame({
+            "plan_quarter": QUARTER_CODES[quarters],
+            "hiq1_app_cd": apps,
+            "hiq1_cust_cd": customers,
+            "amt": (rng.lognormal(15.0, 0.5, n) * size_factor).astype(np.int64),
+            "actual": rng.integers(1, 6, n).astype(str),
+            "score": rng.integers(60, 101, n).astype(str),
+            "max_score": np.full(n, "100"),
+        })
+
+    def _gen_rat_cust(self, rng, customers, apps) -> pd.DataFrame:
+        n = len(customers)
+        days_ago = rng.integers(0, 720, n).astype("timedelta64[D]")
+        return pd.DataFrame({
+            "hiq1_cust_cd": customers,
+            "hiq1_app_cd": apps,
+            "app_cd": np.char.ljust(apps, 2).astype("U2"),
+            "mode_grp": np.full(n, "CUQ_00004"),
+            "use_yn": np.where(rng.random(n) < 0.9, "Y", "N"),
+            "last_mdfy_dt": (self.reference_date - days_ago).astype("datetime64[ns]"),
+            "last_mdfy_id": _codes("", 50, 7)[rng.integers(0, 50, n)],
+            "memo": np.char.add(np.char.add(customers, " "), np.char.add(apps, " Application")),
+        })
+
+
+# ---------------------------------------------------------------------------
+# 출력
+
+def write_local_db(generator: SyntheticDataGenerator, path: str, tables: List[str], chunk_rows: int) -> Dict[str, int]:
+    """로컬 쿼리 엔진(SQLite 파일)에 적재 - 탭 원본은 탭 쿼리 필터를 적용한 {tab}_data 로, 나머지는 원본 이름으로"""
+    conn = sqlite3.connect(path)
+    counts = {}
+    try:
+        tab_tables = {table: tab_id for tab_id, (table, _) in TAB_SOURCES.items()}
+        for table in tables:
+            name = f"{tab_tables[table]}_data" if table in tab_tables else table
+            chunks = (generator.iter_tab_chunks(tab_tables[table], chunk_rows) if table in tab_tables
+                      else generator.iter_chunks(table, chunk_rows))
+            counts[name] = 0
+            for index, chunk in enumerate(chunks):
+                chunk.to_sql(name, conn, if_exists="replace" if index == 0 else "append", index=False)
+                counts[name] += len(chunk)
+            conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def write_files(generator: SyntheticDataGenerator, out_dir: str, tables: List[str], chunk_rows: int,
+                file_format: str = "csv") -> Dict[str, int]:
+    """CSV (테이블당 한 파일) 또는 Parquet (테이블 디렉터리에 청크당 part 파일) 로 저장"""
+    root = Path(out_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for table in tables:
+        counts[table] = 0
+        for index, chunk in enumerate(generator.iter_chunks(table, chunk_rows)):
+            if file_format == "parquet":
+                # pyarrow 또는 fastparquet 필요
+                (root / table).mkdir(exist_ok=True)
+                chunk.to_parquet(root / table / f"part-{index:05d}.parquet", index=False)
+            else:
+                chunk.to_csv(root / f"{table}.csv", mode="w" if index == 0 else "a", header=index == 0, index=False)
+            counts[table] += len(chunk)
+    return counts
+
+
+def _oracle_ddl(table: str) -> str:
+    types = {"int": "NUMBER", "float": "NUMBER", "date": "DATE"}
+    columns = ",\n    ".join(
+        f"{name.upper()} {types[spec[0]] if spec[0] != 'str' else f'VARCHAR2({spec[1]})'}"
+        for name, spec in COLUMNS[table].items()
+    )
+    return f"CREATE TABLE {table.upper()} (\n    {columns}\n)"
+
+
+def create_oracle_tables(conn, tables: List[str]):
+    """대상 테이블 재생성 (QMS 테이블은 test_data_generator 의 PK 포함 DDL 과 기준 코드 데이터 사용)"""
+    import test_data_generator
+
+    cursor = conn.cursor()
+    for table in tables:
+        if table.startswith("qms_"):
+            continue
+        try:
+            cursor.execute(f"DROP TABLE {table.upper()} CASCADE CONSTRAINTS")
+        except Exception:
+            pass  # 테이블이 없으면 무시
+        cursor.execute(_oracle_ddl(table))
+    cursor.close()
+    if any(table.startswith("qms_") for table in tables):
+        test_data_generator.create_test_tables(conn)
+        test_data_generator.insert_calendar_data(conn)
+        test_data_generator.insert_common_code_data(conn)
+
+
+def bulk_load_oracle(conn, table: str, chunks: Iterator[pd.DataFrame], batch_rows: int = 50_000,
+                     direct_path: bool = True) -> Dict[str, Any]:
+    """배열 바인딩 대량 적재
+
+    - 입력 타입을 setinputsizes 로 한 번 지정해 배치마다 재바인딩/재파싱하지 않음
+    - batch_rows 행씩 executemany 한 번 (라운드트립 = 행 수 / batch_rows)
+    - direct_path 면 APPEND_VALUES 힌트로 버퍼 캐시를 거치지 않는 직접 경로 삽입 (배치마다 커밋 필요)
+    """
+    import oracledb
+
+    columns = COLUMNS[table]
+    bind_types = {
+        "int": oracledb.DB_TYPE_NUMBER,
+        "float": oracledb.DB_TYPE_NUMBER,
+        "date": oracledb.DB_TYPE_DATE,
+    }
+    hint = "/*+ APPEND_VALUES */ " if direct_path else ""
+    placeholders = ", ".join(f":{i + 1}" for i in range(len(columns)))
+    sql = f"INSERT {hint}INTO {table.upper()} ({', '.join(c.upper() for c in columns)}) VALUES ({placeholders})"
+
+    cursor = conn.cursor()
+    cursor.setinputsizes(*[spec[1] if spec[0] == "str" else bind_types[spec[0]] for spec in columns.values()])
+    rows = batches = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        # numpy 스칼라를 파이썬 객체로 (드라이버가 numpy 타입을 바인딩하지 못함)
+        data = chunk[list(columns)].astype(object).to_numpy().tolist()
+        for offset in range(0, len(data), batch_rows):
+            cursor.executemany(sql, data[offset:offset + batch_rows])
+            batches += 1
+            if direct_path:
+                conn.commit()
+        rows += len(data)
+    conn.commit()
+    cursor.close()
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "batches": batches, "seconds": round(elapsed, 2),
+            "rows_per_sec": round(rows / elapsed) if elapsed > 0 else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대용량 합성 데이터 생성")
+    parser.add_argument("--scale", type=float, default=1.0, help=f"스케일 팩터 (1 = {BASE_ROWS})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="고객 Zipf 지수 (클수록 소수 고객에 집중)")
+    parser.add_argument("--tables", default=",".join(BASE_ROWS), help="생성할 테이블 (쉼표 구분)")
+    parser.add_argument("--target", choices=["local", "csv", "parquet", "oracle"], default="local")
+    parser.add_argument("--local-db", default="synthetic.db", help="로컬 엔진 SQLite 파일 (LOCAL_DB_PATH 로 지정)")
+    parser.add_argument("--out-dir", default="synthetic_data")
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="Oracle executemany 배치 크기")
+    parser.add_argument("--create", action="store_true", help="Oracle 대상 테이블 재생성")
+    parser.add_argument("--conventional", action="store_true", help="Oracle 직접 경로(APPEND_VALUES) 삽입 사용 안 함")
+    args = parser.parse_args()
+
+    tables = [t.strip().lower() for t in args.tables.split(",") if t.strip()]
+    generator = SyntheticDataGenerator(args.scale, args.seed, args.skew)
+    print(f"🚀 합성 데이터: 스케일 {args.scale}, 시드 {args.seed}, 카디널리티 {generator.cardinalities()}")
+    print(f"   목표 행 수: {', '.join(f'{t}={generator.rows(t):,}' for t in tables)}")
+
+    start = time.perf_counter()
+    if args.target == "local":
+        counts = write_local_db(generator, args.local_db, tables, args.chunk_rows)
+    elif args.target in ("csv", "parquet"):
+        counts = write_files(generator, args.out_dir, tables, args.chunk_rows, args.target)
+    else:
+        import test_data_generator
+
+        connection = test_data_generator.get_connection()
+        if not connection:
+            return
+        try:
+            if args.create:
+                create_oracle_tables(connection, tables)
+            counts = {}
+            for table in tables:
+                stats = bulk_load_oracle(connection, table, generator.iter_chunks(table, args.chunk_rows),
+                                         args.batch_rows, direct_path=not args.conventional)
+                print(f"📥 {table}: {stats['rows']:,}행, {stats['batches']}배치, {stats['seconds']}s, "
+                      f"{stats['rows_per_sec']:,} rows/s")
+                counts[table] = stats["rows"]
+        finally:
+            connection.close()
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    for name, count in counts.items():
+        print(f"✅ {name}: {count:,}행")
+    print(f"⏱️ {total:,}행, {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
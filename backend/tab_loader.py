@@ -0,0 +1,133 @@
+# tab_loader.py - 대용량 탭 데이터 스트리밍 적재 및 온라인 집계
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from oracle_fetch import peak_rss_mb
+
+
+class GroupedAggregator:
+    """한 차원 컬럼 기준으로 여러 측정값의 부분 집계(sum/count)를 청크 단위로 누적
+
+    같은 차원을 쓰는 차트는 청크마다 groupby 한 번을 공유한다.
+    """
+
+    AGGREGATES = ("sum", "mean", "count")
+
+    def __init__(self, dimension: str, measures: Iterable[str] = ()):
+        self.dimension = dimension
+        self.measures = sorted(set(measures))
+        self._sum: Optional[pd.DataFrame] = None
+        self._count: Optional[pd.DataFrame] = None
+        self._size: Optional[pd.Series] = None
+
+    @staticmethod
+    def _merge(total, part):
+        if total is None:
+            return part
+        merged = total.add(part, fill_value=0)
+        # 인덱스가 어긋나면 float로 승격되므로 정수 타입 복원
+        if isinstance(part, pd.Series):
+            return merged.astype(part.dtype) if pd.api.types.is_integer_dtype(part.dtype) else merged
+        for column, dtype in part.dtypes.items():
+            if pd.api.types.is_integer_dtype(dtype):
+                merged[column] = merged[column].astype(dtype)
+        return merged
+
+    def update(self, chunk: pd.DataFrame):
+        """청크 하나를 누적"""
+        if chunk.empty:
+            return
+        grouped = chunk.groupby(self.dimension)
+        self._size = self._merge(self._size, grouped.size())
+        if self.measures:
+            self._sum = self._merge(self._sum, grouped[self.measures].sum())
+            self._count = self._merge(self._count, grouped[self.measures].count())
+
+    def result(self, measure: Optional[str] = None, agg: str = "count") -> pd.DataFrame:
+        """df.groupby(dimension)[measure].agg().reset_index() 와 같은 형태로 반환"""
+        if agg not in self.AGGREGATES:
+            raise ValueError(f"지원하지 않는 집계 함수입니다: {agg}")
+        if agg == "count" or measure is None:
+            series = self._size if measure is None or self._count is None else self._count[measure]
+            name = "count"
+        elif agg == "sum":
+            series = None if self._sum is None else self._sum[measure]
+            name = measure
+        else:
+            series = None if self._sum is None else self._sum[measure] / self._count[measure]
+            name = measure
+        if series is None:
+            return pd.DataFrame(columns=[self.dimension, name])
+        return series.sort_index().rename(name).reset_index()
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Oracle은 컬럼명을 대문자로 돌려주므로 TAB_QUERIES/차트 설정과 같은 소문자로 통일"""
+    df.columns = [str(c).lower() for c in df.columns]
+    return df
+
+
+def stream_to_db(
+    chunks: Iterable[pd.DataFrame],
+    memory_db,
+    table_name: str,
+    aggregators: Optional[List[Any]] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """청크를 스테이징 테이블에 이어 붙이고 버린 뒤, 완료 시 원자적으로 교체
+
+    aggregators 는 update(chunk) 를 가진 객체 목록이며 같은 청크로 온라인 집계한다.
+    전체 결과를 한 번에 DataFrame으로 만들지 않으므로 피크 메모리는 청크 크기에 비례한다.
+    """
+    staging = f"{table_name}__loading"
+    start = time.perf_counter()
+    state = {
+        "table": table_name,
+        "status": "loading",
+        "rows": 0,
+        "chunks": 0,
+        "store_seconds": 0.0,
+        "started_at": datetime.now().isoformat(),
+    }
+    if progress:
+        progress(dict(state))
+
+    try:
+        for chunk in chunks:
+            store_start = time.perf_counter()
+            normalize_columns(chunk)
+            memory_db.append_data(staging, chunk, replace=state["chunks"] == 0)
+            for aggregator in aggregators or []:
+                aggregator.update(chunk)
+            # 나머지 시간은 원본(Oracle) 조회 대기
+            state["store_seconds"] += time.perf_counter() - store_start
+            state["rows"] += len(chunk)
+            state["chunks"] += 1
+            del chunk
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress({**state, "rows_per_sec": round(state["rows"] / elapsed) if elapsed > 0 else None})
+    except Exception as e:
+        memory_db.drop_table(staging)
+        if progress:
+            progress({**state, "status": "failed", "error": str(e)})
+        raise
+
+    if state["chunks"]:
+        memory_db.swap_table(staging, table_name)
+
+    elapsed = time.perf_counter() - start
+    state.update({
+        "status": "done",
+        "seconds": round(elapsed, 4),
+        "store_seconds": round(state["store_seconds"], 4),
+        "rows_per_sec": round(state["rows"] / elapsed) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "finished_at": datetime.now().isoformat(),
+    })
+    if progress:
+        progress(dict(state))
+    return state
@@ -0,0 +1,222 @@
+# tracing.py - 경량 요청 트레이싱 (단계별 스팬, Server-Timing 헤더, OTLP JSON 파일/수집기 내보내기)
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """한 요청의 스팬 모음 (첫 스팬이 루트)"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+
+    def breakdown(self) -> Dict[str, float]:
+        """단계 이름별 소요 시간 합계 (ms, 시작 순서). 일괄 질의처럼 같은 단계가 여러 번이면 합산"""
+        totals: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing 헤더 값 (예: snapshot_load;dur=1.2, llm_call;dur=830.5, total;dur=845.0)"""
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.breakdown().items()]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_record(self) -> Dict[str, Any]:
+        """히스토리 저장용 요약 (루트 기준 상대 시작 시각과 소요 시간, ms)"""
+        origin = self.root.start_ns
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration_ms, 2),
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "start_ms": round((span.start_ns - origin) / 1e6, 2),
+                    "duration_ms": round(span.duration_ms, 2),
+                    **({"attributes": span.attributes} if span.attributes else {}),
+                    **({"error": span.error} if span.error else {}),
+                }
+                for span in self.spans[1:]
+            ],
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace, service_name: str) -> Dict[str, Any]:
+    """OTLP/JSON (ExportTraceServiceRequest) 형식으로 변환"""
+    spans = []
+    for span in trace.spans:
+        entry = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span is trace.root else 1,  # SERVER / INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            entry["parentSpanId"] = span.parent_id
+        spans.append(entry)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """완료된 트레이스를 백그라운드 스레드에서 OTLP JSON 으로 내보냄
+
+    - file_path: 한 줄에 ExportTraceServiceRequest 하나 (OpenTelemetry Collector file exporter 와 같은 형식)
+    - collector_url: OTLP/HTTP 수집기 주소 (예: http://localhost:4318) 의 /v1/traces 로 POST
+    대기열이 가득 차면 버린다 (요청 처리를 막지 않음).
+    """
+
+    def __init__(self, service_name: str, file_path: str = "", collector_url: str = "", queue_size: int = 1000):
+        self.service_name = service_name
+        self.file_path = file_path
+        self.collector_url = collector_url.rstrip("/") + "/v1/traces" if collector_url else ""
+        self.stats = {"exported": 0, "dropped": 0, "failed": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        client = httpx.Client(timeout=5.0) if self.collector_url else None
+        while True:
+            trace = self._queue.get()
+            payload = to_otlp(trace, self.service_name)
+            try:
+                if self.file_path:
+                    with open(self.file_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                if client:
+                    client.post(self.collector_url, json=payload).raise_for_status()
+                self.stats["exported"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning("⚠️ 트레이스 내보내기 실패: %s", e)
+
+
+# 현재 요청의 트레이스 / 현재 스팬 (asyncio 태스크와 스레드풀로 자동 전파)
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class Tracer:
+    """요청 단위 트레이스와 단계 스팬 생성
+
+    트레이스가 시작되지 않은 곳(스크립트, 백그라운드 작업)에서 span() 은 아무것도 하지 않는다.
+    """
+
+    def __init__(self, exporter: Optional[TraceExporter] = None):
+        self.exporter = exporter
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        trace = Trace(name, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.error = type(e).__name__
+            raise
+        finally:
+            trace.root.end()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            if self.exporter:
+                self.exporter.export(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        trace = _current_trace.get()
+        if trace is None:
+            yield None
+            return
+        parent = _current_span.get()
+        span = Span(name, parent.span_id if parent else None, attributes)
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+
+    def add_span(self, name: str, seconds: float, **attributes) -> Optional[Span]:
+        """이미 측정한 구간을 방금 끝난 스팬으로 기록"""
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        parent = _current_span.get()
+        span = Span(name, parent.span_id if parent else None, attributes)
+        span.end_ns = span.start_ns
+        span.start_ns -= int(seconds * 1e9)
+        trace.spans.append(span)
+        return span